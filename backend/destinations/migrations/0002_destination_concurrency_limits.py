@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("destinations", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="destination",
+            name="max_concurrent_associations",
+            field=models.PositiveIntegerField(
+                default=3,
+                help_text="Maximum number of transfers sent to this destination at the same time",
+            ),
+        ),
+        migrations.AddField(
+            model_name="destination",
+            name="max_queued_jobs",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Maximum number of transfers waiting for this destination (0 = unlimited)",
+            ),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("destinations", "0002_destination_concurrency_limits"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DestinationCapability",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sop_class_uid", models.CharField(max_length=64)),
+                ("transfer_syntax_uid", models.CharField(max_length=64)),
+                (
+                    "accepted",
+                    models.BooleanField(
+                        help_text="Whether the destination accepted this presentation context"
+                    ),
+                ),
+                (
+                    "negotiated_at",
+                    models.DateTimeField(
+                        db_index=True, help_text="When the context was last negotiated"
+                    ),
+                ),
+                (
+                    "destination",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="capabilities",
+                        to="destinations.destination",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Destination Capability",
+                "verbose_name_plural": "Destination Capabilities",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("destination", "sop_class_uid", "transfer_syntax_uid"),
+                        name="unique_destination_capability",
+                    )
+                ],
+            },
+        ),
+    ]
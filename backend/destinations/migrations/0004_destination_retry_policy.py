@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-17 05:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("destinations", "0003_destination_capability"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="destination",
+            name="retry_backoff_max_seconds",
+            field=models.PositiveIntegerField(
+                default=900, help_text="Upper bound of the delay between attempts"
+            ),
+        ),
+        migrations.AddField(
+            model_name="destination",
+            name="retry_backoff_seconds",
+            field=models.PositiveIntegerField(
+                default=30,
+                help_text="Delay before the first retry; doubles with every further attempt",
+            ),
+        ),
+        migrations.AddField(
+            model_name="destination",
+            name="retry_max_attempts",
+            field=models.PositiveIntegerField(
+                default=3,
+                help_text="Maximum number of send attempts per transfer (1 = never retry)",
+            ),
+        ),
+    ]
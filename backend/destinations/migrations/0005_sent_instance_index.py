@@ -0,0 +1,60 @@
+# Generated by Django 5.2.4 on 2026-10-17 05:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("destinations", "0004_destination_retry_policy"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SentInstance",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sop_instance_uid", models.CharField(max_length=64)),
+                (
+                    "content_hash",
+                    models.CharField(
+                        help_text="SHA-256 of the file as imported", max_length=64
+                    ),
+                ),
+                ("size", models.BigIntegerField(default=0)),
+                (
+                    "sent_at",
+                    models.DateTimeField(
+                        help_text="When the destination last confirmed storing the instance"
+                    ),
+                ),
+                (
+                    "destination",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="sent_instances",
+                        to="destinations.destination",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Sent Instance",
+                "verbose_name_plural": "Sent Instances",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("destination", "sop_instance_uid", "content_hash"),
+                        name="unique_sent_instance",
+                    )
+                ],
+            },
+        ),
+    ]
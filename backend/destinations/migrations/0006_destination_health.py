@@ -0,0 +1,72 @@
+# Generated by Django 5.2.4 on 2026-10-17 05:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("destinations", "0005_sent_instance_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DestinationHealth",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("unknown", "Unknown"),
+                            ("reachable", "Reachable"),
+                            ("unreachable", "Unreachable"),
+                        ],
+                        default="unknown",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "latency_ms",
+                    models.FloatField(
+                        blank=True,
+                        help_text="Round-trip time of the last successful C-ECHO",
+                        null=True,
+                    ),
+                ),
+                ("message", models.TextField(blank=True)),
+                ("checked_at", models.DateTimeField(blank=True, null=True)),
+                ("last_success_at", models.DateTimeField(blank=True, null=True)),
+                ("consecutive_failures", models.PositiveIntegerField(default=0)),
+                (
+                    "history",
+                    models.JSONField(
+                        blank=True,
+                        default=list,
+                        help_text="Recent checks, oldest first: checked_at, success, latency_ms",
+                    ),
+                ),
+                (
+                    "destination",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="health",
+                        to="destinations.destination",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Destination Health",
+                "verbose_name_plural": "Destination Health",
+            },
+        ),
+    ]
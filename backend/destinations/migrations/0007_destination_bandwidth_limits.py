@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-17 05:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("destinations", "0006_destination_health"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="destination",
+            name="bandwidth_limit_kbps",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Egress cap to this destination in kbit/s (0 = unlimited)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="destination",
+            name="bandwidth_schedule",
+            field=models.JSONField(
+                blank=True,
+                default=list,
+                help_text="Time-of-day caps overriding the limit: [{start: 'HH:MM', end: 'HH:MM', limit_kbps: N}]",
+            ),
+        ),
+    ]
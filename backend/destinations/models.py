@@ -31,6 +31,35 @@ class Destination(models.Model):
         default=True,  # type: ignore
         help_text="Whether this destination is active"
     )
+    max_concurrent_associations = models.PositiveIntegerField(
+        default=3,  # type: ignore
+        help_text="Maximum number of transfers sent to this destination at the same time"
+    )
+    max_queued_jobs = models.PositiveIntegerField(
+        default=0,  # type: ignore
+        help_text="Maximum number of transfers waiting for this destination (0 = unlimited)"
+    )
+    retry_max_attempts = models.PositiveIntegerField(
+        default=3,  # type: ignore
+        help_text="Maximum number of send attempts per transfer (1 = never retry)"
+    )
+    retry_backoff_seconds = models.PositiveIntegerField(
+        default=30,  # type: ignore
+        help_text="Delay before the first retry; doubles with every further attempt"
+    )
+    retry_backoff_max_seconds = models.PositiveIntegerField(
+        default=900,  # type: ignore
+        help_text="Upper bound of the delay between attempts"
+    )
+    bandwidth_limit_kbps = models.PositiveIntegerField(
+        default=0,  # type: ignore
+        help_text="Egress cap to this destination in kbit/s (0 = unlimited)"
+    )
+    bandwidth_schedule = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Time-of-day caps overriding the limit: [{start: 'HH:MM', end: 'HH:MM', limit_kbps: N}]"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(
@@ -64,17 +93,153 @@ class Destination(models.Model):
         if self.port and not (1 <= self.port <= 65535):
             raise ValidationError("Port must be between 1 and 65535")
 
+        if self.max_concurrent_associations is not None and self.max_concurrent_associations < 1:
+            raise ValidationError("Destination must allow at least one concurrent association")
+
+        if self.retry_max_attempts is not None and self.retry_max_attempts < 1:
+            raise ValidationError("Destination must allow at least one send attempt")
+
+        from dicom_api.bandwidth import parse_schedule
+        try:
+            parse_schedule(self.bandwidth_schedule)
+        except ValueError as e:
+            raise ValidationError(str(e))
+
     def is_reachable(self):
         """
-        Test if the destination is reachable.
-        This could be enhanced to actually test DICOM connectivity.
+        Whether the last health check reached the destination.
+        Returns None if it was never checked; never contacts the destination.
         """
-        import socket
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(5)  # 5 second timeout
-            result = sock.connect_ex((self.host, self.port))
-            sock.close()
-            return result == 0
-        except Exception:
-            return False
+            health = self.health
+        except DestinationHealth.DoesNotExist:  # type: ignore
+            return None
+        if health.status == 'unknown':
+            return None
+        return health.status == 'reachable'
+
+
+class DestinationCapability(models.Model):
+    """
+    Outcome of proposing a SOP class in a transfer syntax to a destination.
+
+    Recorded after every association so transfers can decide which files
+    go as-is and which must be converted before associating again.
+    """
+    destination = models.ForeignKey(
+        Destination,
+        on_delete=models.CASCADE,
+        related_name='capabilities'
+    )
+    sop_class_uid = models.CharField(max_length=64)
+    transfer_syntax_uid = models.CharField(max_length=64)
+    accepted = models.BooleanField(
+        help_text="Whether the destination accepted this presentation context"
+    )
+    negotiated_at = models.DateTimeField(
+        db_index=True,
+        help_text="When the context was last negotiated"
+    )
+
+    # Annotation for static type checkers
+    objects: models.Manager = models.Manager()
+
+    class Meta:
+        verbose_name = "Destination Capability"
+        verbose_name_plural = "Destination Capabilities"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['destination', 'sop_class_uid', 'transfer_syntax_uid'],
+                name='unique_destination_capability'
+            ),
+        ]
+
+    def __str__(self):
+        outcome = 'accepts' if self.accepted else 'rejects'
+        return f"{self.destination.name} {outcome} {self.sop_class_uid} in {self.transfer_syntax_uid}"
+
+
+class SentInstance(models.Model):
+    """
+    An instance a destination confirmed storing, keyed by its content.
+
+    Lets a send skip instances the destination already holds. The content
+    hash keeps a corrected instance re-using its SOP Instance UID from
+    being mistaken for the copy sent before.
+    """
+    destination = models.ForeignKey(
+        Destination,
+        on_delete=models.CASCADE,
+        related_name='sent_instances'
+    )
+    sop_instance_uid = models.CharField(max_length=64)
+    content_hash = models.CharField(
+        max_length=64,
+        help_text="SHA-256 of the file as imported"
+    )
+    size = models.BigIntegerField(default=0)  # type: ignore
+    sent_at = models.DateTimeField(
+        help_text="When the destination last confirmed storing the instance"
+    )
+
+    # Annotation for static type checkers
+    objects: models.Manager = models.Manager()
+
+    class Meta:
+        verbose_name = "Sent Instance"
+        verbose_name_plural = "Sent Instances"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['destination', 'sop_instance_uid', 'content_hash'],
+                name='unique_sent_instance'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.sop_instance_uid} at {self.destination.name}"
+
+
+
+class DestinationHealth(models.Model):
+    """
+    Latest C-ECHO outcome of a destination and its recent round-trip times.
+
+    Written by the health monitor so destination lists and connection
+    tests read the status instead of contacting the destination.
+    """
+    STATUS_CHOICES = [
+        ('unknown', 'Unknown'),
+        ('reachable', 'Reachable'),
+        ('unreachable', 'Unreachable'),
+    ]
+
+    destination = models.OneToOneField(
+        Destination,
+        on_delete=models.CASCADE,
+        related_name='health'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='unknown')
+    latency_ms = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Round-trip time of the last successful C-ECHO"
+    )
+    message = models.TextField(blank=True)
+    checked_at = models.DateTimeField(null=True, blank=True)
+    last_success_at = models.DateTimeField(null=True, blank=True)
+    consecutive_failures = models.PositiveIntegerField(default=0)  # type: ignore
+    history = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Recent checks, oldest first: checked_at, success, latency_ms"
+    )
+
+    # Annotation for static type checkers
+    objects: models.Manager = models.Manager()
+
+    class Meta:
+        verbose_name = "Destination Health"
+        verbose_name_plural = "Destination Health"
+
+    def __str__(self):
+        return f"{self.destination.name}: {self.status}"
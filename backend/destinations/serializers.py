@@ -1,5 +1,16 @@
 from rest_framework import serializers
-from .models import Destination
+from dicom_api.bandwidth import parse_schedule, shaping_supported
+
+from .models import Destination, DestinationCapability, DestinationHealth
+
+class DestinationHealthSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the latest health check of a destination.
+    """
+
+    class Meta:
+        model = DestinationHealth
+        fields = ['status', 'latency_ms', 'message', 'checked_at', 'last_success_at', 'consecutive_failures']
 
 class DestinationSerializer(serializers.ModelSerializer):
     """
@@ -7,13 +18,17 @@ class DestinationSerializer(serializers.ModelSerializer):
     """
     created_by_username = serializers.SerializerMethodField()
     is_reachable = serializers.SerializerMethodField()
+    health = serializers.SerializerMethodField()
     
     class Meta:
         model = Destination
         fields = [
             'id', 'name', 'ae_title', 'host', 'port', 'description', 
-            'enabled', 'created_at', 'updated_at', 'created_by', 
-            'created_by_username', 'is_reachable'
+            'enabled', 'max_concurrent_associations', 'max_queued_jobs',
+            'retry_max_attempts', 'retry_backoff_seconds',
+            'retry_backoff_max_seconds', 'bandwidth_limit_kbps', 'bandwidth_schedule',
+            'created_at', 'updated_at', 'created_by',
+            'created_by_username', 'is_reachable', 'health'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'created_by']
     
@@ -26,12 +41,13 @@ class DestinationSerializer(serializers.ModelSerializer):
 
     def get_is_reachable(self, obj):
         """
-        Check if destination is reachable.
-        This is expensive so we might want to cache or make it optional.
+        Whether the last health check reached the destination.
+        Read from the health monitor's results, never by contacting it.
         """
-        # For now, skip the actual connectivity test to avoid slow API responses
-        # In production, this could be done asynchronously or on-demand
-        return None
+        return obj.is_reachable()
+
+    def get_health(self, obj):
+        return destination_health(obj)
     
     def validate_ae_title(self, value):
         """Validate AE Title according to DICOM standards."""
@@ -52,6 +68,35 @@ class DestinationSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Port must be between 1 and 65535")
         return value
     
+    def validate_max_concurrent_associations(self, value):
+        """A destination with no associations could never be sent to."""
+        if value < 1:
+            raise serializers.ValidationError("At least one concurrent association is required")
+        return value
+
+    def validate_retry_max_attempts(self, value):
+        """Every transfer needs at least its first attempt."""
+        if value < 1:
+            raise serializers.ValidationError("At least one send attempt is required")
+        return value
+
+    def validate_bandwidth_schedule(self, value):
+        """Windows need HH:MM bounds and a non-negative kbit/s limit."""
+        try:
+            parse_schedule(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return value or []
+
+    def validate(self, attrs):
+        """Bandwidth caps are only enforced by the C-STORE engine."""
+        attrs = super().validate(attrs)
+        if (attrs.get('bandwidth_limit_kbps') or attrs.get('bandwidth_schedule')) and not shaping_supported():
+            raise serializers.ValidationError(
+                "Bandwidth caps need DICOM_SEND_ENGINE='dimse'; storescu sends are not shaped"
+            )
+        return attrs
+
     def validate_name(self, value):
         """Validate destination name uniqueness."""
         if self.instance:
@@ -82,7 +127,31 @@ class DestinationListSerializer(serializers.ModelSerializer):
     """
     Lightweight serializer for listing destinations.
     """
+    health = serializers.SerializerMethodField()
     
     class Meta:
         model = Destination
-        fields = ['id', 'name', 'ae_title', 'host', 'port', 'enabled'] 
\ No newline at end of file
+        fields = [
+            'id', 'name', 'ae_title', 'host', 'port', 'enabled', 'max_concurrent_associations',
+            'max_queued_jobs', 'bandwidth_limit_kbps', 'health'
+        ]
+
+    def get_health(self, obj):
+        return destination_health(obj)
+
+
+class DestinationCapabilitySerializer(serializers.ModelSerializer):
+    """
+    Serializer for negotiated presentation contexts of a destination.
+    """
+
+    class Meta:
+        model = DestinationCapability
+        fields = ['sop_class_uid', 'transfer_syntax_uid', 'accepted', 'negotiated_at']
+
+def destination_health(destination):
+    """Serialized last health check of a destination, or None if it was never checked."""
+    try:
+        return DestinationHealthSerializer(destination.health).data
+    except DestinationHealth.DoesNotExist:  # type: ignore
+        return None
@@ -1,3 +1,6 @@
+import time
+
+from django.conf import settings
 from django.shortcuts import render
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
@@ -5,7 +8,10 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.contrib.auth.models import User
 from .models import Destination
-from .serializers import DestinationSerializer, DestinationCreateSerializer, DestinationListSerializer
+from .serializers import (
+    DestinationSerializer, DestinationCreateSerializer, DestinationListSerializer,
+    DestinationCapabilitySerializer, destination_health,
+)
 from .permissions import IsAdminOrReadOnly
 
 # Create your views here.
@@ -29,7 +35,7 @@ class DestinationViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Return filtered queryset."""
-        queryset = Destination.objects.order_by('name')  # type: ignore
+        queryset = Destination.objects.select_related('health').order_by('name')  # type: ignore
         
         # Only show enabled destinations to non-admins
         if not (self.request.user.is_staff or self.request.user.is_superuser):
@@ -40,20 +46,115 @@ class DestinationViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         """Set the created_by field when creating a destination."""
         serializer.save(created_by=self.request.user)
+
+    def perform_update(self, serializer):
+        """Forget negotiated capabilities when the destination's address changes."""
+        instance = serializer.instance
+        previous = (instance.ae_title, instance.host, instance.port)
+        destination = serializer.save()
+        if (destination.ae_title, destination.host, destination.port) != previous:
+            destination.capabilities.all().delete()
+
+    @action(detail=True, methods=['get'])
+    def capabilities(self, request, pk=None):
+        """
+        List the SOP classes and transfer syntaxes negotiated with a destination.
+        """
+        destination = self.get_object()
+        serializer = DestinationCapabilitySerializer(
+            destination.capabilities.order_by('sop_class_uid', 'transfer_syntax_uid'),
+            many=True
+        )
+        return Response(serializer.data, status=status.HTTP_200_OK)
     
+    @action(detail=True, methods=['get'])
+    def health(self, request, pk=None):
+        """
+        Latest health check of a destination and its recent round-trip times.
+        """
+        destination = self.get_object()
+        health = destination_health(destination)
+        return Response({
+            'health': health,
+            'history': destination.health.history if health else [],
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def test_connections(self, request):
+        """
+        Test connectivity to many destinations at the same time.
+
+        Body: ids (default: every enabled destination), timeout (seconds per
+        destination) and deadline (seconds overall), each capped by the
+        DICOM_ECHO_TIMEOUT and DICOM_BULK_TEST_DEADLINE settings.
+        """
+        ids = request.data.get('ids')
+        try:
+            timeout = self._seconds(request.data.get('timeout'), getattr(settings, 'DICOM_ECHO_TIMEOUT', 10))
+            deadline = self._seconds(request.data.get('deadline'), getattr(settings, 'DICOM_BULK_TEST_DEADLINE', 30))
+            if ids is not None and not (isinstance(ids, list) and all(str(i).isdigit() for i in ids)):
+                raise ValueError('ids must be a list of destination ids')
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.get_queryset()
+        if ids is None:
+            queryset = queryset.filter(enabled=True)
+        else:
+            queryset = queryset.filter(id__in=[int(i) for i in ids])
+        destinations = list(queryset)
+
+        try:
+            from dicom_api.health import HealthMonitor
+            started = time.perf_counter()
+            results = HealthMonitor().check_concurrently(destinations, timeout, deadline)
+            return Response({
+                'results': results,
+                'reachable': sum(1 for result in results if result['success']),
+                'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response({
+                'error': f'Test failed: {str(e)}'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @staticmethod
+    def _seconds(value, limit: float) -> float:
+        """A positive number of seconds from the request, at most limit."""
+        if value in (None, ''):
+            return limit
+        try:
+            seconds = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'Invalid number of seconds: {value}')
+        if seconds <= 0:
+            raise ValueError('Seconds must be positive')
+        return min(seconds, limit)
+
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def test_connection(self, request, pk=None):
         """
         Test connectivity to a DICOM destination.
+
+        Starts a C-ECHO in the background and answers right away with the
+        last known result; poll the health action for the new one.
         """
         destination = self.get_object()
         
         try:
-            from dicom_api.services import DICOMTransferService
-            transfer_service = DICOMTransferService()
-            result = transfer_service.test_destination(destination)
-            
-            return Response(result, status=status.HTTP_200_OK)
+            from dicom_api.health import HealthMonitor
+            HealthMonitor().probe_in_background(destination)
+            health = destination_health(destination)
+
+            return Response({
+                'success': destination.is_reachable(),
+                'message': health['message'] if health else 'Not checked yet',
+                'details': '',
+                'response_time': health['latency_ms'] if health else None,
+                'checked_at': health['checked_at'] if health else None,
+                'checking': True,
+            }, status=status.HTTP_202_ACCEPTED)
             
         except Exception as e:
             return Response({
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class DicomApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "dicom_api"
+
+    def ready(self):
+        # A bad egress cap fails the process at startup rather than every send
+        from .bandwidth import check_egress_settings
+        check_egress_settings()
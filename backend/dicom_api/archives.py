@@ -0,0 +1,129 @@
+import os
+import logging
+import shutil
+import tarfile
+import zipfile
+from typing import Dict, Iterator, Optional, Tuple
+
+from django.conf import settings
+
+from .services import DICOMParser, DICM_PREFIX, DICM_PREFIX_OFFSET, unique_file_path
+
+logger = logging.getLogger('dicom_transfer')
+
+# Extensions of compressed tarballs; a bare gzip/bz2/xz stream is not an archive
+TAR_EXTENSIONS = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+COMPRESSED_MAGIC = (b'\x1f\x8b', b'BZh', b'\xfd7zXZ\x00')
+ZIP_MAGIC = b'PK\x03\x04'
+TAR_MAGIC_OFFSET = 257
+TAR_MAGIC = b'ustar'
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def archive_format(file_path: str, file_name: str = '') -> Optional[str]:
+    """
+    Detect whether a saved upload is a ZIP or TAR archive.
+
+    Args:
+        file_path: Path of the saved upload
+        file_name: Original upload name, used for compressed tarballs
+
+    Returns:
+        'zip', 'tar' or None if the file is not an archive
+    """
+    try:
+        with open(file_path, 'rb') as fp:
+            head = fp.read(512)
+    except OSError:
+        return None
+
+    if head[DICM_PREFIX_OFFSET:DICM_PREFIX_OFFSET + len(DICM_PREFIX)] == DICM_PREFIX:
+        return None
+    if head.startswith(ZIP_MAGIC):
+        return 'zip'
+    if head[TAR_MAGIC_OFFSET:TAR_MAGIC_OFFSET + len(TAR_MAGIC)] == TAR_MAGIC:
+        return 'tar'
+    name = (file_name or file_path).lower()
+    if head.startswith(COMPRESSED_MAGIC) and name.endswith(TAR_EXTENSIONS):
+        return 'tar'
+    return None
+
+
+class DICOMArchiveExtractor:
+    """
+    Extracts the DICOM members of a ZIP or TAR archive one at a time.
+
+    Each member is streamed straight to the import session directory.
+    Only the leading bytes are inspected first, so non-DICOM members
+    (DICOMDIR viewers, PDFs, ...) are skipped without being written, and
+    the archive is never unpacked or buffered as a whole. Members must
+    carry the Part 10 'DICM' prefix to be imported.
+    """
+
+    def __init__(self, parser: Optional[DICOMParser] = None):
+        self.parser = parser or DICOMParser()
+        self.capture_bytes = getattr(settings, 'DICOM_HEADER_CAPTURE_BYTES', 256 * 1024)
+        self.skipped = 0
+
+    def extract(self, archive_path: str, dest_dir: str,
+                file_name: str = '') -> Iterator[Tuple[str, str, Optional[Dict]]]:
+        """
+        Stream DICOM members of an archive into dest_dir.
+
+        Args:
+            archive_path: Path of the archive on disk
+            dest_dir: Import session directory
+            file_name: Original upload name, used for format detection
+
+        Yields:
+            (member name, extracted path, header metadata or None) tuples
+        """
+        fmt = archive_format(archive_path, file_name)
+        if fmt == 'zip':
+            members = self._zip_members(archive_path)
+        elif fmt == 'tar':
+            members = self._tar_members(archive_path)
+        else:
+            return
+
+        for member_name, stream in members:
+            result = self._extract_member(member_name, stream, dest_dir)
+            if result:
+                yield result
+
+    def _zip_members(self, archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                with archive.open(info) as stream:
+                    yield info.filename, stream
+
+    def _tar_members(self, archive_path):
+        # Stream mode reads the archive front to back without seeking
+        with tarfile.open(archive_path, mode='r|*') as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                stream = archive.extractfile(member)
+                if stream is None:
+                    continue
+                yield member.name, stream
+
+    def _extract_member(self, member_name, stream, dest_dir):
+        """Write one member if it is DICOM, parsing its header on the way."""
+        header = stream.read(self.capture_bytes)
+        if header[DICM_PREFIX_OFFSET:DICM_PREFIX_OFFSET + len(DICM_PREFIX)] != DICM_PREFIX:
+            self.skipped += 1
+            logger.debug(f"Skipping non-DICOM archive member: {member_name}")
+            return None
+
+        file_path = unique_file_path(dest_dir, member_name)
+        with open(file_path, 'wb') as destination:
+            destination.write(header)
+            shutil.copyfileobj(stream, destination, COPY_BUFFER_SIZE)
+
+        complete = os.path.getsize(file_path) <= len(header)
+        metadata = self.parser.parse_header(header, file_path, complete=complete)
+        return member_name, file_path, metadata
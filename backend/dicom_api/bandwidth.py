@@ -0,0 +1,203 @@
+import time
+import threading
+from datetime import datetime, time as clock_time
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+
+def parse_schedule(entries) -> List[Dict]:
+    """
+    Validate a time-of-day bandwidth schedule.
+
+    Each entry is {'start': 'HH:MM', 'end': 'HH:MM', 'limit_kbps': int}; a
+    window whose end is not after its start runs past midnight. A limit of
+    0 lifts the cap during the window.
+
+    Returns:
+        Entries with start and end parsed to datetime.time
+
+    Raises:
+        ValueError: On a malformed entry
+    """
+    if entries in (None, ''):
+        return []
+    if not isinstance(entries, list):
+        raise ValueError('Bandwidth schedule must be a list of windows')
+    windows = []
+    for entry in entries:
+        if not isinstance(entry, dict) or not {'start', 'end', 'limit_kbps'} <= set(entry):
+            raise ValueError('Each bandwidth window needs start, end and limit_kbps')
+        try:
+            start = datetime.strptime(str(entry['start']), '%H:%M').time()
+            end = datetime.strptime(str(entry['end']), '%H:%M').time()
+        except ValueError:
+            raise ValueError(f"Invalid bandwidth window time in {entry} (use HH:MM)")
+        limit = entry['limit_kbps']
+        if isinstance(limit, bool) or not isinstance(limit, int) or limit < 0:
+            raise ValueError(f"limit_kbps must be a non-negative integer in {entry}")
+        windows.append({'start': start, 'end': end, 'limit_kbps': limit})
+    return windows
+
+
+def scheduled_limit(default_kbps: int, schedule, at: Optional[clock_time] = None) -> int:
+    """
+    Bandwidth limit in kbit/s in force at a local time of day.
+
+    The first schedule window containing the time wins; outside every
+    window the default applies. 0 means unlimited.
+    """
+    at = at or timezone.localtime().time().replace(second=0, microsecond=0)
+    for window in parse_schedule(schedule):
+        start, end = window['start'], window['end']
+        inside = start <= at < end if start < end else (at >= start or at < end)
+        if inside:
+            return window['limit_kbps']
+    return default_kbps or 0
+
+
+def shaping_supported() -> bool:
+    """Whether sends go through the C-STORE engine, the only one that enforces caps."""
+    from .dimse import dimse_available
+    return getattr(settings, 'DICOM_SEND_ENGINE', 'dimse') == 'dimse' and dimse_available()
+
+
+def check_egress_settings():
+    """
+    Validate DICOM_EGRESS_LIMIT_KBPS and DICOM_EGRESS_SCHEDULE at startup.
+
+    Raises:
+        ImproperlyConfigured: On a malformed schedule, a negative limit, or
+            a cap set while sends go through storescu, which cannot enforce it
+    """
+    limit = getattr(settings, 'DICOM_EGRESS_LIMIT_KBPS', 0)
+    if limit < 0:
+        raise ImproperlyConfigured('DICOM_EGRESS_LIMIT_KBPS must not be negative')
+    try:
+        schedule = parse_schedule(getattr(settings, 'DICOM_EGRESS_SCHEDULE', None))
+    except ValueError as e:
+        raise ImproperlyConfigured(f"Invalid DICOM_EGRESS_SCHEDULE: {str(e)}")
+    if (limit or any(window['limit_kbps'] for window in schedule)) and not shaping_supported():
+        raise ImproperlyConfigured(
+            "DICOM_EGRESS_LIMIT_KBPS and DICOM_EGRESS_SCHEDULE need DICOM_SEND_ENGINE='dimse' "
+            "with pynetdicom installed; storescu sends are not shaped"
+        )
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket metering bytes at a rate in bytes per second.
+
+    Tokens refill continuously up to burst_seconds worth of the rate. A
+    sender takes tokens for what it is about to send; the balance may go
+    negative so files larger than the burst can pass, and the next sender
+    waits until it is paid back. A rate of 0 lets everything through.
+    """
+
+    def __init__(self, rate: float = 0, burst_seconds: float = 1.0):
+        self.rate = rate
+        self.burst_seconds = burst_seconds
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    @property
+    def capacity(self) -> float:
+        return self.rate * self.burst_seconds
+
+    def set_rate(self, rate: float):
+        """Change the rate, keeping the tokens earned at the old one (a newly capped bucket starts full)."""
+        with self.lock:
+            if rate == self.rate:
+                return
+            self._refill()
+            was_unlimited = self.rate <= 0
+            self.rate = rate
+            self.tokens = self.capacity if was_unlimited else min(self.tokens, self.capacity)
+
+    def reserve(self, amount: int) -> float:
+        """
+        Take amount tokens.
+
+        Returns:
+            Seconds the caller must wait before sending
+        """
+        with self.lock:
+            if self.rate <= 0:
+                return 0.0
+            self._refill()
+            self.tokens -= amount
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate > 0:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class BandwidthShaper:
+    """
+    Egress caps of this process, per destination and overall.
+
+    Each destination has a bucket at its bandwidth_limit_kbps (or the limit
+    of its bandwidth_schedule window now in force), and every send also
+    draws from a global bucket at DICOM_EGRESS_LIMIT_KBPS / DICOM_EGRESS_SCHEDULE.
+    Limits are re-read on every throttle, so schedule windows take effect
+    as the clock passes them. Caps are per process; run one transfer worker
+    process per egress link for the global cap to hold.
+    """
+
+    def __init__(self, burst_seconds: Optional[float] = None):
+        self.burst_seconds = burst_seconds or getattr(settings, 'DICOM_BANDWIDTH_BURST_SECONDS', 1.0)
+        self.global_bucket = TokenBucket(burst_seconds=self.burst_seconds)
+        self.buckets: Dict[int, TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def destination_limit(destination) -> int:
+        """kbit/s cap of a destination in force now, 0 if unlimited."""
+        return scheduled_limit(
+            getattr(destination, 'bandwidth_limit_kbps', 0), getattr(destination, 'bandwidth_schedule', None)
+        )
+
+    @staticmethod
+    def global_limit() -> int:
+        """kbit/s cap of all egress in force now, 0 if unlimited."""
+        return scheduled_limit(
+            getattr(settings, 'DICOM_EGRESS_LIMIT_KBPS', 0), getattr(settings, 'DICOM_EGRESS_SCHEDULE', None)
+        )
+
+    def throttle(self, destination, nbytes: int) -> float:
+        """
+        Wait until nbytes may be sent to destination under both caps.
+
+        Returns:
+            Seconds waited
+        """
+        with self.lock:
+            bucket = self.buckets.get(destination.pk)
+            if bucket is None:
+                bucket = self.buckets[destination.pk] = TokenBucket(burst_seconds=self.burst_seconds)
+        bucket.set_rate(self.destination_limit(destination) * 1000 / 8)
+        self.global_bucket.set_rate(self.global_limit() * 1000 / 8)
+
+        wait = max(bucket.reserve(nbytes), self.global_bucket.reserve(nbytes))
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+_bandwidth_shaper = None
+_bandwidth_shaper_lock = threading.Lock()
+
+
+def get_bandwidth_shaper() -> BandwidthShaper:
+    """Return the bandwidth shaper shared by all senders in this process."""
+    global _bandwidth_shaper
+    with _bandwidth_shaper_lock:
+        if _bandwidth_shaper is None:
+            _bandwidth_shaper = BandwidthShaper()
+        return _bandwidth_shaper
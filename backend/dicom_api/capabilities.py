@@ -0,0 +1,61 @@
+import logging
+from datetime import timedelta
+from typing import Dict, Iterable, Set, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from destinations.models import DestinationCapability
+
+logger = logging.getLogger('dicom_transfer')
+
+
+class CapabilityCache:
+    """
+    Presentation contexts each destination accepted or rejected.
+
+    Every association records the outcome of the contexts it proposed.
+    Entries are trusted for DICOM_CAPABILITY_TTL seconds, after which the
+    context is proposed again as if it had never been negotiated.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = timedelta(seconds=ttl if ttl is not None else getattr(
+            settings, 'DICOM_CAPABILITY_TTL', 7 * 24 * 60 * 60
+        ))
+
+    def lookup(self, destination) -> Dict[Tuple[str, str], bool]:
+        """
+        Get the unexpired negotiation outcomes of a destination.
+
+        Returns:
+            Mapping of (SOP class UID, transfer syntax UID) to accepted
+        """
+        rows = DestinationCapability.objects.filter(
+            destination=destination,
+            negotiated_at__gte=timezone.now() - self.ttl,
+        ).values_list('sop_class_uid', 'transfer_syntax_uid', 'accepted')
+        return {(sop_class_uid, transfer_syntax_uid): accepted for sop_class_uid, transfer_syntax_uid, accepted in rows}
+
+    def record(self, destination, proposed: Iterable[Tuple[str, str]], accepted: Set[Tuple[str, str]]):
+        """Store the outcome of every proposed (SOP class, transfer syntax) pair."""
+        now = timezone.now()
+        DestinationCapability.objects.bulk_create(
+            [
+                DestinationCapability(
+                    destination=destination,
+                    sop_class_uid=sop_class_uid,
+                    transfer_syntax_uid=transfer_syntax_uid,
+                    accepted=(sop_class_uid, transfer_syntax_uid) in accepted,
+                    negotiated_at=now,
+                )
+                for sop_class_uid, transfer_syntax_uid in proposed
+            ],
+            update_conflicts=True,
+            unique_fields=['destination', 'sop_class_uid', 'transfer_syntax_uid'],
+            update_fields=['accepted', 'negotiated_at'],
+        )
+
+    def invalidate(self, destination):
+        """Forget everything negotiated with a destination."""
+        DestinationCapability.objects.filter(destination=destination).delete()
@@ -0,0 +1,588 @@
+import os
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from django.conf import settings
+from pydicom.dataset import Dataset
+from pydicom.filereader import read_file_meta_info
+from pydicom.uid import ExplicitVRLittleEndian, ImplicitVRLittleEndian
+
+try:
+    from pynetdicom import AE, build_context
+    from pynetdicom._globals import DEFAULT_MAX_LENGTH
+    from pynetdicom.pdu_primitives import P_DATA
+    from pynetdicom.sop_class import StudyRootQueryRetrieveInformationModelFind, Verification
+except ImportError:  # pragma: no cover - optional dependency
+    AE = None
+    build_context = None
+    DEFAULT_MAX_LENGTH = 16382
+    P_DATA = None
+    StudyRootQueryRetrieveInformationModelFind = None
+    Verification = None
+
+from .bandwidth import BandwidthShaper, get_bandwidth_shaper
+from .capabilities import CapabilityCache
+
+logger = logging.getLogger('dicom_transfer')
+
+# Uncompressed syntaxes proposed for every SOP class so files can be converted as a fallback
+FALLBACK_TRANSFER_SYNTAXES = [ExplicitVRLittleEndian, ImplicitVRLittleEndian]
+
+# A-ASSOCIATE-RQ may carry at most 128 presentation contexts
+MAX_PRESENTATION_CONTEXTS = 128
+
+# DIMSE status categories treated as stored (Success and Warning)
+STORED_STATUSES = {0x0000, 0x0001, 0x0107, 0x0116, 0xB000, 0xB006, 0xB007}
+
+# C-FIND statuses that carry a matching identifier
+PENDING_STATUSES = {0xFF00, 0xFF01}
+
+
+def dimse_available() -> bool:
+    """Whether the in-process C-STORE engine can be used."""
+    return AE is not None
+
+
+def read_instance_info(file_path: str) -> Dict:
+    """
+    Read the SOP Class, SOP Instance and Transfer Syntax UIDs from the File Meta.
+    """
+    meta = read_file_meta_info(file_path)
+    return {
+        'file_path': file_path,
+        'sop_class_uid': str(getattr(meta, 'MediaStorageSOPClassUID', '')),
+        'sop_instance_uid': str(getattr(meta, 'MediaStorageSOPInstanceUID', '')),
+        'transfer_syntax_uid': str(getattr(meta, 'TransferSyntaxUID', '')),
+    }
+
+
+class AssociationError(Exception):
+    """Raised when an association cannot be established with a destination."""
+
+
+class PooledAssociation:
+    """
+    An established association together with the contexts it accepted.
+    """
+
+    def __init__(self, key, assoc):
+        self.key = key
+        self.assoc = assoc
+        self.accepted: Set[Tuple[str, str]] = {
+            (str(cx.abstract_syntax), str(cx.transfer_syntax[0]))
+            for cx in assoc.accepted_contexts
+        }
+        self.in_use = False
+        self.last_used = time.monotonic()
+        self.destination = None
+        self.shaper: Optional[BandwidthShaper] = None
+
+    def meter(self, destination, shaper: BandwidthShaper):
+        """
+        Throttle the P-DATA PDUs sent on this association under destination's caps.
+
+        Each PDU waits for the shaper as DIMSE hands it to the DUL, so a
+        file larger than the burst leaves at the capped rate instead of in
+        one burst ahead of its C-STORE.
+        """
+        first = self.shaper is None
+        self.destination = destination
+        self.shaper = shaper
+        if not first:
+            return
+        dul = self.assoc.dul
+        queue_pdu = dul.send_pdu
+        if not self.assoc.acceptor.maximum_length:
+            # A peer without a PDU limit would otherwise get each file as a single PDU
+            self.assoc.acceptor.maximum_length = DEFAULT_MAX_LENGTH
+
+        def send_pdu(primitive):
+            if isinstance(primitive, P_DATA):
+                nbytes = sum(len(value) for _context_id, value in primitive.presentation_data_value_list)
+                self.shaper.throttle(self.destination, nbytes)
+            queue_pdu(primitive)
+
+        dul.send_pdu = send_pdu
+
+    @property
+    def is_alive(self) -> bool:
+        return bool(self.assoc.is_established)
+
+    def accepts(self, sop_class_uid: str, transfer_syntax_uid: str) -> bool:
+        """Whether an instance can be sent with this syntax on this association."""
+        return (sop_class_uid, transfer_syntax_uid) in self.accepted
+
+    def accepted_syntaxes(self, sop_class_uid: str) -> Set[str]:
+        """Transfer syntaxes accepted for a SOP class."""
+        return {ts for sop, ts in self.accepted if sop == sop_class_uid}
+
+    def covers(self, required: Set[Tuple[str, str]]) -> bool:
+        """
+        Whether every required SOP class can be sent, either in its own
+        transfer syntax or in an uncompressed fallback syntax.
+        """
+        for sop_class_uid, transfer_syntax_uid in required:
+            if self.accepts(sop_class_uid, transfer_syntax_uid):
+                continue
+            if not any(self.accepts(sop_class_uid, str(ts)) for ts in FALLBACK_TRANSFER_SYNTAXES):
+                return False
+        return True
+
+    def close(self):
+        try:
+            if self.assoc.is_established:
+                self.assoc.release()
+        except Exception as e:
+            logger.debug(f"Error releasing association: {str(e)}")
+
+
+class AssociationPool:
+    """
+    Keeps warm associations per destination and hands them out to senders.
+
+    An idle association is reused when its accepted presentation contexts
+    cover the SOP classes and transfer syntaxes of the next series; otherwise
+    a new one is negotiated. Associations idle for longer than
+    DICOM_ASSOCIATION_IDLE_TIMEOUT seconds are released by a reaper thread.
+    """
+
+    def __init__(self, calling_ae_title: Optional[str] = None, idle_timeout: Optional[float] = None,
+                 capabilities: Optional[CapabilityCache] = None):
+        self.capabilities = capabilities or CapabilityCache()
+        self.calling_ae_title = calling_ae_title or getattr(settings, 'DICOM_CALLING_AE_TITLE', 'TELEPOST')
+        self.idle_timeout = idle_timeout if idle_timeout is not None else getattr(
+            settings, 'DICOM_ASSOCIATION_IDLE_TIMEOUT', 60
+        )
+        self.network_timeout = getattr(settings, 'DICOM_NETWORK_TIMEOUT', 60)
+        self._pool: Dict[tuple, List[PooledAssociation]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reaper = threading.Thread(target=self._reap, name='association-reaper', daemon=True)
+        self._reaper.start()
+
+    @staticmethod
+    def destination_key(destination) -> tuple:
+        """Editing a destination's address or AE title yields a new pool key."""
+        return (destination.id, destination.ae_title, destination.host, int(destination.port))
+
+    def acquire(self, destination, required: Set[Tuple[str, str]]) -> PooledAssociation:
+        """
+        Get an association to destination able to carry the required contexts.
+
+        Raises:
+            AssociationError: if the destination rejects or cannot be reached
+        """
+        key = self.destination_key(destination)
+        with self._lock:
+            for pooled in list(self._pool.get(key, [])):
+                if pooled.in_use:
+                    continue
+                if not pooled.is_alive:
+                    self._pool[key].remove(pooled)
+                    continue
+                if pooled.covers(required):
+                    pooled.in_use = True
+                    return pooled
+
+        pooled = PooledAssociation(key, self._associate(destination, required))
+        pooled.in_use = True
+        with self._lock:
+            self._pool.setdefault(key, []).append(pooled)
+        return pooled
+
+    def release(self, pooled: PooledAssociation, reusable: bool = True):
+        """Return an association to the pool, or close it if it cannot be reused."""
+        with self._lock:
+            pooled.in_use = False
+            pooled.last_used = time.monotonic()
+            if reusable and pooled.is_alive:
+                return
+            entries = self._pool.get(pooled.key, [])
+            if pooled in entries:
+                entries.remove(pooled)
+        pooled.close()
+
+    def close_idle(self, max_idle: Optional[float] = None) -> int:
+        """
+        Release associations unused for longer than max_idle seconds.
+
+        Returns:
+            Number of associations closed
+        """
+        max_idle = self.idle_timeout if max_idle is None else max_idle
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for key, entries in self._pool.items():
+                for pooled in list(entries):
+                    if not pooled.in_use and (now - pooled.last_used >= max_idle or not pooled.is_alive):
+                        entries.remove(pooled)
+                        expired.append(pooled)
+        for pooled in expired:
+            pooled.close()
+        return len(expired)
+
+    def close_all(self):
+        """Release every idle association and stop the reaper."""
+        self._stop.set()
+        self.close_idle(max_idle=0)
+
+    def _reap(self):
+        while not self._stop.wait(max(1.0, self.idle_timeout / 2)):
+            try:
+                self.close_idle()
+            except Exception as e:
+                logger.warning(f"Association reaper failed: {str(e)}")
+
+    def _associate(self, destination, required: Set[Tuple[str, str]]):
+        """Negotiate a new association proposing each file syntax plus the fallbacks."""
+        syntaxes: Dict[str, List[str]] = {}
+        for sop_class_uid, transfer_syntax_uid in sorted(required):
+            proposed = syntaxes.setdefault(sop_class_uid, [str(ts) for ts in FALLBACK_TRANSFER_SYNTAXES])
+            if transfer_syntax_uid and transfer_syntax_uid not in proposed:
+                proposed.insert(0, transfer_syntax_uid)
+
+        contexts = []
+        proposed_pairs = set()
+        for sop_class_uid, proposed in syntaxes.items():
+            # One context per syntax so the SCP can accept each independently
+            for transfer_syntax_uid in proposed:
+                contexts.append(build_context(sop_class_uid, transfer_syntax_uid))
+                proposed_pairs.add((sop_class_uid, transfer_syntax_uid))
+        if len(contexts) > MAX_PRESENTATION_CONTEXTS:
+            raise AssociationError(
+                f"Series needs {len(contexts)} presentation contexts, more than the "
+                f"{MAX_PRESENTATION_CONTEXTS} an association allows"
+            )
+
+        ae = AE(ae_title=self.calling_ae_title)
+        ae.network_timeout = self.network_timeout
+        ae.acse_timeout = self.network_timeout
+        ae.dimse_timeout = self.network_timeout
+        assoc = ae.associate(
+            destination.host,
+            int(destination.port),
+            contexts=contexts,
+            ae_title=destination.ae_title,
+        )
+        if not assoc.is_established:
+            if assoc.is_rejected:
+                raise AssociationError(f"Association rejected by {destination.ae_title}")
+            raise AssociationError(
+                f"Could not associate with {destination.ae_title}@{destination.host}:{destination.port}"
+            )
+        logger.info(
+            f"Opened association to {destination.ae_title}@{destination.host}:{destination.port} "
+            f"({len(assoc.accepted_contexts)} contexts accepted)"
+        )
+        accepted_pairs = {
+            (str(cx.abstract_syntax), str(cx.transfer_syntax[0])) for cx in assoc.accepted_contexts
+        }
+        try:
+            self.capabilities.record(destination, proposed_pairs, accepted_pairs)
+        except Exception as e:
+            logger.warning(f"Could not record capabilities of {destination.ae_title}: {str(e)}")
+        return assoc
+
+
+_association_pool = None
+_association_pool_lock = threading.Lock()
+
+
+def get_association_pool() -> AssociationPool:
+    """Return the association pool shared by all senders in this process."""
+    global _association_pool
+    with _association_pool_lock:
+        if _association_pool is None:
+            _association_pool = AssociationPool()
+        return _association_pool
+
+
+def shutdown_association_pool():
+    """Release every pooled association, if the pool was ever used."""
+    global _association_pool
+    with _association_pool_lock:
+        pool, _association_pool = _association_pool, None
+    if pool is not None:
+        pool.close_all()
+
+
+def find_series_instances(destination, study_instance_uid: str, series_instance_uid: str) -> Set[str]:
+    """
+    Ask a destination which instances of a series it holds.
+
+    Sends one Study Root C-FIND at IMAGE level on its own association;
+    storage associations in the pool do not carry the query context.
+
+    Returns:
+        SOP Instance UIDs the destination reported
+
+    Raises:
+        AssociationError: if the destination rejects or cannot be reached
+        RuntimeError: if pynetdicom is missing or the query fails
+    """
+    if not dimse_available():
+        raise RuntimeError("pynetdicom is not installed")
+
+    timeout = getattr(settings, 'DICOM_NETWORK_TIMEOUT', 60)
+    ae = AE(ae_title=getattr(settings, 'DICOM_CALLING_AE_TITLE', 'TELEPOST'))
+    ae.network_timeout = timeout
+    ae.acse_timeout = timeout
+    ae.dimse_timeout = timeout
+    ae.add_requested_context(StudyRootQueryRetrieveInformationModelFind)
+    assoc = ae.associate(destination.host, int(destination.port), ae_title=destination.ae_title)
+    if not assoc.is_established:
+        raise AssociationError(
+            f"Could not associate with {destination.ae_title}@{destination.host}:{destination.port} for C-FIND"
+        )
+
+    query = Dataset()
+    query.QueryRetrieveLevel = 'IMAGE'
+    query.StudyInstanceUID = study_instance_uid
+    query.SeriesInstanceUID = series_instance_uid
+    query.SOPInstanceUID = ''
+
+    found = set()
+    try:
+        for status, identifier in assoc.send_c_find(query, StudyRootQueryRetrieveInformationModelFind):
+            code = getattr(status, 'Status', None)
+            if code is None:
+                raise RuntimeError("No response to C-FIND (association aborted or timed out)")
+            if code in PENDING_STATUSES:
+                uid = getattr(identifier, 'SOPInstanceUID', '') if identifier is not None else ''
+                if uid:
+                    found.add(str(uid))
+            elif code != 0x0000:
+                raise RuntimeError(f"C-FIND failed with status 0x{code:04X}")
+    finally:
+        if assoc.is_established:
+            assoc.release()
+    return found
+
+
+def echo_destination(destination, timeout: Optional[float] = None) -> float:
+    """
+    C-ECHO a destination on its own association.
+
+    Returns:
+        Round-trip time of the association and echo, in seconds
+
+    Raises:
+        AssociationError: if the destination rejects or cannot be reached
+        RuntimeError: if pynetdicom is missing or the echo fails
+    """
+    if not dimse_available():
+        raise RuntimeError("pynetdicom is not installed")
+
+    timeout = timeout or getattr(settings, 'DICOM_ECHO_TIMEOUT', 10)
+    ae = AE(ae_title=getattr(settings, 'DICOM_CALLING_AE_TITLE', 'TELEPOST'))
+    ae.network_timeout = timeout
+    ae.acse_timeout = timeout
+    ae.dimse_timeout = timeout
+    ae.connection_timeout = timeout
+    ae.add_requested_context(Verification)
+
+    started = time.perf_counter()
+    assoc = ae.associate(destination.host, int(destination.port), ae_title=destination.ae_title)
+    if not assoc.is_established:
+        if assoc.is_rejected:
+            raise AssociationError(f"Association rejected by {destination.ae_title}")
+        raise AssociationError(
+            f"Could not associate with {destination.ae_title}@{destination.host}:{destination.port}"
+        )
+    try:
+        status = assoc.send_c_echo()
+        code = getattr(status, 'Status', None)
+        if code is None:
+            raise RuntimeError("No response to C-ECHO (association aborted or timed out)")
+        if code != 0x0000:
+            raise RuntimeError(f"C-ECHO failed with status 0x{code:04X}")
+        return time.perf_counter() - started
+    finally:
+        if assoc.is_established:
+            assoc.release()
+
+
+class CStoreEngine:
+    """
+    In-process C-STORE sender built on pynetdicom and the association pool.
+
+    Files go out untouched whenever the association accepted their own
+    transfer syntax. Otherwise the convert callback is called with the file
+    path, the syntaxes accepted for its SOP class and an accepted
+    uncompressed target syntax, and the converted copy is sent instead.
+
+    Sends are planned from the destination's cached capabilities: syntaxes
+    it is known to reject are not proposed again, and those files are
+    converted before the association is acquired.
+
+    Every P-DATA PDU waits for the bandwidth shaper before it is queued
+    for the peer, so the destination's and the global egress caps hold at
+    PDU granularity, even for files larger than the burst.
+    """
+
+    def __init__(self, pool: Optional[AssociationPool] = None,
+                 convert: Optional[Callable[[str, Set[str], str], Optional[str]]] = None,
+                 shaper: Optional[BandwidthShaper] = None):
+        if not dimse_available():
+            raise RuntimeError("pynetdicom is not installed")
+        self.pool = pool or get_association_pool()
+        self.convert = convert
+        self.shaper = shaper or get_bandwidth_shaper()
+
+    def send_series(self, destination, file_paths: List[str],
+                    on_result: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+        """
+        Send files to destination over a pooled association.
+
+        Args:
+            destination: Destination model instance
+            file_paths: DICOM files to send
+            on_result: Called with each per-instance result as it happens
+
+        Returns:
+            One result dict per file with file_path, sop_instance_uid,
+            status ('success' or 'failed'), dimse_status, bytes, sent_path,
+            converted (None if the file was never sent) and error.
+
+        Raises:
+            AssociationError: if no association could be established
+        """
+        instances = []
+        results = []
+        for file_path in file_paths:
+            try:
+                instance = read_instance_info(file_path)
+            except Exception as e:
+                results.append(self._result(file_path, '', 'failed', error=f"Unreadable file: {str(e)}"))
+            else:
+                if instance['sop_class_uid']:
+                    instances.append(instance)
+                    continue
+                # No presentation context can be proposed without a SOP class
+                results.append(self._result(
+                    file_path, instance['sop_instance_uid'], 'failed',
+                    error="No Media Storage SOP Class UID in the File Meta",
+                ))
+            if on_result:
+                on_result(results[-1])
+
+        if not instances:
+            return results
+
+        required = self._plan(destination, instances)
+        pooled = self.pool.acquire(destination, required)
+        pooled.meter(destination, self.shaper)
+        reusable = True
+        try:
+            for index, instance in enumerate(instances):
+                if not pooled.is_alive:
+                    # Peer released or aborted; continue on a fresh association
+                    self.pool.release(pooled, reusable=False)
+                    pooled = self.pool.acquire(
+                        destination,
+                        {(i['sop_class_uid'], i['send_syntax']) for i in instances[index:]},
+                    )
+                    pooled.meter(destination, self.shaper)
+                result = self._send_instance(pooled, instance)
+                results.append(result)
+                if on_result:
+                    on_result(result)
+        except Exception:
+            reusable = False
+            raise
+        finally:
+            self.pool.release(pooled, reusable=reusable)
+        return results
+
+    def _plan(self, destination, instances: List[Dict]) -> Set[Tuple[str, str]]:
+        """
+        Decide per instance whether it is sent as-is or converted up front.
+
+        Sets send_path and send_syntax on each instance and returns the
+        (SOP class, transfer syntax) pairs the association must carry. An
+        empty syntax means only the uncompressed fallbacks are needed.
+        """
+        known = self.pool.capabilities.lookup(destination)
+        required = set()
+        for instance in instances:
+            sop_class_uid = instance['sop_class_uid']
+            transfer_syntax_uid = instance['transfer_syntax_uid']
+            instance['send_path'] = instance['file_path']
+            instance['send_syntax'] = transfer_syntax_uid
+
+            if known.get((sop_class_uid, transfer_syntax_uid)) is False and self.convert:
+                accepted = {ts for (sop, ts), ok in known.items() if ok and sop == sop_class_uid}
+                target = next(
+                    (str(ts) for ts in FALLBACK_TRANSFER_SYNTAXES if str(ts) in accepted),
+                    str(FALLBACK_TRANSFER_SYNTAXES[0]),
+                )
+                send_path = self.convert(instance['file_path'], accepted, target)
+                if send_path and send_path != instance['file_path']:
+                    instance['send_path'] = send_path
+                    instance['send_syntax'] = target
+                    required.add((sop_class_uid, ''))
+                    continue
+            required.add((sop_class_uid, transfer_syntax_uid))
+        return required
+
+    def _send_instance(self, pooled: PooledAssociation, instance: Dict) -> Dict:
+        file_path = instance['file_path']
+        sop_instance_uid = instance['sop_instance_uid']
+        sop_class_uid = instance['sop_class_uid']
+        send_path = instance.get('send_path', file_path)
+
+        if not pooled.accepts(sop_class_uid, instance.get('send_syntax', instance['transfer_syntax_uid'])):
+            target = next(
+                (str(ts) for ts in FALLBACK_TRANSFER_SYNTAXES if pooled.accepts(sop_class_uid, str(ts))),
+                None,
+            )
+            if target and self.convert:
+                send_path = self.convert(file_path, pooled.accepted_syntaxes(sop_class_uid), target)
+            else:
+                send_path = None
+            if not send_path or send_path == file_path:
+                return self._result(
+                    file_path, sop_instance_uid, 'failed',
+                    error=f"No accepted presentation context for {sop_class_uid}",
+                )
+        converted = send_path != file_path
+
+        try:
+            status = pooled.assoc.send_c_store(send_path)
+        except Exception as e:
+            return self._result(
+                file_path, sop_instance_uid, 'failed', sent_path=send_path, converted=converted, error=str(e)
+            )
+
+        dimse_status = getattr(status, 'Status', None)
+        if dimse_status is None:
+            return self._result(
+                file_path, sop_instance_uid, 'failed', sent_path=send_path, converted=converted,
+                error="No response from destination (association aborted or timed out)",
+            )
+        if dimse_status in STORED_STATUSES:
+            return self._result(
+                file_path, sop_instance_uid, 'success', dimse_status,
+                os.path.getsize(send_path), sent_path=send_path, converted=converted,
+            )
+        return self._result(
+            file_path, sop_instance_uid, 'failed', dimse_status, sent_path=send_path, converted=converted,
+            error=f"C-STORE failed with status 0x{dimse_status:04X}",
+        )
+
+    @staticmethod
+    def _result(file_path, sop_instance_uid, status, dimse_status=None, size=0, sent_path=None,
+                converted=None, error=''):
+        return {
+            'file_path': file_path,
+            'sop_instance_uid': sop_instance_uid,
+            'status': status,
+            'dimse_status': dimse_status,
+            'bytes': size,
+            'sent_path': sent_path or file_path,
+            'converted': converted,
+            'error': error,
+        }
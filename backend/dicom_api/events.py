@@ -0,0 +1,176 @@
+import json
+import queue
+import select
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from django.db import close_old_connections, connection
+
+logger = logging.getLogger('dicom_transfer')
+
+# Postgres channel carrying the IDs of transfer logs whose status changed
+TRANSFER_STATUS_CHANNEL = 'dicom_transfer_status'
+
+LISTEN_RECONNECT_SECONDS = 5
+
+
+def transfer_status_entry(transfer_log) -> Dict:
+    """Status of one series transfer in the format served to the dashboard."""
+    return {
+        'id': transfer_log.series_id or (transfer_log.details or {}).get('series_id'),
+        'log_id': transfer_log.id,
+        'batch_id': transfer_log.batch_id,
+        'status': transfer_log.status,
+        'message': transfer_log.error_message or '',
+        'timestamp': transfer_log.timestamp.isoformat() if transfer_log.timestamp else None,
+        'completed_at': transfer_log.completed_at.isoformat() if transfer_log.completed_at else None,
+        'destination': transfer_log.destination.name if transfer_log.destination else '',
+        'patient_name': transfer_log.patient_name,
+        'series_description': transfer_log.series_description,
+        'instance_count': transfer_log.instance_count,
+        'files_succeeded': transfer_log.files_succeeded,
+        'files_failed': transfer_log.files_failed,
+        'bytes_transferred': transfer_log.bytes_transferred,
+        'files_skipped': transfer_log.files_skipped,
+        'bytes_skipped': transfer_log.bytes_skipped,
+    }
+
+
+class Subscription:
+    """Status changes of one user's transfers, filtered by series or batch."""
+
+    def __init__(self, user_id: int, series_ids: Iterable[str] = (), batch_id: Optional[str] = None):
+        self.user_id = user_id
+        self.series_ids = set(series_ids)
+        self.batch_id = batch_id
+        self.events: queue.Queue = queue.Queue()
+
+    def matches(self, entry: Dict, user_id: int) -> bool:
+        if user_id != self.user_id:
+            return False
+        if self.series_ids and entry['id'] in self.series_ids:
+            return True
+        if self.batch_id and entry['batch_id'] == self.batch_id:
+            return True
+        return not self.series_ids and not self.batch_id
+
+    def get(self, timeout: float) -> Optional[Dict]:
+        """Wait for the next status change, or None after timeout seconds."""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class TransferEventBroker:
+    """
+    Fans transfer status changes out to the streams open in this process.
+
+    On PostgreSQL, senders NOTIFY the log ID on TRANSFER_STATUS_CHANNEL and
+    one listener thread per web process LISTENs on a dedicated connection,
+    loads each changed log once and hands it to the matching subscriptions.
+    Other databases only see changes published from the same process.
+    Waiting streams hold no database connection and run no queries.
+    """
+
+    def __init__(self):
+        self._subscriptions: List[Subscription] = []
+        self._lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+
+    def subscribe(self, user_id: int, series_ids: Iterable[str] = (),
+                  batch_id: Optional[str] = None) -> Subscription:
+        subscription = Subscription(user_id, series_ids, batch_id)
+        with self._lock:
+            self._subscriptions.append(subscription)
+            if self._listener is None and connection.vendor == 'postgresql':
+                self._listener = threading.Thread(
+                    target=self._listen, name='transfer-status-listener', daemon=True
+                )
+                self._listener.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def publish(self, log_id: int):
+        """Announce that a transfer log changed."""
+        if connection.vendor == 'postgresql':
+            # Delivered when the surrounding transaction commits
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_notify(%s, %s)', [TRANSFER_STATUS_CHANNEL, str(log_id)])
+        else:
+            self.dispatch([log_id])
+
+    def dispatch(self, log_ids: Iterable[int]):
+        """Load changed logs and queue them for the matching subscriptions."""
+        from .models import TransferLog
+
+        with self._lock:
+            if not self._subscriptions:
+                return
+            user_ids = {s.user_id for s in self._subscriptions}
+
+        logs = TransferLog.objects.select_related('destination').filter(  # type: ignore
+            id__in=set(log_ids), user_id__in=user_ids, action='send'
+        )
+        for transfer_log in logs:
+            entry = transfer_status_entry(transfer_log)
+            with self._lock:
+                subscriptions = list(self._subscriptions)
+            for subscription in subscriptions:
+                if subscription.matches(entry, transfer_log.user_id):
+                    subscription.events.put(entry)
+
+    def _listen(self):
+        while True:
+            listen_connection = None
+            try:
+                listen_connection = connection.get_new_connection(connection.get_connection_params())
+                listen_connection.autocommit = True
+                with listen_connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN {TRANSFER_STATUS_CHANNEL}')
+                logger.info("Listening for transfer status changes")
+
+                while True:
+                    if select.select([listen_connection], [], [], 60) == ([], [], []):
+                        continue
+                    listen_connection.poll()
+                    log_ids = set()
+                    while listen_connection.notifies:
+                        notify = listen_connection.notifies.pop(0)
+                        try:
+                            log_ids.add(int(notify.payload))
+                        except ValueError:
+                            continue
+                    if log_ids:
+                        close_old_connections()
+                        self.dispatch(log_ids)
+            except Exception as e:
+                logger.warning(f"Transfer status listener failed, reconnecting: {str(e)}")
+                threading.Event().wait(LISTEN_RECONNECT_SECONDS)
+            finally:
+                if listen_connection is not None:
+                    try:
+                        listen_connection.close()
+                    except Exception:
+                        pass
+
+
+transfer_events = TransferEventBroker()
+
+
+def publish_transfer_status(log_id: int):
+    """Announce a transfer status change, never failing the caller."""
+    try:
+        transfer_events.publish(log_id)
+    except Exception as e:
+        logger.warning(f"Could not publish status of transfer {log_id}: {str(e)}")
+
+
+def format_sse(event: str, data) -> str:
+    """Encode one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from destinations.models import Destination, DestinationHealth
+
+from .services import DICOMTransferService
+
+logger = logging.getLogger('dicom_transfer')
+
+# Destinations probed in the background by this process right now
+_probing = set()
+_probing_lock = threading.Lock()
+
+
+class HealthMonitor:
+    """
+    C-ECHO enabled destinations and keep their latest status.
+
+    Each check updates the destination's DestinationHealth row: status,
+    round-trip time, when it last answered and the last
+    DICOM_HEALTH_HISTORY_SIZE checks. Destinations are probed concurrently
+    (DICOM_HEALTH_CHECK_CONCURRENCY at a time) with DICOM_ECHO_TIMEOUT each,
+    so a dead PACS delays a sweep by one timeout at most. Runs as a thread
+    in run_transfer_workers; API requests only read the rows.
+    """
+
+    def __init__(self, timeout: Optional[float] = None, concurrency: Optional[int] = None,
+                 transfer_service: Optional[DICOMTransferService] = None):
+        self.timeout = timeout or getattr(settings, 'DICOM_ECHO_TIMEOUT', 10)
+        self.concurrency = concurrency or getattr(settings, 'DICOM_HEALTH_CHECK_CONCURRENCY', 8)
+        self.history_size = getattr(settings, 'DICOM_HEALTH_HISTORY_SIZE', 60)
+        self.transfer_service = transfer_service or DICOMTransferService()
+
+    def probe(self, destination) -> DestinationHealth:
+        """Echo one destination and record the outcome."""
+        result = self.transfer_service.test_destination(destination, self.timeout)
+        return self.record(destination, result)
+
+    def record(self, destination, result: Dict) -> DestinationHealth:
+        """
+        Store the outcome of a connection test as the destination's health.
+
+        Args:
+            destination: Destination model instance
+            result: Dict as returned by DICOMTransferService.test_destination
+        """
+        now = timezone.now()
+        health, _created = DestinationHealth.objects.get_or_create(destination=destination)
+        success = bool(result.get('success'))
+        health.status = 'reachable' if success else 'unreachable'
+        health.latency_ms = result.get('response_time') if success else None
+        health.message = result.get('message', '')
+        if not success and result.get('details'):
+            health.message = f"{health.message}: {result['details'].strip()}"
+        health.checked_at = now
+        if success:
+            health.last_success_at = now
+            health.consecutive_failures = 0
+        else:
+            health.consecutive_failures += 1
+        history = (health.history or []) + [{
+            'checked_at': now.isoformat(),
+            'success': success,
+            'latency_ms': health.latency_ms,
+        }]
+        health.history = history[-self.history_size:] if self.history_size > 0 else []
+        health.save()
+        return health
+
+    def probe_all(self) -> Dict[str, int]:
+        """
+        Probe every enabled destination.
+
+        Returns:
+            Report with the number of destinations found reachable and unreachable
+        """
+        destinations = list(Destination.objects.filter(enabled=True))  # type: ignore
+        report = {'reachable': 0, 'unreachable': 0}
+        if not destinations:
+            return report
+
+        # Echo on the pool; the outcomes are written from this thread
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(destinations))) as executor:
+            results = executor.map(
+                lambda destination: self.transfer_service.test_destination(destination, self.timeout),
+                destinations,
+            )
+            for destination, result in zip(destinations, results):
+                report[self.record(destination, result).status] += 1
+        if report['unreachable']:
+            logger.warning(f"{report['unreachable']} of {len(destinations)} destinations did not answer C-ECHO")
+        return report
+
+    def check_concurrently(self, destinations: List, timeout: Optional[float] = None,
+                           deadline: Optional[float] = None) -> List[Dict]:
+        """
+        Check many destinations at the same time and record the outcomes.
+
+        Each destination gets an asyncio TCP connect and then a C-ECHO
+        association, together limited to timeout seconds. All checks run
+        at once (up to DICOM_BULK_TEST_CONCURRENCY echoes), so the call
+        takes about as long as the slowest check, and never longer than
+        deadline seconds: checks still running then are reported as
+        unfinished and not recorded.
+
+        Args:
+            destinations: Destination model instances
+            timeout: Seconds per destination (default DICOM_ECHO_TIMEOUT)
+            deadline: Seconds for the whole call (default DICOM_BULK_TEST_DEADLINE)
+
+        Returns:
+            One dict per destination, in order: id, name, success, tcp_ms,
+            response_time (C-ECHO round trip in ms), error
+        """
+        timeout = timeout or self.timeout
+        deadline = deadline or getattr(settings, 'DICOM_BULK_TEST_DEADLINE', 30)
+        if not destinations:
+            return []
+
+        results = asyncio.run(self._check_all(destinations, timeout, deadline))
+        for destination, result in zip(destinations, results):
+            if result['finished']:
+                self.record(destination, {
+                    'success': result['success'],
+                    'message': 'Connection successful' if result['success'] else result['error'],
+                    'response_time': result['response_time'],
+                })
+        return [
+            {key: value for key, value in result.items() if key != 'finished'}
+            for result in results
+        ]
+
+    async def _check_all(self, destinations: List, timeout: float, deadline: float) -> List[Dict]:
+        workers = min(len(destinations), getattr(settings, 'DICOM_BULK_TEST_CONCURRENCY', 64))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='destination-check')
+        try:
+            results = [self._blank_result(destination) for destination in destinations]
+            tasks = [
+                asyncio.create_task(self._check(destination, result, timeout, executor))
+                for destination, result in zip(destinations, results)
+            ]
+            _done, pending = await asyncio.wait(tasks, timeout=deadline)
+            for task in pending:
+                task.cancel()
+            for result in results:
+                if not result['finished']:
+                    result['error'] = f"No result within the {deadline:g} s deadline"
+            return results
+        finally:
+            # Echoes past the deadline end on their own timeout
+            executor.shutdown(wait=False)
+
+    async def _check(self, destination, result: Dict, timeout: float, executor: ThreadPoolExecutor):
+        """TCP connect, then C-ECHO on an executor thread, within timeout seconds overall, filling result."""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            try:
+                _reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(destination.host, int(destination.port)), timeout
+                )
+            except asyncio.TimeoutError:
+                result.update(finished=True, error=f"TCP connect timed out after {timeout:g} s")
+                return
+            except OSError as e:
+                result.update(finished=True, error=f"TCP connect failed: {str(e)}")
+                return
+            result['tcp_ms'] = round((loop.time() - started) * 1000, 1)
+            writer.close()
+
+            remaining = timeout - (loop.time() - started)
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                echo = await asyncio.wait_for(
+                    loop.run_in_executor(executor, self.transfer_service.test_destination, destination, remaining),
+                    remaining,
+                )
+            except asyncio.TimeoutError:
+                result.update(finished=True, error=f"C-ECHO timed out after {timeout:g} s")
+                return
+            result.update(finished=True, success=bool(echo['success']), response_time=echo['response_time'])
+            if not echo['success']:
+                result['error'] = echo['message']
+                if echo.get('details'):
+                    result['error'] += f": {echo['details'].strip()}"
+        except Exception as e:
+            result.update(finished=True, error=f"Check failed: {str(e)}")
+
+    @staticmethod
+    def _blank_result(destination) -> Dict:
+        return {
+            'id': destination.pk,
+            'name': destination.name,
+            'success': False,
+            'tcp_ms': None,
+            'response_time': None,
+            'error': '',
+            'finished': False,
+        }
+
+    def probe_in_background(self, destination) -> bool:
+        """
+        Start probing a destination on a separate thread.
+
+        Returns:
+            False if this process is already probing it
+        """
+        with _probing_lock:
+            if destination.pk in _probing:
+                return False
+            _probing.add(destination.pk)
+
+        def probe():
+            try:
+                self.probe(destination)
+            except Exception as e:
+                logger.error(f"Could not check health of {destination.name}: {str(e)}")
+            finally:
+                with _probing_lock:
+                    _probing.discard(destination.pk)
+                connection.close()
+
+        threading.Thread(target=probe, name=f'destination-probe-{destination.pk}', daemon=True).start()
+        return True
+
+    def run(self, stop: threading.Event, interval: float):
+        """Probe every interval seconds until stop is set, starting right away."""
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                self.probe_all()
+            except Exception as e:
+                logger.error(f"Destination health check failed: {str(e)}")
+            stop.wait(interval)
+        close_old_connections()
@@ -0,0 +1,137 @@
+import os
+import time
+import shutil
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .jobs import TransferJobQueue
+from .models import ImportSession
+from .registry import SeriesRegistry, directory_size
+from .services import CONVERTED_DIR_PREFIX
+from .store import InstanceStore
+
+logger = logging.getLogger('dicom_transfer')
+
+# Prefix of the directories created for import sessions
+IMPORT_DIR_PREFIX = 'dicom_import_'
+
+
+class StorageJanitor:
+    """
+    Keeps the import storage under DICOM_UPLOAD_DIR within its limits.
+
+    A sweep evicts sessions through SeriesRegistry.evict (expired, fully
+    sent, over quota or short of free disk space), then deletes import
+    directories no session owns that have not changed for
+    DICOM_IMPORT_ORPHAN_SECONDS, which imports failing before they
+    registered their session leave behind, and conversion work
+    directories of transfers no worker holds a lease on, which workers
+    killed mid-send leave behind. Last, stored instances no session links
+    to any more are removed from the instance store.
+    """
+
+    def __init__(self, registry: Optional[SeriesRegistry] = None, orphan_seconds: Optional[int] = None):
+        self.registry = registry or SeriesRegistry()
+        self.store = InstanceStore()
+        self.upload_dir = getattr(settings, 'DICOM_UPLOAD_DIR', None)
+        self.orphan_seconds = orphan_seconds if orphan_seconds is not None else getattr(
+            settings, 'DICOM_IMPORT_ORPHAN_SECONDS', 6 * 60 * 60
+        )
+
+    def sweep(self) -> Dict:
+        """
+        Run one cleanup pass.
+
+        Returns:
+            Dict with sessions_removed, orphans_removed, instances_removed,
+            bytes_reclaimed and free_bytes (free space left on the upload
+            disk, None if unknown)
+        """
+        sessions_removed, session_bytes = self.registry.evict()
+        orphans_removed, orphan_bytes = self.remove_orphans()
+        instances_removed, instance_bytes = self.store.collect_garbage()
+        report = {
+            'sessions_removed': sessions_removed,
+            'orphans_removed': orphans_removed,
+            'instances_removed': instances_removed,
+            'bytes_reclaimed': session_bytes + orphan_bytes + instance_bytes,
+            'free_bytes': self.registry.free_bytes(),
+        }
+        if sessions_removed or orphans_removed:
+            logger.info(
+                f"Storage janitor removed {sessions_removed} sessions and {orphans_removed} "
+                f"orphaned directories, reclaiming {report['bytes_reclaimed']} bytes"
+            )
+        return report
+
+    def remove_orphans(self) -> Tuple[int, int]:
+        """
+        Delete stale import directories without a session and stale
+        conversion directories of transfers no worker is sending.
+
+        Returns:
+            (directories removed, bytes reclaimed)
+        """
+        if not self.upload_dir or not os.path.isdir(self.upload_dir):
+            return 0, 0
+
+        owned = {
+            os.path.realpath(temp_dir)
+            for temp_dir in ImportSession.objects.values_list('temp_dir', flat=True)
+        }
+        # Conversion directories are named after their transfer log
+        sending = {
+            str(log_id) for log_id in TransferJobQueue().running().values_list('transfer_log_id', flat=True)
+        }
+        cutoff = time.time() - self.orphan_seconds
+        removed = 0
+        reclaimed = 0
+        with os.scandir(self.upload_dir) as entries:
+            for entry in entries:
+                if not entry.is_dir(follow_symlinks=False):
+                    continue
+                path = os.path.realpath(entry.path)
+                if entry.name.startswith(IMPORT_DIR_PREFIX):
+                    kind = 'import'
+                    if path in owned:
+                        continue
+                elif entry.name.startswith(CONVERTED_DIR_PREFIX):
+                    kind = 'conversion'
+                    if entry.name[len(CONVERTED_DIR_PREFIX):].split('_', 1)[0] in sending:
+                        continue
+                else:
+                    continue
+                if self._last_modified(path) > cutoff:
+                    continue
+                size = directory_size(path)
+                shutil.rmtree(path, ignore_errors=True)
+                logger.info(f"Removed orphaned {kind} directory {path} ({size} bytes)")
+                removed += 1
+                reclaimed += size
+        return removed, reclaimed
+
+    def run(self, stop: threading.Event, interval: float):
+        """Sweep every interval seconds until stop is set."""
+        while not stop.wait(interval):
+            close_old_connections()
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Storage janitor sweep failed: {str(e)}")
+        close_old_connections()
+
+    @staticmethod
+    def _last_modified(path: str) -> float:
+        """Latest modification time of a directory or anything in it."""
+        latest = os.path.getmtime(path)
+        for root, dirs, names in os.walk(path):
+            for name in dirs + names:
+                try:
+                    latest = max(latest, os.path.getmtime(os.path.join(root, name)))
+                except OSError:
+                    pass
+        return latest
@@ -0,0 +1,477 @@
+import os
+import random
+import socket
+import logging
+import threading
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Avg, Count, F, Min, Q, Sum
+from django.utils import timezone
+
+from destinations.models import Destination
+
+from .bandwidth import BandwidthShaper
+from .models import ImportSession, TransferInstance, TransferJob, TransferLog
+
+logger = logging.getLogger('dicom_transfer')
+
+
+def default_worker_id() -> str:
+    """Identify a worker thread as host:pid:thread."""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+ACTIVE_JOB_STATUSES = ['pending', 'sending']
+
+# Advisory lock key serializing claims while a global concurrency cap is set
+GLOBAL_CLAIM_LOCK_KEY = 0x7E1E9057
+
+
+class QueueFullError(Exception):
+    """Raised when a destination already has its maximum number of queued jobs."""
+
+
+class RetryPolicy:
+    """
+    How often and how soon a destination's failed transfers are retried.
+
+    The delay before attempt n + 1 is backoff_seconds * 2^(n - 1), capped at
+    max_backoff_seconds, with equal jitter: half of it is fixed and the other
+    half random, so transfers that failed together do not retry together.
+    """
+
+    def __init__(self, max_attempts: int = 3, backoff_seconds: float = 30, max_backoff_seconds: float = 900):
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+
+    @classmethod
+    def for_destination(cls, destination) -> 'RetryPolicy':
+        return cls(
+            destination.retry_max_attempts,
+            destination.retry_backoff_seconds,
+            destination.retry_backoff_max_seconds,
+        )
+
+    def can_retry(self, attempts: int) -> bool:
+        """Whether another attempt may follow the given number of attempts."""
+        return attempts < self.max_attempts
+
+    def delay(self, attempts: int) -> float:
+        """Seconds to wait after the given number of failed attempts."""
+        capped = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** max(attempts - 1, 0))
+        return capped / 2 + random.uniform(0, capped / 2)
+
+
+class TransferJobQueue:
+    """
+    Durable queue of transfer jobs stored in the TransferJob table.
+
+    Workers lease one job at a time. A job is claimable while pending, or
+    while marked sending with a lapsed lease, which is how jobs interrupted
+    by a restart are picked up again. Running jobs renew their lease through
+    a heartbeat thread. A failed job the destination's RetryPolicy allows
+    to retry goes back to pending with available_at pushed back by the
+    backoff, and its next run only sends the instances not yet confirmed.
+
+    Claims are scheduled per destination: a destination only receives a new
+    job while it runs fewer than its max_concurrent_associations, and the
+    whole queue never runs more than DICOM_TRANSFER_MAX_CONCURRENT jobs when
+    that cap is set. Destinations are served by the age of their oldest
+    waiting job, so a slow destination at its limit never holds up others.
+    """
+
+    def __init__(self, worker_id: Optional[str] = None):
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = getattr(settings, 'DICOM_TRANSFER_LEASE_SECONDS', 60)
+
+    def enqueue_many(self, entries: List[Tuple],
+                     skip_sent: str = 'none') -> Tuple[List[TransferJob], Dict[int, QueueFullError]]:
+        """
+        Save transfer logs and create their pending jobs in one transaction.
+
+        Queue limits are checked with one grouped count for all destinations,
+        and the logs and jobs are written with one bulk insert each, so the
+        number of queries does not grow with the number of entries.
+
+        The import sessions are locked first, so the registry cannot evict
+        one while its jobs are being queued; entries whose session was
+        evicted in the meantime are dropped. Destinations with a queue limit
+        are locked next, so concurrent requests cannot both pass the count
+        and overfill the queue.
+
+        Args:
+            entries: (unsaved TransferLog, destination, file paths, import session,
+                content hashes by file path) tuples
+            skip_sent: TransferJob.skip_sent of every job
+
+        Returns:
+            (jobs created, QueueFullError by index of each rejected entry)
+        """
+        with transaction.atomic():
+            session_ids = {entry[3].id for entry in entries if entry[3] is not None}
+            live_sessions = set()
+            if session_ids:
+                live_sessions = set(
+                    ImportSession.objects.select_for_update().filter(id__in=session_ids)  # type: ignore
+                    .values_list('id', flat=True)
+                )
+
+            limited = {entry[1].id for entry in entries if entry[1].max_queued_jobs}  # type: ignore[attr-defined]
+            queued = {}
+            if limited:
+                # Held until commit; concurrent enqueues for these destinations wait here
+                list(Destination.objects.select_for_update().filter(id__in=limited).order_by('id')  # type: ignore
+                     .values_list('id', flat=True))
+                queued = dict(
+                    TransferJob.objects.filter(destination_id__in=limited, status='pending')
+                    .values('destination_id')
+                    .annotate(count=Count('id'))
+                    .values_list('destination_id', 'count')
+                )
+
+            accepted = []
+            rejected = {}
+            for index, entry in enumerate(entries):
+                destination, session = entry[1], entry[3]
+                if session is not None and session.id not in live_sessions:
+                    continue
+                waiting = queued.get(destination.id, 0)  # type: ignore[attr-defined]
+                if destination.max_queued_jobs and waiting >= destination.max_queued_jobs:
+                    rejected[index] = QueueFullError(
+                        f"Destination {destination.name} already has {waiting} queued transfers"
+                    )
+                    continue
+                queued[destination.id] = waiting + 1  # type: ignore[attr-defined]
+                accepted.append(entry)
+
+            if not accepted:
+                return [], rejected
+
+            logs = TransferLog.objects.bulk_create([entry[0] for entry in accepted])  # type: ignore
+            jobs = TransferJob.objects.bulk_create([
+                TransferJob(
+                    transfer_log=transfer_log,
+                    destination=destination,
+                    session=session,
+                    file_paths=file_paths,
+                    content_hashes=content_hashes,
+                    skip_sent=skip_sent,
+                )
+                for transfer_log, (_log, destination, file_paths, session, content_hashes) in zip(logs, accepted)
+            ])
+        return jobs, rejected
+
+    def claimable(self):
+        """Jobs that are due or whose worker stopped renewing its lease."""
+        now = timezone.now()
+        return TransferJob.objects.filter(
+            Q(status='pending', available_at__lte=now) | Q(status='sending', lease_expires_at__lt=now)
+        )
+
+    def running(self):
+        """Jobs being sent by a worker that still holds the lease."""
+        return TransferJob.objects.filter(status='sending', lease_expires_at__gte=timezone.now())
+
+    def claim(self) -> Optional[TransferJob]:
+        """
+        Lease the oldest claimable job of a destination that has a free association.
+
+        Returns:
+            The leased job, or None if there is nothing to do
+        """
+        global_cap = getattr(settings, 'DICOM_TRANSFER_MAX_CONCURRENT', 0)
+
+        with transaction.atomic():
+            if global_cap:
+                self._lock_global_claims()
+                if self.running().count() >= global_cap:
+                    return None
+
+            waiting = (
+                self.claimable()
+                .values('destination_id')
+                .annotate(oldest=Min('created_at'))
+                .order_by('oldest')
+            )
+            for row in waiting:
+                # Another worker holding the row is scheduling that destination
+                destination = (
+                    Destination.objects.select_for_update(skip_locked=True)
+                    .filter(id=row['destination_id'])
+                    .first()
+                )
+                if destination is None:
+                    continue
+                running = self.running().filter(destination=destination).count()
+                if running >= destination.max_concurrent_associations:
+                    continue
+
+                job = (
+                    self.claimable()
+                    .filter(destination=destination)
+                    .select_for_update(skip_locked=True, of=('self',))
+                    .order_by('created_at')
+                    .first()
+                )
+                if job is None:
+                    continue
+                job.destination = destination
+                self._lease(job)
+                return job
+        return None
+
+    def _lock_global_claims(self):
+        """Serialize claims across workers so the global cap cannot be overshot."""
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [GLOBAL_CLAIM_LOCK_KEY])
+
+    def _lease(self, job: TransferJob):
+        """Mark a locked job as sending and owned by this worker."""
+        now = timezone.now()
+        if job.status == 'sending':
+            logger.warning(f"Reclaiming transfer job {job.id} from {job.lease_owner}")  # type: ignore
+        job.status = 'sending'
+        job.attempts += 1
+        job.lease_owner = self.worker_id
+        job.lease_expires_at = now + timedelta(seconds=self.lease_seconds)
+        job.started_at = now
+        job.save(update_fields=['status', 'attempts', 'lease_owner', 'lease_expires_at', 'started_at'])
+
+    def renew(self, job: TransferJob) -> bool:
+        """
+        Extend the lease of a running job.
+
+        Returns:
+            False if the job is no longer owned by this worker
+        """
+        updated = TransferJob.objects.filter(
+            id=job.id, status='sending', lease_owner=self.worker_id  # type: ignore
+        ).update(lease_expires_at=timezone.now() + timedelta(seconds=self.lease_seconds))
+        return updated == 1
+
+    def complete(self, job: TransferJob, success: bool) -> bool:
+        """
+        Record the outcome of a job and release its lease.
+
+        Returns:
+            False if the job is no longer owned by this worker
+        """
+        updated = TransferJob.objects.filter(id=job.id, lease_owner=self.worker_id).update(  # type: ignore
+            status='done' if success else 'failed',
+            lease_owner='',
+            lease_expires_at=None,
+            finished_at=timezone.now(),
+        )
+        return updated == 1
+
+    def retry(self, job: TransferJob, available_at) -> bool:
+        """
+        Put a failed job back in the queue, claimable from available_at.
+
+        Returns:
+            False if the job is no longer owned by this worker
+        """
+        updated = TransferJob.objects.filter(id=job.id, lease_owner=self.worker_id).update(  # type: ignore
+            status='pending',
+            lease_owner='',
+            lease_expires_at=None,
+            available_at=available_at,
+        )
+        return updated == 1
+
+    def unconfirmed_files(self, job: TransferJob) -> List[str]:
+        """Files of a job neither confirmed nor skipped by an earlier attempt."""
+        confirmed = set(
+            TransferInstance.objects.filter(
+                transfer_log_id=job.transfer_log_id, status__in=['success', 'skipped']  # type: ignore[attr-defined]
+            ).values_list('file_path', flat=True)
+        )
+        return [fp for fp in job.file_paths if fp not in confirmed]
+
+    def run_job(self, job: TransferJob, transfer_service) -> bool:
+        """
+        Run a leased job, renewing its lease until the transfer returns.
+
+        Only files not confirmed by earlier attempts are sent. If the send
+        fails and the transfer log was left pending for a retry, the job is
+        requeued after the destination's backoff. A transfer that raises
+        is retried the same way while attempts remain, and otherwise fails
+        its transfer log. If the lease is lost to another worker, the
+        outcome is left to the new owner.
+        """
+        policy = RetryPolicy.for_destination(job.destination)
+        can_retry = policy.can_retry(job.attempts)
+        file_paths = self.unconfirmed_files(job)
+        started_at = timezone.now()
+        stop = threading.Event()
+        lease_lost = threading.Event()
+
+        def heartbeat():
+            while not stop.wait(self.lease_seconds / 3):
+                try:
+                    if not self.renew(job):
+                        logger.warning(f"Lost the lease on transfer job {job.id}")  # type: ignore
+                        lease_lost.set()
+                        return
+                except Exception as e:
+                    logger.warning(f"Failed to renew lease on transfer job {job.id}: {str(e)}")  # type: ignore
+                finally:
+                    close_old_connections()
+
+        renewer = threading.Thread(target=heartbeat, daemon=True)
+        renewer.start()
+        success = False
+        retry_at = None
+        crash = None
+        try:
+            if file_paths:
+                success = transfer_service.transfer_series(
+                    job.transfer_log_id,  # type: ignore[attr-defined]
+                    file_paths,
+                    job.destination,
+                    can_retry=can_retry,
+                    skip_sent=job.skip_sent,
+                    content_hashes=job.content_hashes,
+                )
+            else:
+                # An earlier attempt confirmed every instance before it was interrupted
+                TransferLog.objects.get(id=job.transfer_log_id).mark_completed('success')  # type: ignore
+                success = True
+        except Exception as e:
+            crash = f"Transfer crashed: {str(e)}"
+            logger.error(f"Transfer job {job.id} crashed: {str(e)}")  # type: ignore
+        finally:
+            stop.set()
+            renewer.join()
+            transfer_log = TransferLog.objects.get(id=job.transfer_log_id)  # type: ignore
+            owned = False
+            if not lease_lost.is_set():
+                owned, retry_at = self._settle(job, transfer_log, success, crash, policy, can_retry)
+            if owned:
+                self._record_attempt(job, transfer_log, started_at, len(file_paths), retry_at)
+            else:
+                logger.warning(f"Transfer job {job.id} finished after losing its lease, outcome not recorded")  # type: ignore
+        return success
+
+    def _settle(self, job: TransferJob, transfer_log, success: bool, crash: Optional[str],
+                policy: RetryPolicy, can_retry: bool):
+        """
+        Requeue or finish a job after an attempt.
+
+        Returns:
+            (whether this worker still owned the job, when it will be retried or None)
+        """
+        if crash and not transfer_log.is_completed():
+            # The transfer raised before recording its outcome
+            if can_retry:
+                transfer_log.mark_retrying(crash)
+            else:
+                transfer_log.mark_completed('failed', error_message=crash)
+
+        if not success and can_retry and transfer_log.status == 'pending':
+            retry_at = timezone.now() + timedelta(seconds=policy.delay(job.attempts))
+            if self.retry(job, retry_at):
+                logger.info(
+                    f"Transfer job {job.id} attempt {job.attempts} failed, retrying at {retry_at.isoformat()}"  # type: ignore
+                )
+                return True, retry_at
+            return False, None
+        return self.complete(job, success), None
+
+    def _record_attempt(self, job: TransferJob, transfer_log, started_at, files_sent: int, retry_at):
+        """Append the outcome of one attempt to the transfer log's history."""
+        transfer_log.attempt_history.append({
+            'attempt': job.attempts,
+            'worker': self.worker_id,
+            'started_at': started_at.isoformat(),
+            'finished_at': timezone.now().isoformat(),
+            'files_sent': files_sent,
+            'status': 'retrying' if retry_at else transfer_log.status,
+            'files_succeeded': transfer_log.files_succeeded,
+            'files_failed': transfer_log.files_failed,
+            'error': transfer_log.error_message if transfer_log.status != 'success' else '',
+            'retry_at': retry_at.isoformat() if retry_at else None,
+        })
+        transfer_log.save(update_fields=['attempt_history'])
+
+
+def queue_stats() -> List[dict]:
+    """
+    Queue depth, running jobs and waiting times per destination.
+
+    Wait times are in seconds: the age of the oldest waiting job, and the
+    average queue wait of jobs started in the last hour. Throughput is the
+    bytes confirmed over the last DICOM_THROUGHPUT_WINDOW_SECONDS, next to
+    the bandwidth cap in force now.
+    """
+    now = timezone.now()
+    since = now - timedelta(hours=1)
+    queue = TransferJobQueue()
+
+    pending = {
+        row['destination_id']: row
+        for row in TransferJob.objects.filter(status='pending')
+        .values('destination_id')
+        .annotate(count=Count('id'), oldest=Min('created_at'))
+    }
+    running = {
+        row['destination_id']: row['count']
+        for row in queue.running().values('destination_id').annotate(count=Count('id'))
+    }
+    waits = {
+        row['destination_id']: row['wait']
+        for row in TransferJob.objects.filter(started_at__gte=since)
+        .values('destination_id')
+        .annotate(wait=Avg(F('started_at') - F('created_at')))
+    }
+    throughput = recent_throughput(now)
+
+    stats = []
+    for destination in Destination.objects.filter(enabled=True).order_by('name'):
+        waiting = pending.get(destination.id, {})  # type: ignore[attr-defined]
+        oldest = waiting.get('oldest')
+        average_wait = waits.get(destination.id)  # type: ignore[attr-defined]
+        stats.append({
+            'destination_id': destination.id,  # type: ignore[attr-defined]
+            'destination_name': destination.name,
+            'max_concurrent_associations': destination.max_concurrent_associations,
+            'max_queued_jobs': destination.max_queued_jobs,
+            'queued': waiting.get('count', 0),
+            'running': running.get(destination.id, 0),  # type: ignore[attr-defined]
+            'oldest_wait_seconds': (now - oldest).total_seconds() if oldest else 0,
+            'average_wait_seconds': average_wait.total_seconds() if average_wait else None,
+            'bandwidth_limit_kbps': BandwidthShaper.destination_limit(destination),
+            'throughput_bytes_per_second': throughput.get(destination.id, 0),  # type: ignore[attr-defined]
+        })
+    return stats
+
+
+def egress_stats() -> dict:
+    """Global egress cap in force now and the throughput to all destinations."""
+    return {
+        'bandwidth_limit_kbps': BandwidthShaper.global_limit(),
+        'throughput_bytes_per_second': sum(recent_throughput().values()),
+    }
+
+
+def recent_throughput(now=None) -> Dict[int, float]:
+    """
+    Bytes per second confirmed per destination over the throughput window.
+
+    Read from the per-instance outcomes, which every worker process writes
+    while it sends, so the figure covers all of them.
+    """
+    window = getattr(settings, 'DICOM_THROUGHPUT_WINDOW_SECONDS', 60)
+    since = (now or timezone.now()) - timedelta(seconds=window)
+    return {
+        row['transfer_log__destination_id']: row['sent'] / window
+        for row in TransferInstance.objects.filter(recorded_at__gte=since, status='success')
+        .values('transfer_log__destination_id')
+        .annotate(sent=Sum('bytes_transferred'))
+        if row['transfer_log__destination_id'] is not None
+    }
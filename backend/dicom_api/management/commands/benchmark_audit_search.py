@@ -0,0 +1,117 @@
+import time
+import statistics
+from functools import reduce
+from operator import or_
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+
+from dicom_api.models import TransferLog
+from dicom_api.views import TransferLogViewSet
+
+BENCHMARK_USERNAME = 'audit_search_benchmark'
+
+DEFAULT_TERMS = ['SMITH', 'chest', 'rejected', 'abdomen w', 'timeout']
+
+
+class Command(BaseCommand):
+    """
+    Measure audit log search latency with and without the trigram indexes.
+
+    Fills the transfer log with generated rows for a dedicated user, then
+    runs the same icontains lookups the audit log search issues, once with
+    the planner free to use the pg_trgm indexes and once with bitmap scans
+    disabled, which forces the sequential scan used before the indexes.
+    """
+    help = 'Benchmark audit log search (SearchFilter) latency on PostgreSQL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5_000_000, help='Number of transfer logs to generate')
+        parser.add_argument('--batch', type=int, default=500_000, help='Rows inserted per statement')
+        parser.add_argument('--term', action='append', dest='terms', help='Search term (repeatable)')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per term and mode')
+        parser.add_argument('--explain', action='store_true', help='Print the query plan of each lookup')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated rows for later runs')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('This benchmark needs PostgreSQL')
+
+        user, _created = User.objects.get_or_create(username=BENCHMARK_USERNAME)
+        try:
+            existing = TransferLog.objects.filter(user=user).count()  # type: ignore
+            if existing < options['rows']:
+                self.stdout.write(f"Generating {options['rows'] - existing} transfer logs...")
+                self._generate_rows(user, existing, options['rows'], options['batch'])
+
+            for term in options['terms'] or DEFAULT_TERMS:
+                queryset = TransferLog.objects.filter(self._search(term)).order_by('-timestamp')[:20]  # type: ignore
+                for label, force_scan in (('trigram index', False), ('sequential scan', True)):
+                    timings, plan = self._run(queryset, force_scan, options['repeat'], options['explain'])
+                    self.stdout.write(
+                        f"{term!r:>14} {label:>16}: median {statistics.median(timings):8.1f} ms, "
+                        f"best {min(timings):8.1f} ms"
+                    )
+                    if plan:
+                        self.stdout.write(plan)
+        finally:
+            if not options['keep']:
+                self.stdout.write('Removing generated transfer logs...')
+                with connection.cursor() as cursor:
+                    cursor.execute('DELETE FROM dicom_api_transferlog WHERE user_id = %s', [user.id])
+                user.delete()
+
+    @staticmethod
+    def _search(term):
+        """The filter SearchFilter builds for one term."""
+        return reduce(or_, (Q(**{f'{field}__icontains': term}) for field in TransferLogViewSet.search_fields))
+
+    def _run(self, queryset, force_scan, repeat, explain):
+        timings = []
+        plan = None
+        with transaction.atomic():
+            if force_scan:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_bitmapscan = off')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(queryset)
+                timings.append((time.perf_counter() - start) * 1000)
+            if explain:
+                plan = queryset.explain(analyze=True, buffers=True)
+        return timings, plan
+
+    def _generate_rows(self, user, start, total, batch):
+        """Insert send logs with varied patient, series and error text."""
+        with connection.cursor() as cursor:
+            for low in range(start, total, batch):
+                high = min(low + batch, total) - 1
+                cursor.execute(
+                    """
+                    INSERT INTO dicom_api_transferlog (
+                        user_id, action, timestamp, status, patient_name, patient_id,
+                        study_instance_uid, series_instance_uid, series_description,
+                        modality, error_message, batch_id, series_id, details,
+                        files_succeeded, files_failed, files_converted, files_passed_through,
+                        files_skipped, bytes_skipped, attempt_history
+                    )
+                    SELECT %s, 'send', now() - (n || ' seconds')::interval,
+                           CASE WHEN n %% 20 = 0 THEN 'failed' ELSE 'success' END,
+                           upper(substr(md5(n::text), 1, 8)) || '^' || substr(md5((n + 1)::text), 1, 6),
+                           n::text, '', '',
+                           (ARRAY['CHEST PA', 'ABDOMEN W CONTRAST', 'HEAD WO', 'SPINE', 'PELVIS'])[1 + n %% 5]
+                               || ' ' || substr(md5((n * 7)::text), 1, 4),
+                           'CT',
+                           CASE WHEN n %% 20 = 0
+                                THEN 'Association rejected by ' || substr(md5((n * 3)::text), 1, 6)
+                                ELSE '' END,
+                           'bench_batch_' || (n / 100), 'bench_series_' || n, '{}'::jsonb,
+                           1, 0, 0, 1, 0, 0, '[]'::jsonb
+                    FROM generate_series(%s, %s) AS n
+                    """,
+                    [user.id, low, high],
+                )
+                self.stdout.write(f"  {high + 1}/{total}")
+            cursor.execute('ANALYZE dicom_api_transferlog')
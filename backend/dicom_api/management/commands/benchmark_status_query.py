@@ -0,0 +1,85 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from dicom_api.models import TransferLog
+
+BENCHMARK_USERNAME = 'status_query_benchmark'
+
+
+class Command(BaseCommand):
+    """
+    Compare series status lookups on the details JSON and the series_id column.
+
+    Fills the transfer log with generated rows for a dedicated user, then
+    prints the PostgreSQL query plan and timing of the lookup done by
+    get_transfer_status, once through details->>'series_id' and once
+    through the indexed series_id column.
+    """
+    help = 'Benchmark get_transfer_status series lookups on a large transfer log'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000_000, help='Number of transfer logs to generate')
+        parser.add_argument('--batch', type=int, default=500_000, help='Rows inserted per statement')
+        parser.add_argument('--lookup', type=int, default=20, help='Number of series IDs looked up per query')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated rows for later runs')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('This benchmark needs PostgreSQL')
+
+        user, _created = User.objects.get_or_create(username=BENCHMARK_USERNAME)
+        try:
+            existing = TransferLog.objects.filter(user=user).count()  # type: ignore
+            if existing < options['rows']:
+                self.stdout.write(f"Generating {options['rows'] - existing} transfer logs...")
+                self._generate_rows(user, existing, options['rows'], options['batch'])
+
+            step = max(options['rows'] // options['lookup'], 1)
+            series_ids = [f'bench_series_{i}' for i in range(0, options['rows'], step)][:options['lookup']]
+            queryset = TransferLog.objects.filter(user=user, action='send')  # type: ignore
+
+            for label, lookup in (
+                ('details JSON', queryset.filter(details__series_id__in=series_ids)),
+                ('series_id column', queryset.filter(series_id__in=series_ids)),
+            ):
+                lookup = lookup.order_by('-timestamp')
+                start = time.perf_counter()
+                found = len(list(lookup))
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f"\n{label}: {elapsed * 1000:.1f} ms, {found} rows")
+                self.stdout.write(lookup.explain(analyze=True, buffers=True))
+        finally:
+            if not options['keep']:
+                self.stdout.write('Removing generated transfer logs...')
+                with connection.cursor() as cursor:
+                    cursor.execute('DELETE FROM dicom_api_transferlog WHERE user_id = %s', [user.id])
+                user.delete()
+
+    def _generate_rows(self, user, start, total, batch):
+        """Insert synthetic send logs with INSERT ... SELECT generate_series."""
+        with connection.cursor() as cursor:
+            for low in range(start, total, batch):
+                high = min(low + batch, total) - 1
+                cursor.execute(
+                    """
+                    INSERT INTO dicom_api_transferlog (
+                        user_id, action, timestamp, status, patient_name, patient_id,
+                        study_instance_uid, series_instance_uid, series_description,
+                        modality, error_message, batch_id, series_id, details,
+                        files_succeeded, files_failed, files_converted, files_passed_through,
+                        files_skipped, bytes_skipped, attempt_history
+                    )
+                    SELECT %s, 'send', now() - (n || ' seconds')::interval, 'success', '', '',
+                           '', '', '', 'CT', '', 'bench_batch_' || (n / 100),
+                           'bench_series_' || n,
+                           jsonb_build_object('series_id', 'bench_series_' || n),
+                           1, 0, 0, 1, 0, 0, '[]'::jsonb
+                    FROM generate_series(%s, %s) AS n
+                    """,
+                    [user.id, low, high],
+                )
+                self.stdout.write(f"  {high + 1}/{total}")
+            cursor.execute('ANALYZE dicom_api_transferlog')
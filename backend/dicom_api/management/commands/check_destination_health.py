@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from dicom_api.health import HealthMonitor
+
+
+class Command(BaseCommand):
+    """
+    C-ECHO every enabled destination once and store the results.
+
+    Runs the same sweep as the health monitor thread of
+    run_transfer_workers, for deployments that schedule it with cron instead.
+    """
+    help = 'Check the enabled destinations with C-ECHO and update their cached health'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--timeout', type=float, help='Seconds to wait for each destination')
+
+    def handle(self, *args, **options):
+        report = HealthMonitor(timeout=options['timeout']).probe_all()
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['reachable']} destinations reachable, {report['unreachable']} unreachable"
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from dicom_api.janitor import StorageJanitor
+
+
+class Command(BaseCommand):
+    """
+    Remove import sessions and directories that are no longer needed.
+
+    Runs the same sweep as the janitor thread of run_transfer_workers, for
+    deployments that schedule cleanup with cron instead.
+    """
+    help = 'Evict expired, sent and least recently used import sessions and report bytes reclaimed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--orphan-seconds',
+            type=int,
+            help='Remove import directories without a session once unchanged for this long',
+        )
+
+    def handle(self, *args, **options):
+        report = StorageJanitor(orphan_seconds=options['orphan_seconds']).sweep()
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {report['sessions_removed']} sessions and {report['orphans_removed']} orphaned "
+            f"directories, reclaimed {report['bytes_reclaimed']} bytes"
+        ))
+        if report['free_bytes'] is not None:
+            self.stdout.write(f"{report['free_bytes']} bytes free in the upload directory")
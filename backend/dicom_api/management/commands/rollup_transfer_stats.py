@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from dicom_api.models import TransferLog
+from dicom_api.rollup import rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the daily transfer statistics from the transfer logs.
+
+    Run once with --all to backfill the rollup for existing logs. Run
+    periodically (for example nightly, with the default of the last two
+    days) to compact away any drift from transfers finished while the
+    incremental update failed.
+    """
+    help = 'Rebuild TransferDailyStat rows from TransferLog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2, help='Rebuild this many days up to today')
+        parser.add_argument('--start', help='First day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--end', help='Last day to rebuild (YYYY-MM-DD), default today')
+        parser.add_argument('--all', action='store_true', help='Rebuild every day that has send logs')
+        parser.add_argument('--chunk-days', type=int, default=31, help='Days rebuilt per transaction')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        if options['all']:
+            bounds = TransferLog.objects.filter(action='send').aggregate(  # type: ignore
+                first=Min('timestamp'), last=Max('timestamp')
+            )
+            if bounds['first'] is None:
+                self.stdout.write('No send logs to roll up')
+                return
+            start = timezone.localdate(bounds['first'])
+            end = timezone.localdate(bounds['last'])
+        else:
+            end = self._parse_day(options['end']) if options['end'] else today
+            start = self._parse_day(options['start']) if options['start'] else end - timedelta(days=options['days'] - 1)
+        if start > end:
+            raise CommandError('start must not be after end')
+
+        written = 0
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + timedelta(days=options['chunk_days'] - 1), end)
+            written += rebuild_daily_stats(chunk_start, chunk_end)
+            self.stdout.write(f"  {chunk_start} .. {chunk_end}")
+            chunk_start = chunk_end + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} rollup rows for {start} .. {end}"))
+
+    @staticmethod
+    def _parse_day(value):
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'Invalid date: {value}')
+        return day
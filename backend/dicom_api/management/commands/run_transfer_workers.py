@@ -0,0 +1,115 @@
+import signal
+import logging
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from dicom_api.dimse import shutdown_association_pool
+from dicom_api.health import HealthMonitor
+from dicom_api.janitor import StorageJanitor
+from dicom_api.jobs import TransferJobQueue
+from dicom_api.services import DICOMTransferService
+
+logger = logging.getLogger('dicom_transfer')
+
+
+class Command(BaseCommand):
+    """
+    Run transfer workers that lease jobs from the TransferJob queue.
+
+    Jobs left pending or sending by a previous run are picked up again once
+    their lease lapses. SIGINT/SIGTERM stop claiming new jobs and let
+    running transfers finish. A janitor thread sweeps the import storage
+    every DICOM_STORAGE_JANITOR_INTERVAL seconds, and a health monitor
+    thread C-ECHOes the enabled destinations every
+    DICOM_HEALTH_CHECK_INTERVAL seconds.
+    """
+    help = 'Run DICOM transfer workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=getattr(settings, 'DICOM_TRANSFER_WORKERS', 3),
+            help='Number of concurrent transfer threads',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=getattr(settings, 'DICOM_TRANSFER_POLL_INTERVAL', 1.0),
+            help='Seconds to wait between polls when the queue is empty',
+        )
+        parser.add_argument(
+            '--janitor-interval',
+            type=float,
+            default=getattr(settings, 'DICOM_STORAGE_JANITOR_INTERVAL', 300),
+            help='Seconds between import storage sweeps, 0 disables the janitor',
+        )
+        parser.add_argument(
+            '--health-interval',
+            type=float,
+            default=getattr(settings, 'DICOM_HEALTH_CHECK_INTERVAL', 60),
+            help='Seconds between destination C-ECHO sweeps, 0 disables the health monitor',
+        )
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        signal.signal(signal.SIGINT, self._request_stop)
+        signal.signal(signal.SIGTERM, self._request_stop)
+
+        threads = [
+            threading.Thread(target=self._work, args=(options['poll_interval'],), name=f'transfer-worker-{n}')
+            for n in range(options['workers'])
+        ]
+        if options['janitor_interval'] > 0:
+            threads.append(threading.Thread(
+                target=StorageJanitor().run,
+                args=(self.stop, options['janitor_interval']),
+                name='storage-janitor',
+            ))
+        if options['health_interval'] > 0:
+            threads.append(threading.Thread(
+                target=HealthMonitor().run,
+                args=(self.stop, options['health_interval']),
+                name='health-monitor',
+            ))
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"Started {options['workers']} transfer workers")
+
+        # Keep the main thread free to receive signals
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=1)
+        shutdown_association_pool()
+        self.stdout.write("Transfer workers stopped")
+
+    def _request_stop(self, signum, frame):
+        logger.info("Stopping transfer workers after running transfers finish")
+        self.stop.set()
+
+    def _work(self, poll_interval):
+        queue = TransferJobQueue()
+        transfer_service = DICOMTransferService()
+        while not self.stop.is_set():
+            close_old_connections()
+            try:
+                job = queue.claim()
+            except Exception as e:
+                logger.error(f"Failed to claim transfer job: {str(e)}")
+                job = None
+
+            if job is None:
+                self.stop.wait(poll_interval)
+                continue
+
+            logger.info(f"Worker {queue.worker_id} running transfer job {job.id}")
+            try:
+                queue.run_job(job, transfer_service)
+            except Exception as e:
+                # The lease lapses and another worker picks the job up again
+                logger.error(f"Transfer job {job.id} failed to run: {str(e)}")
+                self.stop.wait(poll_interval)
+        close_old_connections()
@@ -0,0 +1,135 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dicom_api", "0002_transferlog_batch_id_transferlog_files_failed_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportSession",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "session_id",
+                    models.CharField(
+                        help_text="Import session identifier returned to the frontend",
+                        max_length=64,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "temp_dir",
+                    models.CharField(
+                        help_text="Directory containing the imported files",
+                        max_length=512,
+                    ),
+                ),
+                (
+                    "file_count",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Number of DICOM files in the session"
+                    ),
+                ),
+                (
+                    "total_bytes",
+                    models.BigIntegerField(
+                        default=0, help_text="Disk space used by the session's files"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "last_used_at",
+                    models.DateTimeField(
+                        help_text="When the session was last imported into or sent from"
+                    ),
+                ),
+                (
+                    "expires_at",
+                    models.DateTimeField(
+                        db_index=True,
+                        help_text="When the session and its files may be removed",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        help_text="User who imported the files",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ImportedSeries",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "series_key",
+                    models.CharField(
+                        help_text="Session-scoped series identifier (session_id + SeriesInstanceUID)",
+                        max_length=128,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "files",
+                    models.JSONField(
+                        default=list,
+                        help_text="Parsed metadata of each file, including its file_path",
+                    ),
+                ),
+                ("instance_count", models.PositiveIntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        help_text="User who imported the series",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "session",
+                    models.ForeignKey(
+                        help_text="Import session the series belongs to",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="series",
+                        to="dicom_api.importsession",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="importsession",
+            index=models.Index(
+                fields=["last_used_at"], name="dicom_api_i_last_us_ed2620_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,110 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("destinations", "0001_initial"),
+        ("dicom_api", "0003_import_sessions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TransferJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("sending", "Sending"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        help_text="Queue state of the job",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "file_paths",
+                    models.JSONField(default=list, help_text="DICOM files to send"),
+                ),
+                (
+                    "attempts",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Number of times a worker has started this job",
+                    ),
+                ),
+                (
+                    "lease_owner",
+                    models.CharField(
+                        blank=True,
+                        help_text="Worker currently holding the job",
+                        max_length=128,
+                    ),
+                ),
+                (
+                    "lease_expires_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="When another worker may take over a job still marked sending",
+                        null=True,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "destination",
+                    models.ForeignKey(
+                        help_text="DICOM destination to send to",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="destinations.destination",
+                    ),
+                ),
+                (
+                    "session",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Import session holding the files; kept while the job is active",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="jobs",
+                        to="dicom_api.importsession",
+                    ),
+                ),
+                (
+                    "transfer_log",
+                    models.OneToOneField(
+                        help_text="Audit log entry updated by this job",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="job",
+                        to="dicom_api.transferlog",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "created_at"],
+                        name="dicom_api_t_status_5f6260_idx",
+                    )
+                ],
+            },
+        ),
+    ]
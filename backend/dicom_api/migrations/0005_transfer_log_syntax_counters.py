@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dicom_api", "0004_transfer_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transferlog",
+            name="files_converted",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Number of files re-encoded to a transfer syntax the destination accepts",
+            ),
+        ),
+        migrations.AddField(
+            model_name="transferlog",
+            name="files_passed_through",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Number of files sent in their original transfer syntax",
+            ),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dicom_api", "0005_transfer_log_syntax_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TransferInstance",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("file_path", models.CharField(max_length=1024)),
+                (
+                    "sop_instance_uid",
+                    models.CharField(
+                        blank=True,
+                        help_text="SOP Instance UID, when known to the sender",
+                        max_length=64,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("success", "Success"), ("failed", "Failed")],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "dimse_status",
+                    models.PositiveIntegerField(
+                        blank=True,
+                        help_text="Status of the C-STORE response",
+                        null=True,
+                    ),
+                ),
+                ("bytes_transferred", models.BigIntegerField(default=0)),
+                (
+                    "converted",
+                    models.BooleanField(
+                        help_text="Whether the file was re-encoded before sending (empty if never sent)",
+                        null=True,
+                    ),
+                ),
+                ("error_message", models.TextField(blank=True)),
+                ("recorded_at", models.DateTimeField()),
+                (
+                    "transfer_log",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="instances",
+                        to="dicom_api.transferlog",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["id"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("transfer_log", "file_path"),
+                        name="unique_transfer_instance",
+                    )
+                ],
+            },
+        ),
+    ]
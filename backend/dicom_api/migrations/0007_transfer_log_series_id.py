@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dicom_api", "0006_transfer_instance"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transferlog",
+            name="series_id",
+            field=models.CharField(
+                blank=True,
+                help_text="Import-session series key the transfer was requested for",
+                max_length=128,
+            ),
+        ),
+    ]
@@ -0,0 +1,57 @@
+from django.db import migrations
+
+BATCH_SIZE = 50000
+
+
+def backfill_series_id(apps, schema_editor):
+    """Copy details['series_id'] of send logs into the series_id column."""
+    TransferLog = apps.get_model("dicom_api", "TransferLog")
+    connection = schema_editor.connection
+
+    if connection.vendor == "postgresql":
+        # Walk the primary key in ranges so each batch commits on its own
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT MIN(id), MAX(id) FROM {TransferLog._meta.db_table}")
+            low, high = cursor.fetchone()
+            if low is None:
+                return
+            for start in range(low, high + 1, BATCH_SIZE):
+                cursor.execute(
+                    f"""
+                    UPDATE {TransferLog._meta.db_table}
+                    SET series_id = details->>'series_id'
+                    WHERE id >= %s AND id < %s
+                      AND action = 'send'
+                      AND series_id = ''
+                      AND details ? 'series_id'
+                    """,
+                    [start, start + BATCH_SIZE],
+                )
+        return
+
+    pending = TransferLog.objects.filter(series_id="", action="send").only("id", "details")
+    batch = []
+    for transfer_log in pending.iterator(chunk_size=BATCH_SIZE):
+        series_id = (transfer_log.details or {}).get("series_id")
+        if series_id:
+            transfer_log.series_id = series_id
+            batch.append(transfer_log)
+        if len(batch) >= BATCH_SIZE:
+            TransferLog.objects.bulk_update(batch, ["series_id"])
+            batch = []
+    if batch:
+        TransferLog.objects.bulk_update(batch, ["series_id"])
+
+
+class Migration(migrations.Migration):
+
+    # Batches commit individually instead of holding one long transaction
+    atomic = False
+
+    dependencies = [
+        ("dicom_api", "0007_transfer_log_series_id"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_series_id, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+from dicom_api.migration_operations import AddIndexConcurrentlyIfSupported
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("dicom_api", "0008_backfill_transfer_log_series_id"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfSupported(
+            model_name="transferlog",
+            index=models.Index(
+                fields=["user", "series_id"], name="dicom_api_t_user_id_d58300_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-17 05:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+from dicom_api.migration_operations import AddIndexConcurrentlyIfSupported
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("destinations", "0003_destination_capability"),
+        ("dicom_api", "0009_transfer_log_series_id_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfSupported(
+            model_name="transferlog",
+            index=models.Index(
+                fields=["-timestamp", "-id"], name="dicom_api_t_timesta_f6a556_idx"
+            ),
+        ),
+    ]
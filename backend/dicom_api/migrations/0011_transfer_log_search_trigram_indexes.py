@@ -0,0 +1,62 @@
+import logging
+
+from django.db import migrations
+
+logger = logging.getLogger("dicom_transfer")
+
+# Columns searched by TransferLogViewSet.search_fields
+SEARCH_COLUMNS = ["patient_name", "series_description", "error_message"]
+
+
+def index_name(column):
+    return f"dicom_api_transferlog_{column}_trgm"
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """
+    Index the expressions SearchFilter's icontains lookups compile to.
+
+    On PostgreSQL, icontains becomes UPPER(column::text) LIKE UPPER('%term%'),
+    which a pg_trgm GIN index on UPPER(column::text) can answer for terms of
+    three or more characters. Other databases keep searching by scan.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except Exception as e:
+            logger.warning(f"pg_trgm is not available, audit log search stays unindexed: {str(e)}")
+            return
+
+        for column in SEARCH_COLUMNS:
+            cursor.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name(column)} "
+                f"ON dicom_api_transferlog USING gin ((UPPER(({column})::text)) gin_trgm_ops)"
+            )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+
+    with connection.cursor() as cursor:
+        for column in SEARCH_COLUMNS:
+            cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name(column)}")
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("dicom_api", "0010_transfer_log_keyset_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
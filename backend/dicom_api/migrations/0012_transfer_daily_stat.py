@@ -0,0 +1,79 @@
+# Generated by Django 5.2.4 on 2026-10-17 05:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dicom_api", "0011_transfer_log_search_trigram_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TransferDailyStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(help_text="Day the transfers started")),
+                (
+                    "destination_name",
+                    models.CharField(
+                        blank=True,
+                        help_text="Destination name, kept so history survives deleted destinations",
+                        max_length=100,
+                    ),
+                ),
+                ("modality", models.CharField(blank=True, max_length=16)),
+                ("status", models.CharField(max_length=20)),
+                ("transfers", models.PositiveIntegerField(default=0)),
+                (
+                    "instances",
+                    models.BigIntegerField(
+                        default=0, help_text="Instances sent successfully"
+                    ),
+                ),
+                ("instances_failed", models.BigIntegerField(default=0)),
+                ("bytes_transferred", models.BigIntegerField(default=0)),
+                (
+                    "duration_seconds",
+                    models.FloatField(
+                        default=0, help_text="Total time from queueing to completion"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="transfer_daily_stats",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-day"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=(
+                            "day",
+                            "user",
+                            "destination_name",
+                            "modality",
+                            "status",
+                        ),
+                        name="unique_transfer_daily_stat",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-17 05:14
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("destinations", "0004_destination_retry_policy"),
+        ("dicom_api", "0012_transfer_daily_stat"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transferjob",
+            name="available_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                help_text="When the job may be claimed; pushed back while a retry waits out its backoff",
+            ),
+        ),
+        migrations.AddField(
+            model_name="transferlog",
+            name="attempt_history",
+            field=models.JSONField(
+                blank=True,
+                default=list,
+                help_text="One entry per send attempt: timing, files sent, outcome and scheduled retry",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transferjob",
+            index=models.Index(
+                fields=["status", "available_at"], name="dicom_api_t_status_4dde96_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.4 on 2026-10-17 05:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dicom_api", "0013_transfer_retries"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transferjob",
+            name="skip_sent",
+            field=models.CharField(
+                choices=[
+                    ("none", "Send every instance"),
+                    ("index", "Skip instances already sent to the destination"),
+                    ("verify", "Skip instances already sent and still found by C-FIND"),
+                ],
+                default="none",
+                help_text="Whether instances the destination already holds are skipped",
+                max_length=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name="transferlog",
+            name="bytes_skipped",
+            field=models.BigIntegerField(
+                default=0, help_text="Size of the skipped files"
+            ),
+        ),
+        migrations.AddField(
+            model_name="transferlog",
+            name="files_skipped",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Number of files not sent because the destination already had them",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="transferinstance",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("success", "Success"),
+                    ("failed", "Failed"),
+                    ("skipped", "Skipped (already at the destination)"),
+                ],
+                max_length=10,
+            ),
+        ),
+    ]
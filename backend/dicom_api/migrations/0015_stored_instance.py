@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-17 05:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dicom_api", "0014_sent_instance_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StoredInstance",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "content_hash",
+                    models.CharField(
+                        help_text="SHA-256 of the file, also its name in the store",
+                        max_length=64,
+                        unique=True,
+                    ),
+                ),
+                ("sop_instance_uid", models.CharField(blank=True, max_length=64)),
+                ("size", models.BigIntegerField(default=0)),
+                (
+                    "metadata",
+                    models.JSONField(
+                        default=dict,
+                        help_text="Parsed metadata of the file, without its path",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
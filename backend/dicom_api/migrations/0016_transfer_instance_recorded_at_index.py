@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-17 05:33
+
+from django.db import migrations, models
+
+from dicom_api.migration_operations import AddIndexConcurrentlyIfSupported
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("dicom_api", "0015_stored_instance"),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfSupported(
+            model_name="transferinstance",
+            index=models.Index(
+                fields=["recorded_at"], name="dicom_api_t_recorde_7e36f5_idx"
+            ),
+        ),
+    ]
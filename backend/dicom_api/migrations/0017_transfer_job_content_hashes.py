@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-17 05:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dicom_api", "0016_transfer_instance_recorded_at_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transferjob",
+            name="content_hashes",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="SHA-256 of each file recorded at import, keyed by file path",
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dicom_api", "0017_transfer_job_content_hashes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="importsession",
+            name="total_bytes",
+            field=models.BigIntegerField(
+                default=0,
+                help_text="Disk space used by the session's files not shared through the instance store",
+            ),
+        ),
+    ]
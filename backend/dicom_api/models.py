@@ -1,4 +1,6 @@
+import os
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 from destinations.models import Destination
 
@@ -101,6 +103,11 @@ class TransferLog(models.Model):
         db_index=True,
         help_text="Unique identifier for grouping transfers initiated together"
     )
+    series_id = models.CharField(
+        max_length=128,
+        blank=True,
+        help_text="Import-session series key the transfer was requested for"
+    )
 
     # File-level success/failure tracking
     files_succeeded = models.PositiveIntegerField(
@@ -111,6 +118,22 @@ class TransferLog(models.Model):
         default=0,
         help_text="Number of files that failed to transfer"
     )
+    files_converted = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of files re-encoded to a transfer syntax the destination accepts"
+    )
+    files_passed_through = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of files sent in their original transfer syntax"
+    )
+    files_skipped = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of files not sent because the destination already had them"
+    )
+    bytes_skipped = models.BigIntegerField(  # type: ignore
+        default=0,
+        help_text="Size of the skipped files"
+    )
 
     # Explicit manager annotation for static type checkers (e.g., mypy)
     objects: models.Manager = models.Manager()
@@ -134,6 +157,11 @@ class TransferLog(models.Model):
         blank=True,
         help_text="Additional operation details (duration, file paths, etc.)"
     )
+    attempt_history = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="One entry per send attempt: timing, files sent, outcome and scheduled retry"
+    )
     
     class Meta:
         ordering = ['-timestamp']
@@ -143,6 +171,8 @@ class TransferLog(models.Model):
             models.Index(fields=['user', '-timestamp']),
             models.Index(fields=['status', '-timestamp']),
             models.Index(fields=['action', '-timestamp']),
+            models.Index(fields=['user', 'series_id']),
+            models.Index(fields=['-timestamp', '-id']),
         ]
 
     def __str__(self):
@@ -156,8 +186,7 @@ class TransferLog(models.Model):
 
     def mark_completed(self, status, error_message=None, **details):
         """Mark the operation as completed with the given status."""
-        from django.utils import timezone
-        
+        was_completed = self.is_completed()
         self.status = status
         self.completed_at = timezone.now()
         if error_message:
@@ -166,6 +195,26 @@ class TransferLog(models.Model):
             self.details.update(details)  # type: ignore
         self.save()
 
+        if self.action == 'send':
+            from .events import publish_transfer_status
+            publish_transfer_status(self.id)  # type: ignore
+
+            # Count each transfer once, when it first reaches a final state
+            if not was_completed:
+                from .rollup import record_completed_transfer
+                record_completed_transfer(self)
+
+    def mark_retrying(self, error_message, **details):
+        """Record a failed attempt that will be retried; the log stays pending."""
+        self.status = 'pending'
+        self.error_message = error_message
+        if details:
+            self.details.update(details)  # type: ignore
+        self.save()
+
+        from .events import publish_transfer_status
+        publish_transfer_status(self.id)  # type: ignore
+
     def get_duration(self):
         """Get the duration of the operation if completed."""
         if self.completed_at and self.timestamp:
@@ -175,3 +224,314 @@ class TransferLog(models.Model):
     def is_completed(self):
         """Check if the operation is in a final state."""
         return self.status in ['success', 'failed']
+
+
+class TransferInstance(models.Model):
+    """
+    Outcome of sending one file of a transfer.
+
+    Written in batches while the transfer runs, so progress is visible per
+    instance and a retry can tell which files still need to be sent.
+    """
+
+    STATUS_CHOICES = [
+        ('success', 'Success'),
+        ('failed', 'Failed'),
+        ('skipped', 'Skipped (already at the destination)'),
+    ]
+
+    transfer_log = models.ForeignKey(
+        TransferLog,
+        on_delete=models.CASCADE,
+        related_name='instances'
+    )
+    file_path = models.CharField(max_length=1024)
+    sop_instance_uid = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text="SOP Instance UID, when known to the sender"
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    dimse_status = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Status of the C-STORE response"
+    )
+    bytes_transferred = models.BigIntegerField(default=0)  # type: ignore
+    converted = models.BooleanField(
+        null=True,
+        help_text="Whether the file was re-encoded before sending (empty if never sent)"
+    )
+    error_message = models.TextField(blank=True)
+    recorded_at = models.DateTimeField()
+
+    # Explicit manager annotation for static type checkers (e.g., mypy)
+    objects: models.Manager = models.Manager()
+
+    class Meta:
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['transfer_log', 'file_path'],
+                name='unique_transfer_instance'
+            ),
+        ]
+        indexes = [
+            # Live throughput sums the instances of the last minute
+            models.Index(fields=['recorded_at']),
+        ]
+
+    def __str__(self):
+        return f"{os.path.basename(self.file_path)} ({self.status})"
+
+
+class TransferDailyStat(models.Model):
+    """
+    Completed sends rolled up per day, user, destination, modality and status.
+
+    Incremented by TransferLog.mark_completed as each send finishes and
+    rebuilt from the logs by the rollup_transfer_stats command, so volume
+    and throughput reports over long ranges read a few rows per day
+    instead of every transfer.
+    """
+    day = models.DateField(help_text="Day the transfers started")
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='transfer_daily_stats'
+    )
+    destination_name = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Destination name, kept so history survives deleted destinations"
+    )
+    modality = models.CharField(max_length=16, blank=True)
+    status = models.CharField(max_length=20)
+    transfers = models.PositiveIntegerField(default=0)
+    instances = models.BigIntegerField(
+        default=0,
+        help_text="Instances sent successfully"
+    )
+    instances_failed = models.BigIntegerField(default=0)
+    bytes_transferred = models.BigIntegerField(default=0)
+    duration_seconds = models.FloatField(
+        default=0,
+        help_text="Total time from queueing to completion"
+    )
+
+    objects: models.Manager = models.Manager()
+
+    class Meta:
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'user', 'destination_name', 'modality', 'status'],
+                name='unique_transfer_daily_stat'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.destination_name or '-'} {self.status}: {self.transfers} transfers"
+
+
+class ImportSession(models.Model):
+    """
+    Temporary directory holding the files of one DICOM import.
+    Stored in the database so every worker process can resolve it.
+    """
+    session_id = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text="Import session identifier returned to the frontend"
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        help_text="User who imported the files"
+    )
+    temp_dir = models.CharField(
+        max_length=512,
+        help_text="Directory containing the imported files"
+    )
+    file_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of DICOM files in the session"
+    )
+    total_bytes = models.BigIntegerField(
+        default=0,
+        help_text="Disk space used by the session's files not shared through the instance store"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(
+        help_text="When the session was last imported into or sent from"
+    )
+    expires_at = models.DateTimeField(
+        db_index=True,
+        help_text="When the session and its files may be removed"
+    )
+
+    objects: models.Manager = models.Manager()
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['last_used_at']),
+        ]
+
+    def __str__(self):
+        return f"Import session {self.session_id} ({self.file_count} files)"
+
+
+class StoredInstance(models.Model):
+    """
+    A DICOM file in the content-addressed instance store.
+
+    Imports hardlink their files to the stored copy, so content uploaded
+    again takes no extra disk, and reuse the metadata parsed the first
+    time instead of reading the file again.
+    """
+    content_hash = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text="SHA-256 of the file, also its name in the store"
+    )
+    sop_instance_uid = models.CharField(max_length=64, blank=True)
+    size = models.BigIntegerField(default=0)  # type: ignore
+    metadata = models.JSONField(
+        default=dict,
+        help_text="Parsed metadata of the file, without its path"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects: models.Manager = models.Manager()
+
+    def __str__(self):
+        return f"{self.content_hash[:12]} ({self.sop_instance_uid or 'unknown instance'})"
+
+
+class ImportedSeries(models.Model):
+    """
+    One series of an import session, looked up by the series key the
+    frontend sends back when requesting a transfer.
+    """
+    series_key = models.CharField(
+        max_length=128,
+        unique=True,
+        help_text="Session-scoped series identifier (session_id + SeriesInstanceUID)"
+    )
+    session = models.ForeignKey(
+        ImportSession,
+        on_delete=models.CASCADE,
+        related_name='series',
+        help_text="Import session the series belongs to"
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        help_text="User who imported the series"
+    )
+    files = models.JSONField(
+        default=list,
+        help_text="Parsed metadata of each file, including its file_path"
+    )
+    instance_count = models.PositiveIntegerField(default=0)
+
+    objects: models.Manager = models.Manager()
+
+    def __str__(self):
+        return self.series_key
+
+
+class TransferJob(models.Model):
+    """
+    Durable unit of work for sending one series to one destination.
+    Jobs are leased by transfer workers with SELECT ... FOR UPDATE SKIP LOCKED,
+    so a job survives restarts and is picked up again once its lease lapses.
+    """
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    SKIP_SENT_CHOICES = [
+        ('none', 'Send every instance'),
+        ('index', 'Skip instances already sent to the destination'),
+        ('verify', 'Skip instances already sent and still found by C-FIND'),
+    ]
+
+    transfer_log = models.OneToOneField(
+        TransferLog,
+        on_delete=models.CASCADE,
+        related_name='job',
+        help_text="Audit log entry updated by this job"
+    )
+    destination = models.ForeignKey(
+        Destination,
+        on_delete=models.CASCADE,
+        help_text="DICOM destination to send to"
+    )
+    session = models.ForeignKey(
+        ImportSession,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs',
+        help_text="Import session holding the files; kept while the job is active"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='pending',
+        help_text="Queue state of the job"
+    )
+    file_paths = models.JSONField(
+        default=list,
+        help_text="DICOM files to send"
+    )
+    content_hashes = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="SHA-256 of each file recorded at import, keyed by file path"
+    )
+    skip_sent = models.CharField(
+        max_length=10,
+        choices=SKIP_SENT_CHOICES,
+        default='none',
+        help_text="Whether instances the destination already holds are skipped"
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of times a worker has started this job"
+    )
+    lease_owner = models.CharField(
+        max_length=128,
+        blank=True,
+        help_text="Worker currently holding the job"
+    )
+    lease_expires_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When another worker may take over a job still marked sending"
+    )
+    available_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="When the job may be claimed; pushed back while a retry waits out its backoff"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    objects: models.Manager = models.Manager()
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f"Transfer job {self.id} ({self.status})"  # type: ignore
@@ -0,0 +1,156 @@
+import json
+import base64
+import logging
+from collections import OrderedDict
+
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+logger = logging.getLogger('dicom_transfer')
+
+
+def estimated_count(queryset) -> int:
+    """
+    Estimate the number of rows in a queryset from planner statistics.
+
+    On PostgreSQL this reads the row estimate of EXPLAIN, which uses the
+    table statistics kept by ANALYZE instead of scanning the rows. Other
+    databases fall back to an exact count.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+    except Exception as e:
+        logger.warning(f"Could not estimate row count, counting instead: {str(e)}")
+        return queryset.count()
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class TransferLogPagination(PageNumberPagination):
+    """
+    Page numbers by default, keyset pages when a cursor parameter is given.
+
+    Keyset pages are ordered by (-timestamp, -id) and continue from the
+    last row of the previous page with a WHERE clause, so deep pages cost
+    the same as the first one and no COUNT(*) is run. Pass cursor= (empty)
+    for the first page and follow the next/previous links from there.
+    count=estimate adds a planner estimate of the total, count=exact an
+    exact count.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    keyset_ordering = ('-timestamp', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        position, reverse = self._decode_cursor(request.query_params[self.cursor_query_param])
+
+        self.total = None
+        count_mode = request.query_params.get(self.count_query_param)
+        if count_mode == 'estimate':
+            self.total = estimated_count(queryset)
+        elif count_mode == 'exact':
+            self.total = queryset.order_by().count()
+
+        if reverse:
+            queryset = queryset.order_by('timestamp', 'id')
+            if position:
+                queryset = queryset.filter(
+                    Q(timestamp__gt=position[0]) | Q(timestamp=position[0], id__gt=position[1])
+                )
+        else:
+            queryset = queryset.order_by(*self.keyset_ordering)
+            if position:
+                queryset = queryset.filter(
+                    Q(timestamp__lt=position[0]) | Q(timestamp=position[0], id__lt=position[1])
+                )
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next = bool(position)
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = bool(position)
+
+        self.page_rows = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+
+        response = OrderedDict([
+            ('next', self._link(self.page_rows[-1], False) if self.has_next and self.page_rows else None),
+            ('previous', self._link(self.page_rows[0], True) if self.has_previous and self.page_rows else None),
+            ('results', data),
+        ])
+        if self.total is not None:
+            response['count'] = self.total
+        return Response(response)
+
+    def _link(self, row, reverse: bool) -> str:
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, 'page')
+        # The total only needs to be fetched with the first page
+        url = remove_query_param(url, self.count_query_param)
+        return replace_query_param(url, self.cursor_query_param, self._encode_cursor(row, reverse))
+
+    @staticmethod
+    def _encode_cursor(row, reverse: bool) -> str:
+        payload = json.dumps({'t': row.timestamp.isoformat(), 'i': row.id, 'r': reverse})
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def _decode_cursor(cursor: str):
+        """
+        Returns:
+            ((timestamp, id) or None for the first page, reverse)
+        """
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+            timestamp = parse_datetime(payload['t'])
+            if timestamp is None:
+                raise ValueError(payload['t'])
+            return (timestamp, int(payload['i'])), bool(payload.get('r'))
+        except Exception:
+            raise NotFound('Invalid cursor')
+
+
+class TransferInstancePagination(PageNumberPagination):
+    """
+    Page numbers over the instances of one transfer, which are few enough
+    to count; TransferLogPagination's keyset mode orders by timestamp,
+    which instances do not have.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 500
@@ -0,0 +1,183 @@
+import os
+import re
+import time
+import logging
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .events import publish_transfer_status
+from .models import TransferInstance, TransferLog
+
+logger = logging.getLogger('dicom_transfer')
+
+
+def instance_result(file_path: str, status: str, size: int = 0, sent_path: Optional[str] = None,
+                    converted=None, error: str = '', sop_instance_uid: str = '',
+                    dimse_status: Optional[int] = None) -> Dict:
+    """Build a per-instance result in the format produced by the C-STORE engine."""
+    return {
+        'file_path': file_path,
+        'sop_instance_uid': sop_instance_uid,
+        'status': status,
+        'dimse_status': dimse_status,
+        'bytes': size,
+        'sent_path': sent_path or file_path,
+        'converted': converted,
+        'error': error,
+    }
+
+
+class TransferProgress:
+    """
+    Records per-instance outcomes of a running transfer.
+
+    Outcomes are buffered and flushed every DICOM_PROGRESS_FLUSH_INSTANCES
+    instances or DICOM_PROGRESS_FLUSH_INTERVAL_MS milliseconds, whichever
+    comes first. A flush upserts the TransferInstance rows and adds to the
+    log's files_succeeded, files_failed and bytes_transferred with a single
+    F() update, so readers see progress without the sender saving the log.
+    Totals start from the log's counters, which carry the instances
+    confirmed by earlier attempts when a transfer is retried.
+    """
+
+    def __init__(self, transfer_log, flush_instances: Optional[int] = None,
+                 flush_interval_ms: Optional[int] = None):
+        self.transfer_log = transfer_log
+        self.flush_instances = flush_instances or getattr(settings, 'DICOM_PROGRESS_FLUSH_INSTANCES', 50)
+        interval_ms = flush_interval_ms if flush_interval_ms is not None else getattr(
+            settings, 'DICOM_PROGRESS_FLUSH_INTERVAL_MS', 1000
+        )
+        self.flush_interval = interval_ms / 1000
+        self.succeeded = transfer_log.files_succeeded or 0
+        # Instances confirmed before this attempt started
+        self.resumed_from = self.succeeded
+        self.failed = 0
+        self.bytes_transferred = transfer_log.bytes_transferred or 0
+        self._pending: List[Dict] = []
+        self._last_flush = time.monotonic()
+
+    def record(self, result: Dict):
+        """Buffer one instance outcome, flushing when a batch is due."""
+        self._pending.append(result)
+        if (len(self._pending) >= self.flush_instances
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write buffered outcomes and bump the log counters."""
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+
+        now = timezone.now()
+        TransferInstance.objects.bulk_create(
+            [
+                TransferInstance(
+                    transfer_log_id=self.transfer_log.id,
+                    file_path=result['file_path'],
+                    sop_instance_uid=result.get('sop_instance_uid') or '',
+                    status=result['status'],
+                    dimse_status=result.get('dimse_status'),
+                    bytes_transferred=result.get('bytes', 0),
+                    converted=result.get('converted'),
+                    error_message=result.get('error') or '',
+                    recorded_at=now,
+                )
+                for result in pending
+            ],
+            update_conflicts=True,
+            unique_fields=['transfer_log', 'file_path'],
+            update_fields=[
+                'sop_instance_uid', 'status', 'dimse_status', 'bytes_transferred',
+                'converted', 'error_message', 'recorded_at',
+            ],
+        )
+
+        succeeded = sum(1 for r in pending if r['status'] == 'success')
+        failed = len(pending) - succeeded
+        size = sum(r.get('bytes', 0) for r in pending if r['status'] == 'success')
+        TransferLog.objects.filter(id=self.transfer_log.id).update(  # type: ignore
+            files_succeeded=F('files_succeeded') + succeeded,
+            files_failed=F('files_failed') + failed,
+            bytes_transferred=Coalesce(F('bytes_transferred'), Value(0)) + size,
+        )
+        self.succeeded += succeeded
+        self.failed += failed
+        self.bytes_transferred += size
+        publish_transfer_status(self.transfer_log.id)
+
+
+class StorescuOutputParser:
+    """
+    Turns the --verbose log of storescu into per-instance results.
+
+    storescu logs 'Sending file: <path>' before each C-STORE and
+    'Received Store Response (<status>)' after it. Files that never got a
+    response are reported by finish().
+    """
+
+    SENDING_FILE = re.compile(r'Sending file: (.+?)\s*$')
+    STORE_RESPONSE = re.compile(r'Received Store Response \(([^),]+)')
+    STORE_FAILED = re.compile(r'Store Failed, file: (.+?):?\s*$')
+
+    def __init__(self, original_paths: Dict[str, str], on_result: Callable[[Dict], None]):
+        """
+        Args:
+            original_paths: Mapping of each path passed to storescu to the original file
+            on_result: Called with each per-instance result
+        """
+        self.original_paths = original_paths
+        self.on_result = on_result
+        self.reported = set()
+        self.last_error = ''
+        self._current: Optional[str] = None
+
+    def feed(self, line: str):
+        """Process one line of storescu output."""
+        if line.startswith('E:'):
+            self.last_error = line[2:].strip() or self.last_error
+
+        match = self.SENDING_FILE.search(line)
+        if match:
+            self._current = match.group(1)
+            return
+
+        match = self.STORE_RESPONSE.search(line)
+        if match and self._current:
+            outcome = match.group(1).strip()
+            if outcome in ('Success', 'Warning'):
+                self._report(self._current, 'success')
+            else:
+                self._report(self._current, 'failed', f"C-STORE response: {outcome}")
+            self._current = None
+            return
+
+        match = self.STORE_FAILED.search(line)
+        if match:
+            self._report(match.group(1), 'failed', line.strip())
+            self._current = None
+
+    def finish(self, success: bool):
+        """Report every file storescu did not log a response for."""
+        for sent_path in self.original_paths:
+            if sent_path not in self.reported:
+                if success:
+                    self._report(sent_path, 'success')
+                else:
+                    self._report(sent_path, 'failed', self.last_error or "No response from destination")
+
+    def _report(self, sent_path: str, status: str, error: str = ''):
+        if sent_path in self.reported or sent_path not in self.original_paths:
+            return
+        self.reported.add(sent_path)
+        file_path = self.original_paths[sent_path]
+        size = os.path.getsize(sent_path) if status == 'success' and os.path.exists(sent_path) else 0
+        self.on_result(instance_result(
+            file_path, status, size, sent_path=sent_path,
+            converted=sent_path != file_path, error=error,
+        ))
@@ -0,0 +1,244 @@
+import os
+import shutil
+import logging
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Sum
+from django.utils import timezone
+
+from .jobs import ACTIVE_JOB_STATUSES
+from .models import ImportSession, ImportedSeries, StoredInstance, TransferLog
+from .store import InstanceStore
+
+logger = logging.getLogger('dicom_transfer')
+
+
+def directory_size(path: str) -> int:
+    """
+    Disk space deleting a directory frees: the size of the files under it
+    that are not also linked from elsewhere, such as the instance store.
+    """
+    size = 0
+    for root, _dirs, names in os.walk(path):
+        for name in names:
+            try:
+                stat = os.lstat(os.path.join(root, name))
+            except OSError:
+                continue
+            if stat.st_nlink <= 1:
+                size += stat.st_size
+    return size
+
+
+class SeriesRegistry:
+    """
+    Database-backed registry of imported series and their session directories.
+
+    Replaces the per-process series cache so any worker can resolve a series
+    imported by another one. Sessions expire DICOM_IMPORT_SESSION_TTL seconds
+    after their last use, or DICOM_IMPORT_SENT_SESSION_TTL seconds after it
+    once every series was sent successfully. The least recently used
+    sessions are evicted when the registry grows past DICOM_IMPORT_MAX_BYTES
+    or DICOM_IMPORT_MAX_SESSIONS, or when the upload directory's disk has
+    less than DICOM_IMPORT_MIN_FREE_BYTES free. Evicting a session deletes
+    its directory; sessions with queued or running transfer jobs are never
+    evicted. Eviction runs in the storage janitor, not in the import
+    request registering the session.
+    """
+
+    def __init__(self):
+        self.ttl = timedelta(seconds=getattr(settings, 'DICOM_IMPORT_SESSION_TTL', 24 * 60 * 60))
+        self.sent_ttl = getattr(settings, 'DICOM_IMPORT_SENT_SESSION_TTL', 0)
+        self.max_bytes = getattr(settings, 'DICOM_IMPORT_MAX_BYTES', 0)
+        self.max_sessions = getattr(settings, 'DICOM_IMPORT_MAX_SESSIONS', 0)
+        self.min_free_bytes = getattr(settings, 'DICOM_IMPORT_MIN_FREE_BYTES', 0)
+        self.upload_dir = getattr(settings, 'DICOM_UPLOAD_DIR', None)
+
+    def register(self, session_id: str, user, temp_dir: str, patients: List[Dict]) -> ImportSession:
+        """
+        Record an import session and its series.
+
+        Series IDs in patients are rewritten to the session-scoped keys the
+        frontend uses to request transfers. The session's size counts only
+        files not shared through the instance store, which the registry
+        counts once per stored copy.
+        """
+        now = timezone.now()
+        series_rows = []
+        file_count = 0
+
+        for patient in patients:
+            for series in patient['series']:
+                series_key = f"{session_id}_{series['id']}"
+                files = series.get('files', [])
+                file_count += len(files)
+                series_rows.append(ImportedSeries(
+                    series_key=series_key,
+                    user=user,
+                    files=files,
+                    instance_count=len(files),
+                ))
+                # Update series ID to include session for frontend
+                series['id'] = series_key
+
+        with transaction.atomic():
+            session = ImportSession.objects.create(
+                session_id=session_id,
+                user=user,
+                temp_dir=temp_dir,
+                file_count=file_count,
+                total_bytes=directory_size(temp_dir) if temp_dir and os.path.isdir(temp_dir) else 0,
+                last_used_at=now,
+                expires_at=now + self.ttl,
+            )
+            for row in series_rows:
+                row.session = session
+            ImportedSeries.objects.bulk_create(series_rows)
+
+        return session
+
+    def get(self, series_key: str) -> Optional[ImportedSeries]:
+        """
+        Look up a live series by key and mark its session as used.
+
+        Returns:
+            ImportedSeries instance or None if unknown or expired
+        """
+        return self.get_many([series_key]).get(series_key)
+
+    def get_many(self, series_keys: Iterable[str]) -> Dict[str, ImportedSeries]:
+        """
+        Look up several live series with one query and mark their sessions as used.
+
+        Returns:
+            Mapping of series key to ImportedSeries for the keys that were found
+        """
+        now = timezone.now()
+        found = {
+            series.series_key: series
+            for series in ImportedSeries.objects.select_related('session').filter(
+                series_key__in=list(series_keys),
+                session__expires_at__gt=now,
+            )
+        }
+        if found:
+            ImportSession.objects.filter(
+                id__in={series.session_id for series in found.values()}
+            ).update(last_used_at=now, expires_at=now + self.ttl)
+        return found
+
+    def remove_session(self, session: ImportSession) -> Optional[int]:
+        """
+        Delete a session, its series and its directory, and release the
+        stored instances only this session used.
+
+        The session row is locked and its jobs checked again before it is
+        deleted, so a transfer queued since the session was selected keeps
+        it alive; TransferJobQueue.enqueue_many takes the same lock.
+
+        Returns:
+            Number of bytes reclaimed on disk, or None if the session is
+            gone or has queued or running transfer jobs
+        """
+        with transaction.atomic():
+            if not ImportSession.objects.select_for_update().filter(id=session.id).exists():
+                return None
+            if session.jobs.filter(status__in=ACTIVE_JOB_STATUSES).exists():
+                logger.info(f"Keeping import session {session.session_id} with queued transfers")
+                return None
+            content_hashes = {
+                f['content_hash']
+                for files in ImportedSeries.objects.filter(session=session).values_list('files', flat=True)
+                for f in files
+                if isinstance(f, dict) and f.get('content_hash')
+            }
+            session.delete()
+
+        reclaimed = 0
+        if session.temp_dir and os.path.isdir(session.temp_dir):
+            reclaimed = directory_size(session.temp_dir)
+            shutil.rmtree(session.temp_dir, ignore_errors=True)
+        if content_hashes:
+            reclaimed += InstanceStore().release(content_hashes)[1]
+        logger.info(f"Removed import session {session.session_id} ({reclaimed} bytes)")
+        return reclaimed
+
+    def sent_sessions(self):
+        """Sessions every series of which has a successful send."""
+        unsent = ImportedSeries.objects.filter(session=OuterRef('pk')).exclude(
+            Exists(TransferLog.objects.filter(
+                user_id=OuterRef('user_id'),
+                series_id=OuterRef('series_key'),
+                action='send',
+                status='success',
+            ))
+        )
+        return ImportSession.objects.filter(series__isnull=False).exclude(Exists(unsent)).distinct()
+
+    def free_bytes(self) -> Optional[int]:
+        """Free space on the upload directory's disk, or None if unknown."""
+        if not self.upload_dir:
+            return None
+        try:
+            return shutil.disk_usage(self.upload_dir).free
+        except OSError:
+            return None
+
+    def evict(self) -> Tuple[int, int]:
+        """
+        Remove expired and sent sessions, then the least recently used ones
+        while the registry is over its size limits or the disk is too full.
+
+        The registry's size is the session files not in the instance store
+        plus the stored copies, so content shared by several sessions is
+        counted once.
+
+        Returns:
+            (sessions removed, bytes reclaimed)
+        """
+        removed = 0
+        reclaimed = 0
+        now = timezone.now()
+
+        idle = ImportSession.objects.exclude(jobs__status__in=ACTIVE_JOB_STATUSES)
+
+        done = Q(expires_at__lte=now)
+        if self.sent_ttl:
+            sent = self.sent_sessions().filter(last_used_at__lte=now - timedelta(seconds=self.sent_ttl))
+            done |= Q(id__in=sent.values('id'))
+        for session in idle.filter(done):
+            freed = self.remove_session(session)
+            if freed is not None:
+                reclaimed += freed
+                removed += 1
+
+        free_bytes = self.free_bytes() if self.min_free_bytes else None
+        if not (self.max_bytes or self.max_sessions or free_bytes is not None):
+            return removed, reclaimed
+
+        total_bytes = ImportSession.objects.aggregate(total=Sum('total_bytes'))['total'] or 0
+        if InstanceStore().enabled:
+            total_bytes += StoredInstance.objects.aggregate(total=Sum('size'))['total'] or 0
+        session_count = ImportSession.objects.count()
+
+        for session in idle.order_by('last_used_at'):
+            over_bytes = self.max_bytes and total_bytes > self.max_bytes
+            over_count = self.max_sessions and session_count > self.max_sessions
+            low_disk = free_bytes is not None and free_bytes < self.min_free_bytes
+            if not (over_bytes or over_count or low_disk):
+                break
+            freed = self.remove_session(session)
+            if freed is None:
+                continue
+            # Stored copies other sessions still link to stay counted
+            total_bytes -= freed
+            session_count -= 1
+            if free_bytes is not None:
+                free_bytes += freed
+            reclaimed += freed
+            removed += 1
+
+        return removed, reclaimed
@@ -0,0 +1,97 @@
+import logging
+from datetime import date
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import TransferDailyStat, TransferLog
+
+logger = logging.getLogger('dicom_transfer')
+
+FINAL_STATUSES = ('success', 'failed')
+
+
+def record_completed_transfer(transfer_log):
+    """
+    Add a finished send to its daily rollup row, never failing the caller.
+
+    The row is bumped with an F() update; the first transfer of a day
+    creates it, and a concurrent creator losing the race retries the update.
+    """
+    try:
+        key = {
+            'day': timezone.localdate(transfer_log.timestamp),
+            'user_id': transfer_log.user_id,
+            'destination_name': transfer_log.destination.name if transfer_log.destination_id else '',
+            'modality': transfer_log.modality or '',
+            'status': transfer_log.status,
+        }
+        duration = transfer_log.get_duration()
+        totals = {
+            'transfers': 1,
+            'instances': transfer_log.files_succeeded or 0,
+            'instances_failed': transfer_log.files_failed or 0,
+            'bytes_transferred': transfer_log.bytes_transferred or 0,
+            'duration_seconds': duration.total_seconds() if duration else 0,
+        }
+        increments = {field: F(field) + value for field, value in totals.items()}
+
+        with transaction.atomic():
+            if TransferDailyStat.objects.filter(**key).update(**increments):
+                return
+            try:
+                with transaction.atomic():
+                    TransferDailyStat.objects.create(**key, **totals)
+            except IntegrityError:
+                TransferDailyStat.objects.filter(**key).update(**increments)
+    except Exception as e:
+        logger.warning(f"Could not update transfer statistics for log {transfer_log.id}: {str(e)}")
+
+
+def rebuild_daily_stats(start: date, end: date) -> int:
+    """
+    Recompute the rollup rows of start..end (inclusive) from the transfer logs.
+
+    Replaces whatever the rows held, which also repairs drift from
+    transfers whose completion was not counted.
+
+    Returns:
+        Number of rollup rows written
+    """
+    duration = ExpressionWrapper(F('completed_at') - F('timestamp'), output_field=DurationField())
+    rows = (
+        TransferLog.objects.filter(action='send', status__in=FINAL_STATUSES)  # type: ignore
+        .annotate(day=TruncDate('timestamp'))
+        .filter(day__gte=start, day__lte=end)
+        .values('day', 'user_id', 'destination__name', 'modality', 'status')
+        .annotate(
+            transfer_count=Count('id'),
+            instance_count=Coalesce(Sum('files_succeeded'), Value(0)),
+            failed_count=Coalesce(Sum('files_failed'), Value(0)),
+            byte_count=Coalesce(Sum('bytes_transferred'), Value(0)),
+            duration=Sum(duration),
+        )
+        .order_by()
+    )
+    stats = [
+        TransferDailyStat(
+            day=row['day'],
+            user_id=row['user_id'],
+            destination_name=row['destination__name'] or '',
+            modality=row['modality'] or '',
+            status=row['status'],
+            transfers=row['transfer_count'],
+            instances=row['instance_count'],
+            instances_failed=row['failed_count'],
+            bytes_transferred=row['byte_count'],
+            duration_seconds=row['duration'].total_seconds() if row['duration'] else 0,
+        )
+        for row in rows
+    ]
+
+    with transaction.atomic():
+        TransferDailyStat.objects.filter(day__gte=start, day__lte=end).delete()
+        TransferDailyStat.objects.bulk_create(stats, batch_size=1000)
+    return len(stats)
@@ -0,0 +1,188 @@
+import os
+import logging
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from pydicom.filereader import read_file_meta_info
+
+from destinations.models import SentInstance
+
+from .dimse import find_series_instances
+from .models import TransferInstance, TransferLog
+from .store import hash_file
+
+logger = logging.getLogger('dicom_transfer')
+
+# SOP Instance UIDs looked up per index query
+LOOKUP_BATCH_SIZE = 500
+
+
+def fingerprint(file_path: str, content_hash: Optional[str] = None) -> Optional[Dict]:
+    """
+    Identify a DICOM file by its SOP Instance UID and content.
+
+    Args:
+        file_path: DICOM file
+        content_hash: SHA-256 of the file if already known; hashed otherwise
+
+    Returns:
+        Dict with file_path, sop_instance_uid, content_hash (SHA-256) and
+        size, or None if the file is missing or has no File Meta UID
+    """
+    try:
+        meta = read_file_meta_info(file_path)
+        sop_instance_uid = str(getattr(meta, 'MediaStorageSOPInstanceUID', ''))
+        if not sop_instance_uid:
+            return None
+        return {
+            'file_path': file_path,
+            'sop_instance_uid': sop_instance_uid,
+            'content_hash': content_hash or hash_file(file_path),
+            'size': os.path.getsize(file_path),
+        }
+    except Exception as e:
+        logger.debug(f"Could not fingerprint {file_path}: {str(e)}")
+        return None
+
+
+class SendPlan:
+    """
+    Files of a send, split into those to send and those the destination already has.
+    """
+
+    def __init__(self, to_send: List[str], skipped: List[Dict], fingerprints: Dict[str, Dict]):
+        self.to_send = to_send
+        self.skipped = skipped
+        self.fingerprints = fingerprints
+
+    @property
+    def bytes_skipped(self) -> int:
+        return sum(info['size'] for info in self.skipped)
+
+
+class SentInstanceIndex:
+    """
+    Instances each destination confirmed storing, by SOP Instance UID and content hash.
+
+    Every instance a destination confirms is recorded. A send in 'index'
+    mode leaves out files whose UID and hash are recorded for its
+    destination; in 'verify' mode those are first looked up with a C-FIND,
+    and entries for instances the destination no longer holds are dropped
+    so the files are sent again. Disabled by DICOM_SENT_INSTANCE_INDEX.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None):
+        self.enabled = enabled if enabled is not None else getattr(settings, 'DICOM_SENT_INSTANCE_INDEX', True)
+
+    def plan(self, transfer_log, destination, file_paths: List[str], mode: str = 'none',
+             content_hashes: Optional[Dict[str, str]] = None) -> SendPlan:
+        """
+        Fingerprint the files of a send and decide which of them to skip.
+
+        Args:
+            transfer_log: TransferLog of the send, for the series to query
+            destination: Destination model instance
+            file_paths: Files to send
+            mode: 'none', 'index' or 'verify' (see TransferJob.SKIP_SENT_CHOICES)
+            content_hashes: SHA-256 recorded at import, keyed by file path;
+                only files missing from it are read and hashed
+        """
+        if not self.enabled:
+            return SendPlan(list(file_paths), [], {})
+
+        content_hashes = content_hashes or {}
+        fingerprints = {}
+        for file_path in file_paths:
+            info = fingerprint(file_path, content_hashes.get(file_path))
+            if info:
+                fingerprints[file_path] = info
+        if mode == 'none' or not fingerprints:
+            return SendPlan(list(file_paths), [], fingerprints)
+
+        known = set()
+        uids = sorted({info['sop_instance_uid'] for info in fingerprints.values()})
+        for start in range(0, len(uids), LOOKUP_BATCH_SIZE):
+            known.update(
+                SentInstance.objects.filter(
+                    destination=destination, sop_instance_uid__in=uids[start:start + LOOKUP_BATCH_SIZE]
+                ).values_list('sop_instance_uid', 'content_hash')
+            )
+        skipped = [
+            info for info in fingerprints.values()
+            if (info['sop_instance_uid'], info['content_hash']) in known
+        ]
+
+        if skipped and mode == 'verify':
+            skipped = self._verify(transfer_log, destination, skipped)
+
+        skipped_paths = {info['file_path'] for info in skipped}
+        return SendPlan([fp for fp in file_paths if fp not in skipped_paths], skipped, fingerprints)
+
+    def _verify(self, transfer_log, destination, candidates: List[Dict]) -> List[Dict]:
+        """Keep the candidates the destination reports holding; forget the others."""
+        try:
+            held = find_series_instances(
+                destination, transfer_log.study_instance_uid, transfer_log.series_instance_uid
+            )
+        except Exception as e:
+            logger.warning(f"C-FIND verification against {destination.name} failed, sending every instance: {str(e)}")
+            return []
+
+        gone = [info['sop_instance_uid'] for info in candidates if info['sop_instance_uid'] not in held]
+        if gone:
+            SentInstance.objects.filter(destination=destination, sop_instance_uid__in=gone).delete()
+            logger.info(f"{len(gone)} instances recorded as sent are no longer at {destination.name}")
+        return [info for info in candidates if info['sop_instance_uid'] in held]
+
+    def record_skipped(self, transfer_log, skipped: List[Dict]):
+        """Store skipped instances on the transfer and add them to its skipped counters."""
+        now = timezone.now()
+        TransferInstance.objects.bulk_create(
+            [
+                TransferInstance(
+                    transfer_log_id=transfer_log.id,
+                    file_path=info['file_path'],
+                    sop_instance_uid=info['sop_instance_uid'],
+                    status='skipped',
+                    recorded_at=now,
+                )
+                for info in skipped
+            ],
+            update_conflicts=True,
+            unique_fields=['transfer_log', 'file_path'],
+            update_fields=['sop_instance_uid', 'status', 'error_message', 'recorded_at'],
+        )
+        TransferLog.objects.filter(id=transfer_log.id).update(  # type: ignore
+            files_skipped=F('files_skipped') + len(skipped),
+            bytes_skipped=F('bytes_skipped') + sum(info['size'] for info in skipped),
+        )
+
+    def record_sent(self, destination, transfer_log_id: int, plan: SendPlan):
+        """Record the fingerprinted files the destination confirmed, never failing the caller."""
+        if not plan.fingerprints:
+            return
+        try:
+            confirmed = TransferInstance.objects.filter(
+                transfer_log_id=transfer_log_id, status='success'
+            ).values_list('file_path', flat=True)
+            now = timezone.now()
+            SentInstance.objects.bulk_create(
+                [
+                    SentInstance(
+                        destination=destination,
+                        sop_instance_uid=info['sop_instance_uid'],
+                        content_hash=info['content_hash'],
+                        size=info['size'],
+                        sent_at=now,
+                    )
+                    for info in (plan.fingerprints.get(fp) for fp in confirmed)
+                    if info
+                ],
+                update_conflicts=True,
+                unique_fields=['destination', 'sop_instance_uid', 'content_hash'],
+                update_fields=['size', 'sent_at'],
+            )
+        except Exception as e:
+            logger.warning(f"Could not record instances sent to {destination.name}: {str(e)}")
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import TransferLog
+from .models import TransferInstance, TransferLog
 from destinations.serializers import DestinationListSerializer
 
 class TransferLogSerializer(serializers.ModelSerializer):
@@ -21,7 +21,8 @@ class TransferLogSerializer(serializers.ModelSerializer):
             'series_instance_uid', 'series_description', 'modality',
             'instance_count', 'bytes_transferred', 'destination', 'destination_name',
             'batch_id', 'files_succeeded', 'files_failed',
-            'error_message', 'details', 'duration'
+            'files_converted', 'files_passed_through', 'files_skipped', 'bytes_skipped',
+            'error_message', 'details', 'attempt_history', 'duration'
         ]
         read_only_fields = ['id', 'timestamp', 'user']
     
@@ -39,6 +40,18 @@ class TransferLogSerializer(serializers.ModelSerializer):
             return duration.total_seconds()
         return None
 
+class TransferInstanceSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the per-instance outcomes of a transfer.
+    """
+
+    class Meta:
+        model = TransferInstance
+        fields = [
+            'id', 'file_path', 'sop_instance_uid', 'status', 'dimse_status',
+            'bytes_transferred', 'converted', 'error_message', 'recorded_at'
+        ]
+
 class TransferLogListSerializer(serializers.ModelSerializer):
     """
     Lightweight serializer for listing transfer logs.
@@ -1,76 +1,205 @@
 import os
+import time
 import subprocess
 import tempfile
 import shutil
-from typing import List, Dict, Optional, Any
+import threading
+import multiprocessing
+from collections import deque
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Optional, Any, Iterator, Tuple
 from django.conf import settings
+from django.db.models import Count, Sum
 import pydicom
 from pydicom.errors import InvalidDicomError
+from pydicom.filereader import read_file_meta_info
+from pydicom.tag import Tag
+from pydicom.uid import UID, ExplicitVRBigEndian, ExplicitVRLittleEndian, ImplicitVRLittleEndian
 import logging
 
+from .bandwidth import BandwidthShaper
+
 logger = logging.getLogger('dicom_transfer')
 
+# Uncompressed syntaxes proposed by storescu; files already in one are sent as-is
+STORESCU_TRANSFER_SYNTAXES = frozenset(
+    str(uid) for uid in (ExplicitVRLittleEndian, ImplicitVRLittleEndian, ExplicitVRBigEndian)
+)
+
+# Trailing storescu log lines kept in the transfer log details
+STORESCU_OUTPUT_LINES = 200
+
+# Work directories of converted copies, one per transfer, in DICOM_UPLOAD_DIR
+CONVERTED_DIR_PREFIX = 'dicom_convert_'
+
+# Header tags read by DICOMParser in header-only mode
+HEADER_TAGS = [
+    'PatientName',
+    'PatientID',
+    'PatientBirthDate',
+    'PatientSex',
+    'StudyInstanceUID',
+    'StudyDescription',
+    'StudyDate',
+    'SeriesInstanceUID',
+    'SeriesDescription',
+    'SeriesNumber',
+    'Modality',
+    'InstanceNumber',
+    'SOPInstanceUID',
+    'SOPClassUID',
+    'BodyPartExamined',
+    'InstitutionName',
+    'Manufacturer',
+    'Rows',
+    'Columns',
+    'SpecificCharacterSet',
+]
+_HEADER_TAG_VALUES = [Tag(keyword) for keyword in HEADER_TAGS]
+
+# Offset and value of the DICOM Part 10 file prefix
+DICM_PREFIX_OFFSET = 128
+DICM_PREFIX = b'DICM'
+
+# Little Endian encoding of the Pixel Data tag (7FE0,0010)
+PIXEL_DATA_TAG_BYTES = b'\xe0\x7f\x10\x00'
+
+
+def has_dicm_prefix(fp) -> bool:
+    """
+    Check whether an open file starts with the 128-byte preamble and 'DICM' prefix.
+    The file position is restored to the start.
+    """
+    fp.seek(DICM_PREFIX_OFFSET)
+    found = fp.read(len(DICM_PREFIX)) == DICM_PREFIX
+    fp.seek(0)
+    return found
+
+
+# Process pool shared by all imports in this process, created on first use
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+
+def _get_parse_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the shared parsing pool, creating it if needed."""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            # Spawned workers do not inherit the web process's DB connections or threads
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _parse_pool
+
+
+def _reset_parse_pool():
+    """Drop a broken parsing pool so the next import starts a fresh one."""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=False, cancel_futures=True)
+            _parse_pool = None
+
+
+def _parse_file_worker(file_path: str) -> Optional[Dict]:
+    """Pool entry point for DICOMParser.parse_file."""
+    return DICOMParser().parse_file(file_path)
+
+
+def unique_file_path(directory: str, file_name: str) -> str:
+    """
+    Return a path for file_name in directory that does not exist yet.
+    Folder uploads and archives often repeat file names (IM0001, ...)
+    across series, so a numeric suffix is added instead of overwriting.
+    """
+    file_name = os.path.basename(file_name) or 'upload'
+    base, ext = os.path.splitext(file_name)
+    file_path = os.path.join(directory, file_name)
+    counter = 1
+    while os.path.exists(file_path):
+        file_path = os.path.join(directory, f"{base}_{counter}{ext}")
+        counter += 1
+    return file_path
+
+
 class DICOMParser:
     """
     Service for parsing DICOM files and extracting metadata.
     """
+
+    def parse_files(self, file_paths: List[str]) -> Iterator[Tuple[str, Optional[Dict]]]:
+        """
+        Parse many DICOM files, in parallel when a parsing pool is configured.
+
+        Results are yielded in input order as soon as they are available.
+        The pool size and chunk size come from DICOM_PARSE_WORKERS and
+        DICOM_PARSE_CHUNK_SIZE; a worker count of 1 or less parses inline.
+
+        Args:
+            file_paths: Paths of saved DICOM files
+
+        Yields:
+            (file_path, metadata) tuples; metadata is None if parsing failed
+        """
+        workers = getattr(settings, 'DICOM_PARSE_WORKERS', 1)
+        chunk_size = max(1, getattr(settings, 'DICOM_PARSE_CHUNK_SIZE', 16))
+
+        if workers <= 1 or len(file_paths) <= chunk_size:
+            for file_path in file_paths:
+                yield file_path, self.parse_file(file_path)
+            return
+
+        done = 0
+        try:
+            pool = _get_parse_pool(workers)
+            for metadata in pool.map(_parse_file_worker, file_paths, chunksize=chunk_size):
+                yield file_paths[done], metadata
+                done += 1
+        except BrokenProcessPool:
+            logger.error("DICOM parsing pool failed, parsing remaining files inline")
+            _reset_parse_pool()
+            for file_path in file_paths[done:]:
+                yield file_path, self.parse_file(file_path)
     
-    def parse_file(self, file_path: str) -> Optional[Dict]:
+    def parse_file(self, file_path: str, header_only: bool = True) -> Optional[Dict]:
         """
         Parse a single DICOM file and extract metadata.
+
+        In header-only mode files with a Part 10 preamble are read up to the
+        pixel data, skipping every element not listed in HEADER_TAGS. Files
+        without the 'DICM' prefix fall back to a full forced read.
         
         Args:
             file_path: Path to the DICOM file
+            header_only: Read only the header tags needed for metadata
             
         Returns:
             Dictionary containing DICOM metadata or None if parsing fails
         """
         try:
             # Read DICOM file
-            ds = pydicom.dcmread(file_path, force=True)
-            
-            # Extract metadata
-            metadata = {
-                'file_path': file_path,
-                'patient_name': str(getattr(ds, 'PatientName', '')),
-                'patient_id': str(getattr(ds, 'PatientID', '')),
-                'patient_birth_date': str(getattr(ds, 'PatientBirthDate', '')),
-                'patient_sex': str(getattr(ds, 'PatientSex', '')),
-                'study_instance_uid': str(getattr(ds, 'StudyInstanceUID', '')),
-                'study_description': str(getattr(ds, 'StudyDescription', '')),
-                'study_date': str(getattr(ds, 'StudyDate', '')),
-                'series_instance_uid': str(getattr(ds, 'SeriesInstanceUID', '')),
-                'series_description': str(getattr(ds, 'SeriesDescription', '')),
-                'series_number': str(getattr(ds, 'SeriesNumber', '')),
-                'modality': str(getattr(ds, 'Modality', '')),
-                'instance_number': str(getattr(ds, 'InstanceNumber', '')),
-                'sop_instance_uid': str(getattr(ds, 'SOPInstanceUID', '')),
-                'body_part_examined': str(getattr(ds, 'BodyPartExamined', '')),
-                'institution_name': str(getattr(ds, 'InstitutionName', '')),
-                'manufacturer': str(getattr(ds, 'Manufacturer', '')),
-                'rows': getattr(ds, 'Rows', 0),
-                'columns': getattr(ds, 'Columns', 0),
-            }
-            
-            # Format dates
-            if metadata['patient_birth_date']:
-                try:
-                    # DICOM date format is YYYYMMDD
-                    date_str = metadata['patient_birth_date']
-                    if len(date_str) == 8:
-                        metadata['patient_birth_date'] = f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:]}"
-                except:
-                    pass
-            
-            if metadata['study_date']:
-                try:
-                    date_str = metadata['study_date']
-                    if len(date_str) == 8:
-                        metadata['study_date'] = f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:]}"
-                except:
-                    pass
-            
-            return metadata
+            with open(file_path, 'rb') as fp:
+                if header_only and has_dicm_prefix(fp):
+                    ds = pydicom.dcmread(
+                        fp,
+                        defer_size='1 KB',
+                        stop_before_pixels=True,
+                        specific_tags=_HEADER_TAG_VALUES,
+                    )
+                else:
+                    ds = pydicom.dcmread(fp, force=True)
+
+            # A forced read accepts any bytes; an instance always has its UID
+            if not getattr(ds, 'SOPInstanceUID', None):
+                logger.warning(f"Invalid DICOM file: {file_path}")
+                return None
+
+            return self.extract_metadata(ds, file_path)
             
         except InvalidDicomError:
             logger.warning(f"Invalid DICOM file: {file_path}")
@@ -78,6 +207,82 @@ class DICOMParser:
         except Exception as e:
             logger.error(f"Error parsing DICOM file {file_path}: {str(e)}")
             return None
+
+    def parse_header(self, header: bytes, file_path: str, complete: bool = False) -> Optional[Dict]:
+        """
+        Parse metadata from the leading bytes of a DICOM file.
+
+        Args:
+            header: First bytes of the file, captured while it was uploaded
+            file_path: Path the file was written to
+            complete: True if header holds the whole file
+
+        Returns:
+            Metadata dictionary, or None if the bytes are not a Part 10 file
+            or end before the pixel data; the caller then parses file_path.
+        """
+        if header[DICM_PREFIX_OFFSET:DICM_PREFIX_OFFSET + len(DICM_PREFIX)] != DICM_PREFIX:
+            return None
+
+        try:
+            fp = BytesIO(header)
+            ds = pydicom.dcmread(fp, stop_before_pixels=True, specific_tags=_HEADER_TAG_VALUES)
+        except Exception as e:
+            logger.debug(f"Captured header incomplete for {file_path}: {str(e)}")
+            return None
+
+        # The reader stops on the Pixel Data tag; anything else means the bytes ran out
+        position = fp.tell()
+        if not complete and header[position:position + len(PIXEL_DATA_TAG_BYTES)] != PIXEL_DATA_TAG_BYTES:
+            return None
+
+        return self.extract_metadata(ds, file_path)
+
+    def extract_metadata(self, ds, file_path: str) -> Dict:
+        """
+        Build the metadata dictionary for a dataset read from file_path.
+        """
+        metadata = {
+            'file_path': file_path,
+            'patient_name': str(getattr(ds, 'PatientName', '')),
+            'patient_id': str(getattr(ds, 'PatientID', '')),
+            'patient_birth_date': str(getattr(ds, 'PatientBirthDate', '')),
+            'patient_sex': str(getattr(ds, 'PatientSex', '')),
+            'study_instance_uid': str(getattr(ds, 'StudyInstanceUID', '')),
+            'study_description': str(getattr(ds, 'StudyDescription', '')),
+            'study_date': str(getattr(ds, 'StudyDate', '')),
+            'series_instance_uid': str(getattr(ds, 'SeriesInstanceUID', '')),
+            'series_description': str(getattr(ds, 'SeriesDescription', '')),
+            'series_number': str(getattr(ds, 'SeriesNumber', '')),
+            'modality': str(getattr(ds, 'Modality', '')),
+            'instance_number': str(getattr(ds, 'InstanceNumber', '')),
+            'sop_instance_uid': str(getattr(ds, 'SOPInstanceUID', '')),
+            'body_part_examined': str(getattr(ds, 'BodyPartExamined', '')),
+            'institution_name': str(getattr(ds, 'InstitutionName', '')),
+            'manufacturer': str(getattr(ds, 'Manufacturer', '')),
+            'rows': getattr(ds, 'Rows', 0),
+            'columns': getattr(ds, 'Columns', 0),
+        }
+        
+        # Format dates
+        if metadata['patient_birth_date']:
+            try:
+                # DICOM date format is YYYYMMDD
+                date_str = metadata['patient_birth_date']
+                if len(date_str) == 8:
+                    metadata['patient_birth_date'] = f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:]}"
+            except:
+                pass
+        
+        if metadata['study_date']:
+            try:
+                date_str = metadata['study_date']
+                if len(date_str) == 8:
+                    metadata['study_date'] = f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:]}"
+            except:
+                pass
+        
+        return metadata
     
     def group_by_patient_and_series(self, file_metadata_list: List[Dict]) -> List[Dict]:
         """
@@ -146,13 +351,19 @@ class DICOMParser:
 
 class DICOMTransferService:
     """
-    Service for transferring DICOM files using DCMTK storescu.
+    Service for transferring DICOM files.
+
+    Uses the in-process C-STORE engine with pooled associations when
+    DICOM_SEND_ENGINE is 'dimse' and pynetdicom is installed, and DCMTK
+    storescu otherwise.
     """
     
     def __init__(self):
         self.storescu_path = getattr(settings, 'STORESCU_PATH', 'storescu')
+        self.engine = getattr(settings, 'DICOM_SEND_ENGINE', 'dimse')
     
-    def transfer_series(self, log_id: int, file_paths: List[str], destination) -> bool:
+    def transfer_series(self, log_id: int, file_paths: List[str], destination, can_retry: bool = False,
+                        skip_sent: str = 'none', content_hashes: Optional[Dict[str, str]] = None) -> bool:
         """
         Transfer a series of DICOM files to a destination.
 
@@ -160,41 +371,90 @@ class DICOMTransferService:
             log_id: TransferLog ID for tracking
             file_paths: List of DICOM file paths
             destination: Destination model instance
+            can_retry: Whether the caller will retry a failed send; if so,
+                failures a retry could fix leave the log pending instead of failed
+            skip_sent: 'index' to leave out instances the destination already
+                confirmed, 'verify' to also check those with C-FIND first
+            content_hashes: SHA-256 of files hashed at import, keyed by path;
+                only files missing from it are hashed again
 
         Returns:
             True if transfer successful, False otherwise
         """
         from .models import TransferLog
+        from .dimse import dimse_available
+        from .sent_index import SentInstanceIndex
+
+        index = SentInstanceIndex()
+        transfer_log = TransferLog.objects.get(id=log_id)  # type: ignore
+        plan = index.plan(transfer_log, destination, file_paths, skip_sent, content_hashes)
+        if plan.skipped:
+            index.record_skipped(transfer_log, plan.skipped)
+            logger.info(
+                f"Skipping {len(plan.skipped)} instances ({plan.bytes_skipped} bytes) "
+                f"already at {destination.name}"
+            )
+
+        try:
+            if not plan.to_send:
+                transfer_log = TransferLog.objects.get(id=log_id)  # type: ignore
+                self._start_progress(transfer_log)
+                transfer_log.mark_completed('success', files_transferred=0)
+                return True
+            if self.engine == 'dimse' and dimse_available():
+                return self._transfer_with_dimse(log_id, plan.to_send, destination, can_retry)
+            if BandwidthShaper.destination_limit(destination) or BandwidthShaper.global_limit():
+                logger.warning(f"Bandwidth caps are not enforced for storescu sends to {destination.name}")
+            return self._transfer_with_storescu(log_id, plan.to_send, destination, can_retry)
+        finally:
+            index.record_sent(destination, log_id, plan)
+
+    def _transfer_with_storescu(self, log_id: int, file_paths: List[str], destination,
+                                can_retry: bool = False) -> bool:
+        """
+        Transfer a series by running DCMTK storescu.
+        """
+        from .models import TransferLog
+        from .progress import StorescuOutputParser, TransferProgress, instance_result
 
         # Initialize file lists outside try block for cleanup
         valid_files = []
         converted_files = []
         failed_conversions = []
+        files_converted = 0
         timeout_seconds = 300  # Default timeout
+        parser = None
+        work_dir = self._make_work_dir(log_id)
 
         try:
             # Get transfer log
             transfer_log = TransferLog.objects.get(id=log_id)  # type: ignore
-            transfer_log.status = 'sending'
-            transfer_log.save()
+            self._start_progress(transfer_log)
+            progress = TransferProgress(transfer_log)
 
-            # Validate files exist and convert to compatible transfer syntax
+            # Validate files exist and convert those storescu cannot propose
             for file_path in file_paths:
                 if os.path.exists(file_path):
-                    # Convert to Little Endian Explicit if needed
-                    converted_path = self._convert_transfer_syntax(file_path)
+                    converted_path = self._convert_transfer_syntax(file_path, output_dir=work_dir)
                     if converted_path:
                         valid_files.append(file_path)
                         converted_files.append(converted_path)
+                        if converted_path != file_path:
+                            files_converted += 1
                     else:
                         logger.warning(f"Failed to convert transfer syntax: {file_path}")
                         failed_conversions.append(os.path.basename(file_path))
+                        progress.record(instance_result(file_path, 'failed', error="Conversion failed"))
                 else:
                     logger.warning(f"File not found: {file_path}")
                     failed_conversions.append(os.path.basename(file_path))
+                    progress.record(instance_result(file_path, 'failed', error="File not found"))
+            progress.flush()
 
-            # Track failed files
+            # Track failed, converted and untouched files
             transfer_log.files_failed = len(failed_conversions)
+            transfer_log.files_converted = files_converted
+            transfer_log.files_passed_through = len(converted_files) - files_converted
 
             if not converted_files:
                 transfer_log.mark_completed(
@@ -213,6 +473,7 @@ class DICOMTransferService:
                 '--propose-little',        # Propose Little Endian Explicit
                 '--propose-implicit',      # Propose Little Endian Implicit
                 '--timeout', '60',         # Increase timeout for large series
+                '--verbose',               # Log every C-STORE for progress tracking
                 destination.host,
                 str(destination.port),
             ]
@@ -224,49 +485,54 @@ class DICOMTransferService:
 
             # Execute storescu with longer timeout for large series
             timeout_seconds = max(300, len(converted_files) * 2)  # At least 5 min, or 2 sec per file
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=timeout_seconds
-            )
-
-            total_size = sum(os.path.getsize(fp) for fp in converted_files if os.path.exists(fp))
+            parser = StorescuOutputParser(dict(zip(converted_files, valid_files)), progress.record)
+            returncode, output = self._run_storescu(cmd, parser, timeout_seconds)
+            parser.finish(success=returncode == 0)
+            progress.flush()
 
-            if result.returncode == 0:
+            if returncode == 0:
                 # Success - all files transferred
-                transfer_log.bytes_transferred = total_size
-                transfer_log.files_succeeded = len(converted_files)
+                total_size = sum(os.path.getsize(fp) for fp in converted_files if os.path.exists(fp))
+                transfer_log.bytes_transferred = progress.bytes_transferred
+                transfer_log.files_succeeded = progress.succeeded
                 transfer_log.mark_completed(
                     'success',
                     files_transferred=len(converted_files),
                     bytes_transferred=total_size,
-                    storescu_output=result.stdout,
+                    storescu_output=output,
                     succeeded_files=[os.path.basename(fp) for fp in valid_files],
                     failed_files=failed_conversions
                 )
                 logger.info(f"Transfer completed successfully: {len(converted_files)} files")
                 return True
             else:
-                # Failure - mark all attempted files as failed
-                error_msg = result.stderr or "Unknown storescu error"
-                transfer_log.files_failed += len(converted_files)
-                transfer_log.mark_completed(
-                    'failed',
-                    error_message=error_msg,
-                    storescu_output=result.stdout,
-                    storescu_error=result.stderr,
+                # Failure - files without a successful response count as failed
+                error_msg = parser.last_error or "Unknown storescu error"
+                transfer_log.files_succeeded = progress.succeeded
+                transfer_log.files_failed = progress.failed
+                transfer_log.bytes_transferred = progress.bytes_transferred
+                self._fail(
+                    transfer_log,
+                    error_msg,
+                    retry=can_retry,
+                    storescu_output=output,
                     failed_files=failed_conversions + [os.path.basename(fp) for fp in valid_files]
                 )
                 logger.error(f"Transfer failed: {error_msg}")
                 return False
-                
+
         except subprocess.TimeoutExpired:
             error_msg = f"Transfer timed out after {timeout_seconds} seconds"
-            transfer_log.files_failed += len(converted_files)
-            transfer_log.mark_completed(
-                'failed',
-                error_message=error_msg,
+            if parser:
+                parser.finish(success=False)
+                progress.flush()
+            transfer_log.files_succeeded = progress.succeeded
+            transfer_log.files_failed = len(file_paths) - (progress.succeeded - progress.resumed_from)
+            transfer_log.bytes_transferred = progress.bytes_transferred
+            self._fail(
+                transfer_log,
+                error_msg,
+                retry=can_retry,
                 failed_files=failed_conversions + [os.path.basename(fp) for fp in valid_files]
             )
             logger.error(error_msg)
@@ -275,45 +541,230 @@ class DICOMTransferService:
         except Exception as e:
             error_msg = f"Transfer error: {str(e)}"
             transfer_log.files_failed += len(converted_files)
-            transfer_log.mark_completed(
-                'failed',
-                error_message=error_msg,
+            self._fail(
+                transfer_log,
+                error_msg,
+                retry=can_retry,
                 failed_files=failed_conversions + [os.path.basename(fp) for fp in valid_files]
             )
             logger.error(error_msg)
             return False
         
         finally:
-            # Clean up temporary files (both original and converted)
-            self._cleanup_files(file_paths + converted_files)
+            # Converted copies belong to this transfer only
+            self._remove_work_dir(work_dir)
+
+    def _start_progress(self, transfer_log):
+        """
+        Mark a log as sending with its counters reset for live progress.
+
+        Instances confirmed by earlier attempts stay counted as succeeded.
+        """
+        confirmed = transfer_log.instances.filter(status='success').aggregate(
+            count=Count('id'), size=Sum('bytes_transferred')
+        )
+        transfer_log.status = 'sending'
+        transfer_log.files_succeeded = confirmed['count']
+        transfer_log.files_failed = 0
+        transfer_log.bytes_transferred = confirmed['size'] or 0
+        transfer_log.save()
+
+        from .events import publish_transfer_status
+        publish_transfer_status(transfer_log.id)
+
+    def _run_storescu(self, cmd: List[str], parser, timeout_seconds: int) -> Tuple[int, str]:
+        """
+        Run storescu and feed its log to parser as it is written.
+
+        Returns:
+            (return code, trailing lines of output)
+
+        Raises:
+            subprocess.TimeoutExpired: if storescu runs longer than timeout_seconds
+        """
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1
+        )
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            process.kill()
+
+        timer = threading.Timer(timeout_seconds, kill)
+        timer.start()
+        output = deque(maxlen=STORESCU_OUTPUT_LINES)
+        try:
+            for line in process.stdout:  # type: ignore
+                output.append(line)
+                parser.feed(line)
+            returncode = process.wait()
+        except BaseException:
+            process.kill()
+            raise
+        finally:
+            timer.cancel()
+
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(cmd, timeout_seconds, output=''.join(output))
+        return returncode, ''.join(output)
     
-    def _cleanup_files(self, file_paths: List[str]):
+    def _fail(self, transfer_log, error_msg: str, retry: bool, **details):
+        """Record a failed send: pending a retry, or failed for good."""
+        if retry:
+            transfer_log.mark_retrying(error_msg, **details)
+        else:
+            transfer_log.mark_completed('failed', error_message=error_msg, **details)
+
+    def _transfer_with_dimse(self, log_id: int, file_paths: List[str], destination,
+                             can_retry: bool = False) -> bool:
         """
-        Clean up temporary DICOM files after transfer.
-        Only removes individual converted files, not the entire temp directory,
-        to avoid interfering with concurrent transfers.
+        Transfer a series over a pooled association with the C-STORE engine.
         """
+        from .models import TransferLog
+        from .dimse import CStoreEngine
+        from .progress import TransferProgress, instance_result
+
+        transfer_log = TransferLog.objects.get(id=log_id)  # type: ignore
+        self._start_progress(transfer_log)
+        progress = TransferProgress(transfer_log)
+
+        missing_files = []
+        existing_files = []
         for file_path in file_paths:
-            try:
-                if os.path.exists(file_path):
-                    # Only delete converted files (prefixed with "converted_")
-                    # Don't delete original files or the entire directory
-                    if os.path.basename(file_path).startswith("converted_"):
-                        os.remove(file_path)
-                        logger.debug(f"Cleaned up converted file: {file_path}")
-            except Exception as e:
-                logger.warning(f"Failed to cleanup file {file_path}: {str(e)}")
-
-    def _convert_transfer_syntax(self, file_path: str) -> Optional[str]:
+            if os.path.exists(file_path):
+                existing_files.append(file_path)
+            else:
+                logger.warning(f"File not found: {file_path}")
+                missing_files.append(os.path.basename(file_path))
+                progress.record(instance_result(file_path, 'failed', error="File not found"))
+
+        if not existing_files:
+            progress.flush()
+            transfer_log.files_failed = len(missing_files)
+            transfer_log.mark_completed(
+                'failed',
+                error_message="No valid files found for transfer",
+                failed_files=missing_files
+            )
+            return False
+
+        results = []
+        work_dir = self._make_work_dir(log_id)
+        try:
+            engine = CStoreEngine(convert=partial(self._convert_transfer_syntax, output_dir=work_dir))
+            results = engine.send_series(destination, existing_files, on_result=progress.record)
+            progress.flush()
+        except Exception as e:
+            progress.flush()
+            error_msg = f"Transfer error: {str(e)}"
+            transfer_log.files_succeeded = progress.succeeded
+            transfer_log.files_failed = len(file_paths) - (progress.succeeded - progress.resumed_from)
+            transfer_log.bytes_transferred = progress.bytes_transferred
+            self._fail(
+                transfer_log,
+                error_msg,
+                retry=can_retry,
+                engine='dimse',
+                failed_files=[os.path.basename(fp) for fp in file_paths]
+            )
+            logger.error(error_msg)
+            return False
+        finally:
+            # Copies converted while planning exist even if the send never started
+            self._remove_work_dir(work_dir)
+
+        succeeded = [r for r in results if r['status'] == 'success']
+        failed = [r for r in results if r['status'] != 'success']
+        # Counters include instances confirmed by earlier attempts
+        transfer_log.files_succeeded = progress.succeeded
+        transfer_log.files_failed = len(failed) + len(missing_files)
+        transfer_log.files_converted = sum(1 for r in results if r['converted'] is True)
+        transfer_log.files_passed_through = sum(1 for r in results if r['converted'] is False)
+        transfer_log.bytes_transferred = progress.bytes_transferred
+
+        details = {
+            'engine': 'dimse',
+            'files_transferred': len(succeeded),
+            'bytes_transferred': transfer_log.bytes_transferred,
+            'succeeded_files': [os.path.basename(r['file_path']) for r in succeeded],
+            'failed_files': missing_files + [os.path.basename(r['file_path']) for r in failed],
+        }
+
+        if not failed and not missing_files:
+            transfer_log.mark_completed('success', **details)
+            logger.info(f"Transfer completed successfully: {len(succeeded)} files")
+            return True
+
+        first_error = failed[0]['error'] if failed else "Some files were not found"
+        error_msg = f"{transfer_log.files_failed} of {len(file_paths)} files failed: {first_error}"
+        # Missing files stay missing; only instances the destination did not confirm are worth retrying
+        self._fail(transfer_log, error_msg, retry=can_retry and bool(failed), **details)
+        logger.error(f"Transfer failed: {error_msg}")
+        return False
+
+    @staticmethod
+    def _make_work_dir(log_id: int) -> str:
+        """
+        Create the directory holding one transfer's converted copies.
+
+        Each transfer gets its own, so concurrent sends of the same series
+        to different destinations never share or delete each other's copies.
+        The name carries the transfer log ID, so the storage janitor can
+        tell whether a worker still holds the transfer.
+        """
+        return tempfile.mkdtemp(
+            prefix=f'{CONVERTED_DIR_PREFIX}{log_id}_', dir=getattr(settings, 'DICOM_UPLOAD_DIR', None)
+        )
+
+    @staticmethod
+    def _remove_work_dir(work_dir: str):
+        """Delete a transfer's converted copies; the original files are never touched."""
+        try:
+            shutil.rmtree(work_dir)
+            logger.debug(f"Cleaned up converted files in {work_dir}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Failed to clean up {work_dir}: {str(e)}")
+
+    def _convert_transfer_syntax(self, file_path: str, accepted_syntaxes=None,
+                                 target_syntax: str = ExplicitVRLittleEndian,
+                                 output_dir: Optional[str] = None) -> Optional[str]:
         """
-        Convert DICOM file to Little Endian Explicit transfer syntax if needed.
+        Convert a DICOM file to a transfer syntax the destination accepts, if needed.
+
+        Only the File Meta is read to decide, so files that can be sent as-is
+        are never decoded. Conversion is the last resort: the dataset is read
+        in full, decompressed if needed, and written to a copy in output_dir.
 
         Args:
             file_path: Path to original DICOM file
+            accepted_syntaxes: Transfer syntax UIDs that can be sent untouched,
+                by default the uncompressed syntaxes storescu proposes
+            target_syntax: Uncompressed transfer syntax to convert to
+            output_dir: Work directory of the transfer (see _make_work_dir);
+                without one, the file is not converted
 
         Returns:
             Path to converted file or original file if no conversion needed
         """
+        if accepted_syntaxes is None:
+            accepted_syntaxes = STORESCU_TRANSFER_SYNTAXES
+
+        try:
+            current_syntax = str(read_file_meta_info(file_path).get('TransferSyntaxUID', ''))
+        except Exception as e:
+            logger.debug(f"Could not read File Meta of {file_path}: {str(e)}")
+            current_syntax = ''
+
+        if current_syntax in accepted_syntaxes:
+            return file_path  # No conversion needed
+
         try:
             # Configure pydicom to handle malformed data gracefully
             import pydicom.config
@@ -324,25 +775,25 @@ class DICOMTransferService:
                 # Read original file with error handling
                 ds = pydicom.dcmread(file_path, force=True)
 
-                # Check if already in Little Endian Explicit
-                if hasattr(ds, 'file_meta') and hasattr(ds.file_meta, 'TransferSyntaxUID'):
-                    current_syntax = str(ds.file_meta.TransferSyntaxUID)
-                    # Little Endian Explicit UID
-                    if current_syntax == '1.2.840.10008.1.2.1':
-                        return file_path  # No conversion needed
+                # Compressed pixel data must be decoded before re-encoding
+                source_syntax = ds.file_meta.get('TransferSyntaxUID') if hasattr(ds, 'file_meta') else None
+                if source_syntax is not None and source_syntax.is_compressed:
+                    ds.decompress()
 
-                # Convert to Little Endian Explicit
-                ds.file_meta.TransferSyntaxUID = '1.2.840.10008.1.2.1'
-                ds.is_little_endian = True
-                ds.is_implicit_VR = False
+                target = UID(target_syntax)
+                ds.file_meta.TransferSyntaxUID = target
 
-                # Create converted file path
-                base_dir = os.path.dirname(file_path)
-                base_name = os.path.basename(file_path)
-                converted_path = os.path.join(base_dir, f"converted_{base_name}")
+                if output_dir is None:
+                    raise ValueError("No work directory for the converted copy")
+                converted_path = unique_file_path(output_dir, os.path.basename(file_path))
 
                 # Save converted file with error handling
-                ds.save_as(converted_path, write_like_original=False)
+                ds.save_as(
+                    converted_path,
+                    implicit_vr=target.is_implicit_VR,
+                    little_endian=target.is_little_endian,
+                    enforce_file_format=True,
+                )
 
                 logger.info(f"Converted DICOM transfer syntax: {file_path} -> {converted_path}")
                 return converted_path
@@ -356,47 +807,60 @@ class DICOMTransferService:
             # Return original file as fallback - let storescu handle it
             return file_path
 
-    def test_destination(self, destination) -> Dict[str, Any]:
+    def test_destination(self, destination, timeout: Optional[float] = None) -> Dict[str, Any]:
         """
         Test connectivity to a DICOM destination using C-ECHO.
         
+        Echoes in-process with pynetdicom when installed, otherwise with
+        DCMTK echoscu.
+        
         Args:
             destination: Destination model instance
+            timeout: Seconds to wait for the destination (default DICOM_ECHO_TIMEOUT)
             
         Returns:
-            Dictionary with test results
+            Dictionary with test results; response_time is the round trip in milliseconds
         """
+        from .dimse import dimse_available, echo_destination
+
+        timeout = timeout or getattr(settings, 'DICOM_ECHO_TIMEOUT', 10)
+        started = time.perf_counter()
         try:
-            # Use echoscu from DCMTK to test connection
-            cmd = [
-                'echoscu',
-                '-aet', 'TELEPOST',
-                '-aec', destination.ae_title,
-                destination.host,
-                str(destination.port)
-            ]
-            
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=30  # 30 second timeout
-            )
-            
-            success = result.returncode == 0
-            
+            if dimse_available():
+                elapsed = echo_destination(destination, timeout)
+                details = ''
+            else:
+                cmd = [
+                    'echoscu',
+                    '-aet', getattr(settings, 'DICOM_CALLING_AE_TITLE', 'TELEPOST'),
+                    '-aec', destination.ae_title,
+                    '-to', str(int(timeout)),
+                    destination.host,
+                    str(destination.port)
+                ]
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+                elapsed = time.perf_counter() - started
+                if result.returncode != 0:
+                    return {
+                        'success': False,
+                        'message': 'Connection failed',
+                        'details': result.stderr,
+                        'response_time': None
+                    }
+                details = result.stdout
+
             return {
-                'success': success,
-                'message': 'Connection successful' if success else 'Connection failed',
-                'details': result.stdout if success else result.stderr,
-                'response_time': None  # Could be extracted from echoscu output
+                'success': True,
+                'message': 'Connection successful',
+                'details': details,
+                'response_time': round(elapsed * 1000, 1)
             }
             
         except subprocess.TimeoutExpired:
             return {
                 'success': False,
                 'message': 'Connection timed out',
-                'details': 'No response after 30 seconds',
+                'details': f'No response after {timeout:g} seconds',
                 'response_time': None
             }
         except Exception as e:
@@ -405,4 +869,4 @@ class DICOMTransferService:
                 'message': f'Test failed: {str(e)}',
                 'details': '',
                 'response_time': None
-            } 
\ No newline at end of file
+            }
@@ -0,0 +1,174 @@
+from datetime import datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from django.db.models import Count, DateField, DurationField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Coalesce, Trunc
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import TransferDailyStat, TransferLog
+
+# Approximate length of each bucket, used to bound the number of buckets
+BUCKET_SECONDS = {
+    'hour': 60 * 60,
+    'day': 24 * 60 * 60,
+    'week': 7 * 24 * 60 * 60,
+    'month': 31 * 24 * 60 * 60,
+}
+
+GROUP_BY_FIELDS = {
+    'destination': 'destination__name',
+    'user': 'user__username',
+    'modality': 'modality',
+}
+
+# The same groups in the TransferDailyStat rollup
+ROLLUP_GROUP_BY_FIELDS = {
+    'destination': 'destination_name',
+    'user': 'user__username',
+    'modality': 'modality',
+}
+
+MAX_BUCKETS = 2000
+
+DEFAULT_RANGE_DAYS = 30
+
+
+def parse_volume_range(start: Optional[str], end: Optional[str]) -> Tuple[datetime, datetime]:
+    """
+    Parse the start and end of a volume query.
+
+    Accepts ISO dates or datetimes. A date as end includes that whole day.
+    Defaults to the last DEFAULT_RANGE_DAYS days.
+
+    Raises:
+        ValueError: If a bound cannot be parsed or start is not before end
+    """
+    end_at = _parse_bound(end, end_of_day=True) if end else timezone.now()
+    start_at = _parse_bound(start) if start else end_at - timedelta(days=DEFAULT_RANGE_DAYS)
+    if start_at >= end_at:
+        raise ValueError('start must be before end')
+    return start_at, end_at
+
+
+def transfer_volume(bucket: str, start: datetime, end: datetime,
+                    group_by: Optional[str] = None, user=None) -> List[Dict]:
+    """
+    Total transfers, instances, bytes and send time of successful sends per bucket.
+
+    Day, week and month buckets are read from the TransferDailyStat rollup,
+    which holds a few rows per day, and cover whole days: a range boundary
+    inside a day includes that day. Hour buckets are computed from the
+    transfer logs. Either way the database buckets the rows (date_trunc on
+    PostgreSQL) in one GROUP BY query and only the aggregates leave it.
+
+    Args:
+        bucket: One of BUCKET_SECONDS
+        start: Inclusive start of the range
+        end: Exclusive end of the range
+        group_by: Optional key of GROUP_BY_FIELDS to split each bucket by
+        user: Only count this user's transfers (all users if None)
+
+    Returns:
+        One dict per bucket (and group), in bucket order
+
+    Raises:
+        ValueError: On an unknown bucket or group, or too many buckets
+    """
+    if bucket not in BUCKET_SECONDS:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKET_SECONDS)}")
+    if group_by and group_by not in GROUP_BY_FIELDS:
+        raise ValueError(f"group_by must be one of {', '.join(GROUP_BY_FIELDS)}")
+    if (end - start).total_seconds() / BUCKET_SECONDS[bucket] > MAX_BUCKETS:
+        raise ValueError(f'Range spans more than {MAX_BUCKETS} {bucket} buckets')
+
+    if bucket == 'hour':
+        rows = _log_volume(start, end, group_by, user)
+    else:
+        rows = _rollup_volume(bucket, start, end, group_by, user)
+
+    results = []
+    for row in rows:
+        period = row['period']
+        if not isinstance(period, datetime):
+            period = timezone.make_aware(datetime.combine(period, time.min))
+        entry = {
+            'bucket': period.isoformat(),
+            'transfers': row['transfer_count'],
+            'bytes': row['byte_count'],
+            'instances': row['instance_count'],
+            'seconds': _seconds(row['duration']),
+        }
+        if group_by:
+            entry[group_by] = row['group']
+        results.append(entry)
+    return results
+
+
+def _log_volume(start, end, group_by, user):
+    """Aggregate successful send logs directly."""
+    queryset = TransferLog.objects.filter(  # type: ignore
+        action='send', status='success', timestamp__gte=start, timestamp__lt=end
+    )
+    if user is not None:
+        queryset = queryset.filter(user=user)
+    duration = ExpressionWrapper(F('completed_at') - F('timestamp'), output_field=DurationField())
+    return _group(
+        queryset.annotate(period=Trunc('timestamp', 'hour')),
+        GROUP_BY_FIELDS.get(group_by),
+        transfer_count=Count('id'),
+        byte_count=Coalesce(Sum('bytes_transferred'), Value(0)),
+        instance_count=Coalesce(Sum('files_succeeded'), Value(0)),
+        duration=Sum(duration),
+    )
+
+
+def _rollup_volume(bucket, start, end, group_by, user):
+    """Aggregate the daily rollup of successful sends."""
+    first_day = timezone.localdate(start)
+    last_day = timezone.localdate(end)
+    # An end at midnight excludes that day
+    if timezone.localtime(end).time() == time.min:
+        last_day -= timedelta(days=1)
+
+    queryset = TransferDailyStat.objects.filter(status='success', day__gte=first_day, day__lte=last_day)
+    if user is not None:
+        queryset = queryset.filter(user=user)
+    period = F('day') if bucket == 'day' else Trunc('day', bucket, output_field=DateField())
+    return _group(
+        queryset.annotate(period=period),
+        ROLLUP_GROUP_BY_FIELDS.get(group_by),
+        transfer_count=Sum('transfers'),
+        byte_count=Sum('bytes_transferred'),
+        instance_count=Sum('instances'),
+        duration=Sum('duration_seconds'),
+    )
+
+
+def _group(queryset, group_field, **aggregates):
+    fields = ['period']
+    if group_field:
+        queryset = queryset.annotate(group=F(group_field))
+        fields.append('group')
+    return queryset.values(*fields).annotate(**aggregates).order_by(*fields)
+
+
+def _seconds(duration) -> float:
+    if duration is None:
+        return 0
+    if isinstance(duration, timedelta):
+        return duration.total_seconds()
+    return float(duration)
+
+
+def _parse_bound(value: str, end_of_day: bool = False) -> datetime:
+    day = parse_date(value)
+    if day is not None:
+        moment = datetime.combine(day + timedelta(days=1) if end_of_day else day, time.min)
+    else:
+        moment = parse_datetime(value)
+        if moment is None:
+            raise ValueError(f'Invalid date: {value}')
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
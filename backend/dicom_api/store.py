@@ -0,0 +1,216 @@
+import os
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+
+from .models import StoredInstance
+
+logger = logging.getLogger('dicom_transfer')
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+# Hashes looked up or deleted per query
+LOOKUP_BATCH_SIZE = 500
+
+
+def hash_file(file_path: str) -> str:
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class InstanceStore:
+    """
+    Content-addressed store of imported DICOM files.
+
+    Each distinct file is kept once under DICOM_INSTANCE_STORE_DIR, named
+    by its SHA-256, with its parsed metadata in a StoredInstance row. Import
+    sessions hardlink their files to the stored copy: a file whose content
+    is already stored is replaced by a link and takes its metadata from the
+    row, a new file is linked into the store. The store must be on the same
+    filesystem as DICOM_UPLOAD_DIR; where linking fails, sessions keep
+    their own copies.
+
+    A stored file's link count tells whether any session still uses it;
+    release drops the files of a removed session that became unused.
+    """
+
+    def __init__(self, root: Optional[str] = None, enabled: Optional[bool] = None):
+        self.root = root or getattr(settings, 'DICOM_INSTANCE_STORE_DIR', None)
+        self.enabled = bool(self.root) and (
+            enabled if enabled is not None else getattr(settings, 'DICOM_INSTANCE_STORE', True)
+        )
+
+    def object_path(self, content_hash: str) -> str:
+        return os.path.join(self.root, content_hash[:2], content_hash[2:4], content_hash)
+
+    def hash_files(self, file_paths: Iterable[str], known: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """
+        Content hashes of files, reusing those computed while uploading.
+
+        Returns:
+            Mapping of file path to SHA-256 (empty if the store is disabled)
+        """
+        if not self.enabled:
+            return {}
+        known = known or {}
+        hashes = {}
+        for file_path in file_paths:
+            try:
+                hashes[file_path] = known.get(file_path) or hash_file(file_path)
+            except OSError as e:
+                logger.warning(f"Could not hash {file_path}: {str(e)}")
+        return hashes
+
+    def lookup(self, content_hashes: Iterable[str]) -> Dict[str, StoredInstance]:
+        """Stored instances for the given hashes, one query per LOOKUP_BATCH_SIZE hashes."""
+        if not self.enabled:
+            return {}
+        content_hashes = sorted(set(content_hashes))
+        found = {}
+        for start in range(0, len(content_hashes), LOOKUP_BATCH_SIZE):
+            for stored in StoredInstance.objects.filter(
+                content_hash__in=content_hashes[start:start + LOOKUP_BATCH_SIZE]
+            ):
+                found[stored.content_hash] = stored
+        return found
+
+    def link(self, content_hash: str, file_path: str) -> bool:
+        """
+        Replace file_path by a hardlink to the stored copy of content_hash.
+
+        Returns:
+            False if the stored copy is gone or cannot be linked; file_path is then left as it was
+        """
+        temp_path = f"{file_path}.link"
+        try:
+            os.link(self.object_path(content_hash), temp_path)
+            os.replace(temp_path, file_path)
+            return True
+        except OSError as e:
+            logger.debug(f"Could not link {file_path} to stored instance {content_hash}: {str(e)}")
+            return False
+
+    def add_many(self, files: List[Tuple[str, Optional[str], Dict]]) -> Set[str]:
+        """
+        Store parsed files the store did not have, with one insert.
+
+        A file repeating the content of an earlier one is linked to it.
+
+        Args:
+            files: (file path, content hash, metadata) tuples
+
+        Returns:
+            Paths now linked to a copy stored for an earlier file
+        """
+        if not self.enabled:
+            return set()
+
+        linked = set()
+        rows: Dict[str, StoredInstance] = {}
+        for file_path, content_hash, metadata in files:
+            if not content_hash:
+                continue
+            if content_hash in rows:
+                if self.link(content_hash, file_path):
+                    linked.add(file_path)
+                continue
+            if self._store_file(file_path, content_hash):
+                rows[content_hash] = StoredInstance(
+                    content_hash=content_hash,
+                    sop_instance_uid=str(metadata.get('sop_instance_uid', ''))[:64],
+                    size=os.path.getsize(file_path),
+                    metadata={
+                        key: value for key, value in metadata.items() if key not in ('file_path', 'content_hash')
+                    },
+                )
+
+        # Rows of content stored concurrently by another import are kept
+        StoredInstance.objects.bulk_create(rows.values(), ignore_conflicts=True, batch_size=500)
+        return linked
+
+    def _store_file(self, file_path: str, content_hash: str) -> bool:
+        """Link a file into the store under its hash."""
+        object_path = self.object_path(content_hash)
+        try:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            try:
+                os.link(file_path, object_path)
+            except FileExistsError:
+                # Stored without a row (an interrupted import); share that copy
+                return self.link(content_hash, file_path)
+            return True
+        except OSError as e:
+            logger.warning(f"Could not add {file_path} to the instance store: {str(e)}")
+            return False
+
+    def release(self, content_hashes: Iterable[str]) -> Tuple[int, int]:
+        """
+        Remove the stored files of content_hashes that no session links to any more.
+
+        A stored file is unused once its only link is the store's own. An
+        import linking to it at the same moment keeps its data either way;
+        at worst the content is stored again by a later import.
+
+        Returns:
+            (files removed, bytes reclaimed)
+        """
+        if not self.enabled:
+            return 0, 0
+
+        removed_hashes = []
+        reclaimed = 0
+        for content_hash in set(content_hashes):
+            path = self.object_path(content_hash)
+            try:
+                stat = os.stat(path)
+                if stat.st_nlink > 1:
+                    continue
+                os.remove(path)
+            except OSError:
+                continue
+            removed_hashes.append(content_hash)
+            reclaimed += stat.st_size
+
+        for start in range(0, len(removed_hashes), LOOKUP_BATCH_SIZE):
+            StoredInstance.objects.filter(content_hash__in=removed_hashes[start:start + LOOKUP_BATCH_SIZE]).delete()
+        return len(removed_hashes), reclaimed
+
+    def collect_garbage(self) -> Tuple[int, int]:
+        """
+        Remove every stored file no session links to any more.
+
+        Sessions release their files when removed; this catches files left
+        by sessions removed while the store was unavailable. The candidates
+        are the StoredInstance rows, read in batches by hash, so a sweep
+        does not walk the store directory.
+
+        Returns:
+            (files removed, bytes reclaimed)
+        """
+        if not self.enabled or not os.path.isdir(self.root):
+            return 0, 0
+
+        removed = 0
+        reclaimed = 0
+        last_hash = ''
+        while True:
+            batch = list(
+                StoredInstance.objects.filter(content_hash__gt=last_hash)
+                .order_by('content_hash')
+                .values_list('content_hash', flat=True)[:LOOKUP_BATCH_SIZE]
+            )
+            if not batch:
+                break
+            batch_removed, batch_reclaimed = self.release(batch)
+            removed += batch_removed
+            reclaimed += batch_reclaimed
+            last_hash = batch[-1]
+        if removed:
+            logger.info(f"Removed {removed} unused stored instances ({reclaimed} bytes)")
+        return removed, reclaimed
@@ -1,3 +1,1391 @@
-from django.test import TestCase
+import os
+import hashlib
+import shutil
+import tarfile
+import tempfile
+import time
+import unittest
+import zipfile
+from datetime import date, time as dt_time, timedelta
+from io import StringIO
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from destinations.models import Destination, DestinationCapability, DestinationHealth, SentInstance
+
+from .dimse import AssociationPool, dimse_available
+from .archives import DICOMArchiveExtractor
+from .bandwidth import BandwidthShaper, check_egress_settings, parse_schedule, scheduled_limit
+from .events import transfer_events
+from .health import HealthMonitor
+from .janitor import IMPORT_DIR_PREFIX, StorageJanitor
+from .jobs import TransferJobQueue
+from .models import (
+    ImportedSeries, ImportSession, StoredInstance, TransferDailyStat, TransferInstance, TransferJob,
+    TransferLog,
+)
+from .progress import TransferProgress, instance_result
+from .registry import SeriesRegistry
+from .services import (
+    CONVERTED_DIR_PREFIX, PIXEL_DATA_TAG_BYTES, DICOMParser, DICOMTransferService, _reset_parse_pool,
+)
+from .store import InstanceStore
+from .upload_handlers import DICOMStreamingUploadHandler
+
+
+def write_ct_series(directory, count, pixel_kb=10):
+    """
+    Write a series of small CT instances with uncompressed pixel data.
+
+    Returns:
+        Paths of the files, named 000000.dcm, 000001.dcm, ...
+    """
+    from pydicom.dataset import Dataset, FileMetaDataset
+    from pydicom.uid import CTImageStorage, ExplicitVRLittleEndian, generate_uid
+
+    side = max(1, int((pixel_kb * 1024 / 2) ** 0.5))
+    study_uid = generate_uid()
+    series_uid = generate_uid()
+    file_paths = []
+    for index in range(count):
+        ds = Dataset()
+        ds.file_meta = FileMetaDataset()
+        ds.file_meta.MediaStorageSOPClassUID = CTImageStorage
+        ds.file_meta.MediaStorageSOPInstanceUID = generate_uid()
+        ds.file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
+        ds.SOPClassUID = CTImageStorage
+        ds.SOPInstanceUID = ds.file_meta.MediaStorageSOPInstanceUID
+        ds.PatientName = 'Test^Patient'
+        ds.PatientID = 'TEST001'
+        ds.StudyInstanceUID = study_uid
+        ds.SeriesInstanceUID = series_uid
+        ds.SeriesNumber = 1
+        ds.InstanceNumber = index + 1
+        ds.Modality = 'CT'
+        ds.Rows = side
+        ds.Columns = side
+        ds.BitsAllocated = 16
+        ds.BitsStored = 16
+        ds.HighBit = 15
+        ds.PixelRepresentation = 0
+        ds.SamplesPerPixel = 1
+        ds.PhotometricInterpretation = 'MONOCHROME2'
+        ds.PixelData = bytes(side * side * 2)
+
+        file_path = os.path.join(directory, f'{index:06d}.dcm')
+        ds.save_as(file_path, enforce_file_format=True)
+        file_paths.append(file_path)
+    return file_paths
+
+
+class DICOMParserTests(TestCase):
+    """Header-only parsing yields the metadata of a full read without the pixel data."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.parser = DICOMParser()
+
+    def test_header_only_parse_matches_a_full_read(self):
+        file_path = write_ct_series(self.directory, 1)[0]
+        with open(file_path, 'rb') as f:
+            content = f.read()
+        full = self.parser.parse_file(file_path, header_only=False)
+
+        self.assertEqual(self.parser.parse_file(file_path, header_only=True), full)
+        # The bytes end with the Pixel Data element header (tag, VR, length), so no pixels are read
+        header = content[:content.index(PIXEL_DATA_TAG_BYTES) + 12]
+        self.assertEqual(self.parser.parse_header(header, file_path), full)
+        self.assertEqual(full['modality'], 'CT')
+
+    def test_parse_files_matches_a_serial_parse(self):
+        file_paths = write_ct_series(self.directory, 4)
+        file_paths.append(os.path.join(self.directory, 'notes.txt'))
+        with open(file_paths[-1], 'w') as f:
+            f.write('not a DICOM file\n')
+        serial = [(file_path, self.parser.parse_file(file_path)) for file_path in file_paths]
+
+        with self.settings(DICOM_PARSE_WORKERS=1, DICOM_PARSE_CHUNK_SIZE=1):
+            self.assertEqual(list(self.parser.parse_files(file_paths)), serial)
+        self.assertIsNone(serial[-1][1])
+
+    def test_parse_files_in_a_worker_pool_matches_a_serial_parse(self):
+        file_paths = write_ct_series(self.directory, 4)
+        serial = [(file_path, self.parser.parse_file(file_path)) for file_path in file_paths]
+        self.addCleanup(_reset_parse_pool)
+
+        with self.settings(DICOM_PARSE_WORKERS=2, DICOM_PARSE_CHUNK_SIZE=1):
+            self.assertEqual(list(self.parser.parse_files(file_paths)), serial)
+
+    def test_broken_pool_falls_back_to_inline_parsing(self):
+        file_paths = write_ct_series(self.directory, 3)
+        serial = [(file_path, self.parser.parse_file(file_path)) for file_path in file_paths]
+
+        def broken_map(fn, paths, chunksize):
+            yield fn(paths[0])
+            raise BrokenProcessPool('worker died')
+
+        pool = mock.Mock()
+        pool.map.side_effect = broken_map
+        with self.settings(DICOM_PARSE_WORKERS=2, DICOM_PARSE_CHUNK_SIZE=1), \
+                mock.patch('dicom_api.services._get_parse_pool', return_value=pool), \
+                mock.patch('dicom_api.services._reset_parse_pool') as reset:
+            self.assertEqual(list(self.parser.parse_files(file_paths)), serial)
+        reset.assert_called_once_with()
+
+    def test_non_dicom_files_are_rejected(self):
+        file_path = os.path.join(self.directory, 'notes.txt')
+        with open(file_path, 'w') as f:
+            f.write('not a DICOM file\n' * 50)
+        with open(file_path, 'rb') as f:
+            header = f.read()
+
+        self.assertIsNone(self.parser.parse_file(file_path))
+        self.assertIsNone(self.parser.parse_header(header, file_path, complete=True))
+
+
+class DICOMUploadTests(TestCase):
+    """Uploads are hashed and their headers parsed while streaming; rejected uploads leave nothing behind."""
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.upload_dir, True)
+        settings_override = override_settings(
+            DICOM_UPLOAD_DIR=self.upload_dir, DICOM_INSTANCE_STORE=False, DICOM_HEADER_CAPTURE_BYTES=64 * 1024,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(username='importer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, handler, name, content, chunk_size=8192):
+        handler.new_file('files', name, 'application/dicom', len(content))
+        for start in range(0, len(content), chunk_size):
+            handler.receive_data_chunk(content[start:start + chunk_size], start)
+        return handler.file_complete(len(content))
+
+    def test_handler_hashes_and_parses_while_streaming(self):
+        source_dir = tempfile.mkdtemp(dir=self.upload_dir)
+        file_path = write_ct_series(source_dir, 1, pixel_kb=205)[0]
+        with open(file_path, 'rb') as f:
+            content = f.read()
+        handler = DICOMStreamingUploadHandler()
+
+        uploaded = self.upload(handler, 'image.dcm', content)
+
+        self.assertGreater(len(content), handler.capture_bytes)
+        self.assertEqual(uploaded.dicom_metadata['modality'], 'CT')
+        self.assertEqual(uploaded.content_hash, hashlib.sha256(content).hexdigest())
+        self.assertEqual(uploaded.dicom_metadata, DICOMParser().parse_file(uploaded.temporary_file_path()))
+        with open(uploaded.temporary_file_path(), 'rb') as f:
+            self.assertEqual(f.read(), content)
+
+    def test_interrupted_upload_removes_the_session_directory(self):
+        handler = DICOMStreamingUploadHandler()
+        self.upload(handler, 'first.dcm', b'x' * 100)
+        temp_dir = handler.temp_dir
+        handler.new_file('files', 'second.dcm', 'application/dicom', 100)
+
+        handler.upload_interrupted()
+
+        self.assertFalse(os.path.exists(temp_dir))
+
+    def test_non_dicom_upload_is_rejected_and_removed(self):
+        upload = SimpleUploadedFile('notes.txt', b'not a DICOM file\n' * 100, content_type='text/plain')
+
+        response = self.client.post('/api/dicom/import/', {'files': [upload]}, format='multipart')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'No valid DICOM files found')
+        self.assertEqual(os.listdir(self.upload_dir), [])
+        self.assertFalse(ImportSession.objects.exists())
+
+    def test_parsing_failure_is_reported_once(self):
+        source_dir = tempfile.mkdtemp(dir=self.upload_dir)
+        uploads = []
+        for file_path in write_ct_series(source_dir, 3):
+            with open(file_path, 'rb') as f:
+                uploads.append(SimpleUploadedFile(os.path.basename(file_path), f.read()))
+        parse_file = DICOMParser().parse_file
+
+        def failing_parse(parser, file_paths):
+            yield file_paths[0], parse_file(file_paths[0])
+            raise RuntimeError('pool gone')
+
+        with self.settings(DICOM_HEADER_CAPTURE_BYTES=0), \
+                mock.patch.object(DICOMParser, 'parse_files', failing_parse):
+            response = self.client.post('/api/dicom/import/', {'files': uploads}, format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['summary']['files_processed'], 1)
+        self.assertEqual(response.data['summary']['errors'], [
+            'Error parsing DICOM files: pool gone',
+            'Failed to parse DICOM file: 000001.dcm',
+            'Failed to parse DICOM file: 000002.dcm',
+        ])
+
+
+class DICOMArchiveExtractorTests(TestCase):
+    """DICOM members of ZIP and TAR archives are streamed into the import directory."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.source_dir = os.path.join(self.directory, 'source')
+        self.dest_dir = os.path.join(self.directory, 'import')
+        os.makedirs(self.source_dir)
+        os.makedirs(self.dest_dir)
+        self.dicom_paths = write_ct_series(self.source_dir, 2)
+        self.members = {
+            'series/IM0001': self.dicom_paths[0],
+            '../x': self.dicom_paths[1],
+        }
+
+    def read(self, file_path):
+        with open(file_path, 'rb') as f:
+            return f.read()
+
+    def check_extracted(self, archive_path, file_name):
+        extractor = DICOMArchiveExtractor()
+        extracted = list(extractor.extract(archive_path, self.dest_dir, file_name))
+
+        self.assertEqual([name for name, _, _ in extracted], list(self.members))
+        for name, file_path, metadata in extracted:
+            # Member paths are flattened, so '../x' cannot escape the import directory
+            self.assertEqual(os.path.dirname(file_path), self.dest_dir)
+            self.assertEqual(self.read(file_path), self.read(self.members[name]))
+            self.assertEqual(metadata, DICOMParser().parse_file(file_path))
+        self.assertEqual(extractor.skipped, 1)
+        self.assertEqual(sorted(os.listdir(self.dest_dir)), ['IM0001', 'x'])
+        self.assertEqual(sorted(os.listdir(self.directory)), ['import', 'source', os.path.basename(archive_path)])
+
+    def test_zip_archive(self):
+        archive_path = os.path.join(self.directory, 'study.zip')
+        with zipfile.ZipFile(archive_path, 'w') as archive:
+            archive.writestr('readme.pdf', b'%PDF-1.4 not DICOM')
+            for name, file_path in self.members.items():
+                archive.write(file_path, name)
+
+        self.check_extracted(archive_path, 'study.zip')
+
+    def test_tar_archive(self):
+        archive_path = os.path.join(self.directory, 'study.tar.gz')
+        readme = os.path.join(self.source_dir, 'readme.txt')
+        with open(readme, 'w') as f:
+            f.write('not DICOM')
+        with tarfile.open(archive_path, 'w:gz') as archive:
+            archive.add(readme, 'readme.txt')
+            for name, file_path in self.members.items():
+                archive.add(file_path, name)
+
+        self.check_extracted(archive_path, 'study.tar.gz')
+
+
+class TransferProgressTests(TestCase):
+    """Coalesced per-instance progress updates."""
+
+    def setUp(self):
+        user = User.objects.create_user(username='sender')
+        self.transfer_log = TransferLog.objects.create(user=user, action='send', status='sending')
+
+    def test_outcomes_are_flushed_in_batches(self):
+        progress = TransferProgress(self.transfer_log, flush_instances=3, flush_interval_ms=60000)
+        for index in range(7):
+            status = 'failed' if index == 0 else 'success'
+            progress.record(instance_result(f'/data/{index}.dcm', status, size=100))
+
+        self.transfer_log.refresh_from_db()
+        self.assertEqual((self.transfer_log.files_succeeded, self.transfer_log.files_failed), (5, 1))
+        self.assertEqual(self.transfer_log.instances.count(), 6)
+
+        with self.assertNumQueries(2):
+            progress.flush()
+        self.transfer_log.refresh_from_db()
+        self.assertEqual(self.transfer_log.files_succeeded, 6)
+        self.assertEqual(self.transfer_log.bytes_transferred, 600)
+
+    def test_recording_an_instance_again_updates_it(self):
+        progress = TransferProgress(self.transfer_log, flush_instances=1)
+        progress.record(instance_result('/data/0.dcm', 'failed', error='Timed out'))
+        progress.record(instance_result('/data/0.dcm', 'success', size=100))
+
+        instance = self.transfer_log.instances.get()
+        self.assertEqual((instance.status, instance.error_message), ('success', ''))
+
+
+class TransferStatusStreamTests(TestCase):
+    """Status changes pushed to subscribers instead of polled."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='watcher')
+        self.transfer_log = TransferLog.objects.create(
+            user=self.user, action='send', status='sending', batch_id='batch-1',
+            series_id='session_series-1',
+        )
+
+    def test_completion_is_pushed_to_subscribers(self):
+        subscription = transfer_events.subscribe(self.user.id, ['session_series-1'])
+        other = transfer_events.subscribe(self.user.id, ['session_series-2'])
+        self.addCleanup(transfer_events.unsubscribe, subscription)
+        self.addCleanup(transfer_events.unsubscribe, other)
+
+        self.transfer_log.mark_completed('success')
+
+        entry = subscription.get(timeout=1)
+        self.assertEqual((entry['id'], entry['status']), ('session_series-1', 'success'))
+        self.assertIsNone(other.get(timeout=0))
+
+    def test_stream_ends_when_transfers_are_finished(self):
+        self.transfer_log.mark_completed('failed', error_message='Association rejected')
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.get('/api/dicom/status/stream/', {'batch_id': 'batch-1'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('event: snapshot', body)
+        self.assertIn('Association rejected', body)
+        self.assertTrue(body.endswith('event: done\ndata: {}\n\n'))
+
+
+class TransferLogPaginationTests(TestCase):
+    """Keyset pages of the audit log."""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='auditor', is_staff=True)
+        destination = Destination.objects.create(
+            name='PACS', ae_title='PACS', host='127.0.0.1', port=104, created_by=self.admin
+        )
+        same_time = TransferLog.objects.create(user=self.admin, action='send').timestamp
+        for i in range(24):
+            TransferLog.objects.create(
+                user=User.objects.create_user(username=f'sender{i}'),
+                action='send', destination=destination,
+            )
+        # Equal timestamps must be split by id, not skipped or repeated
+        TransferLog.objects.update(timestamp=same_time)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_cursor_pages_cover_every_log_once(self):
+        seen = []
+        url = '/api/audit/logs/'
+        params = {'cursor': '', 'page_size': 10, 'count': 'estimate'}
+        with self.assertNumQueries(2):
+            response = self.client.get(url, params)
+        self.assertEqual(response.data['count'], 25)
+        while True:
+            seen.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                break
+            with self.assertNumQueries(1):
+                response = self.client.get(response.data['next'])
+
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(seen, sorted(set(seen), reverse=True))
+
+        previous = self.client.get(response.data['previous'])
+        self.assertEqual([row['id'] for row in previous.data['results']], seen[10:20])
+
+    def test_instances_are_paged_by_number_even_with_a_cursor(self):
+        transfer_log = TransferLog.objects.filter(user=self.admin).get()
+        TransferInstance.objects.bulk_create([
+            TransferInstance(transfer_log=transfer_log, file_path=f'/data/{n}.dcm', status='success',
+                             recorded_at=timezone.now())
+            for n in range(3)
+        ])
+
+        response = self.client.get(f'/api/audit/logs/{transfer_log.id}/instances/', {'cursor': '', 'page_size': 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([row['file_path'] for row in response.data['results']], ['/data/0.dcm', '/data/1.dcm'])
+
+
+class TransferVolumeTests(TestCase):
+    """Time-bucketed send totals computed in the database."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='sender')
+        destination = Destination.objects.create(
+            name='PACS', ae_title='PACS', host='127.0.0.1', port=104, created_by=self.user
+        )
+        for day, size, status_ in ((1, 100, 'success'), (1, 50, 'success'), (2, 10, 'success'), (2, 999, 'failed')):
+            log = TransferLog.objects.create(
+                user=self.user, action='send', status='sending', destination=destination,
+                bytes_transferred=size, files_succeeded=2, modality='CT',
+            )
+            TransferLog.objects.filter(id=log.id).update(timestamp=f'2026-03-0{day}T10:00:00Z')
+            log.refresh_from_db()
+            log.mark_completed(status_)
+        other = User.objects.create_user(username='other')
+        TransferLog.objects.create(user=other, action='send', status='sending', bytes_transferred=7).mark_completed('success')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_daily_totals_per_destination(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/dicom/stats/volume/', {
+                'bucket': 'day', 'start': '2026-03-01', 'end': '2026-03-02', 'group_by': 'destination',
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(r['bucket'][:10], r['destination'], r['transfers'], r['bytes'], r['instances'])
+             for r in response.data['results']],
+            [('2026-03-01', 'PACS', 2, 150, 4), ('2026-03-02', 'PACS', 1, 10, 2)],
+        )
+
+    def test_rollup_matches_rebuild_from_logs(self):
+        incremental = set(TransferDailyStat.objects.values_list(
+            'day', 'user', 'destination_name', 'modality', 'status', 'transfers', 'instances', 'bytes_transferred'
+        ))
+        self.assertIn((date(2026, 3, 1), self.user.id, 'PACS', 'CT', 'success', 2, 4, 150), incremental)
+
+        # Completing a transfer twice must not count it twice
+        TransferLog.objects.filter(status='failed').get().mark_completed('failed')
+
+        call_command('rollup_transfer_stats', '--all', stdout=StringIO())
+        rebuilt = set(TransferDailyStat.objects.values_list(
+            'day', 'user', 'destination_name', 'modality', 'status', 'transfers', 'instances', 'bytes_transferred'
+        ))
+        self.assertEqual(rebuilt, incremental)
+
+    def test_hourly_totals_from_logs(self):
+        response = self.client.get('/api/dicom/stats/volume/', {
+            'bucket': 'hour', 'start': '2026-03-01T00:00:00Z', 'end': '2026-03-01T23:00:00Z',
+        })
+        self.assertEqual(
+            [(r['bucket'][:13], r['transfers'], r['bytes']) for r in response.data['results']],
+            [('2026-03-01T10', 2, 150)],
+        )
+
+    def test_rejects_too_many_buckets(self):
+        response = self.client.get('/api/dicom/stats/volume/', {'bucket': 'hour', 'start': '2020-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+
+class SendSeriesTests(TestCase):
+    """Queueing a batch of series for transfer."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='sender')
+        self.destination = Destination.objects.create(
+            name='PACS', ae_title='PACS', host='127.0.0.1', port=104, created_by=self.user
+        )
+        now = timezone.now()
+        session = ImportSession.objects.create(
+            session_id='s1', user=self.user, temp_dir='/nonexistent',
+            last_used_at=now, expires_at=now + timedelta(hours=1),
+        )
+        ImportedSeries.objects.bulk_create([
+            ImportedSeries(
+                series_key=f's1_{i}', session=session, user=self.user, instance_count=2,
+                files=[
+                    {'file_path': f'/nonexistent/{i}_{n}.dcm', 'modality': 'CT', 'content_hash': f'{i:02d}{n}' * 8}
+                    for n in range(2)
+                ],
+            )
+            for i in range(40)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def send(self, count):
+        return self.client.post('/api/dicom/send/', {
+            'seriesToSend': [{'seriesId': f's1_{i}', 'destination': self.destination.id} for i in range(count)]
+        }, format='json')
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        with CaptureQueriesContext(connection) as single:
+            self.assertEqual(self.send(1).status_code, 202)
+        # 30 logs still fit one INSERT under SQLite's parameter limit
+        with self.assertNumQueries(len(single)):
+            response = self.send(30)
+
+        self.assertEqual(response.data['transfer_count'], 30)
+        job = TransferJob.objects.get(id=response.data['job_ids'][-1])
+        self.assertEqual(job.file_paths, ['/nonexistent/29_0.dcm', '/nonexistent/29_1.dcm'])
+        self.assertEqual(job.content_hashes, {'/nonexistent/29_0.dcm': '290' * 8, '/nonexistent/29_1.dcm': '291' * 8})
+        self.assertEqual(job.transfer_log.details, {'series_id': 's1_29'})
+        self.assertEqual(job.transfer_log.modality, 'CT')
+
+    def test_full_queue_rejects_overflow(self):
+        Destination.objects.filter(id=self.destination.id).update(max_queued_jobs=3)
+        response = self.send(5)
+        self.assertEqual(response.data['transfer_count'], 3)
+        self.assertEqual([r['seriesId'] for r in response.data['rejected']], ['s1_3', 's1_4'])
+        self.assertEqual(TransferLog.objects.count(), 3)
+
+
+class SeriesRegistryTests(TestCase):
+    """Imported series are shared through the database and evicted least recently used first."""
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.upload_dir, True)
+        settings_override = override_settings(
+            DICOM_UPLOAD_DIR=self.upload_dir, DICOM_IMPORT_SENT_SESSION_TTL=0, DICOM_IMPORT_MIN_FREE_BYTES=0,
+            DICOM_IMPORT_MAX_BYTES=0, DICOM_IMPORT_MAX_SESSIONS=2, DICOM_INSTANCE_STORE=False,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(username='importer')
+        self.destination = Destination.objects.create(
+            name='PACS', ae_title='PACS', host='127.0.0.1', port=104, created_by=self.user
+        )
+
+    def register(self, session_id, series_count=1):
+        temp_dir = tempfile.mkdtemp(prefix=IMPORT_DIR_PREFIX, dir=self.upload_dir)
+        patients = [{'series': []}]
+        for n in range(series_count):
+            file_path = os.path.join(temp_dir, f'{n}.dcm')
+            with open(file_path, 'wb') as f:
+                f.write(b'\0' * 100)
+            patients[0]['series'].append({'id': f'series{n}', 'files': [{'file_path': file_path}]})
+        session = SeriesRegistry().register(session_id, self.user, temp_dir, patients)
+        return session, patients
+
+    def age(self, session, hours):
+        ImportSession.objects.filter(id=session.id).update(last_used_at=timezone.now() - timedelta(hours=hours))
+
+    def queue_job(self, session):
+        transfer_log = TransferLog.objects.create(user=self.user, action='send', status='pending')
+        return TransferJob.objects.create(transfer_log=transfer_log, destination=self.destination, session=session)
+
+    def test_register_and_get_many(self):
+        session, patients = self.register('s1', series_count=2)
+        self.age(session, 2)
+
+        self.assertEqual([series['id'] for series in patients[0]['series']], ['s1_series0', 's1_series1'])
+        self.assertEqual((session.file_count, session.total_bytes), (2, 200))
+
+        found = SeriesRegistry().get_many(['s1_series0', 's1_series1', 'unknown'])
+        self.assertEqual(set(found), {'s1_series0', 's1_series1'})
+        self.assertEqual(found['s1_series0'].files[0]['file_path'], os.path.join(session.temp_dir, '0.dcm'))
+        session.refresh_from_db()
+        self.assertGreater(session.last_used_at, timezone.now() - timedelta(minutes=1))
+
+        ImportSession.objects.filter(id=session.id).update(expires_at=timezone.now())
+        self.assertEqual(SeriesRegistry().get_many(['s1_series0']), {})
+
+    def test_least_recently_used_idle_sessions_are_evicted(self):
+        oldest, _ = self.register('oldest')
+        self.age(oldest, 3)
+        busy, _ = self.register('busy')
+        self.age(busy, 4)
+        self.queue_job(busy)
+        recent, _ = self.register('recent')
+        # Registering leaves eviction to the storage janitor
+        self.assertEqual(ImportSession.objects.count(), 3)
+
+        self.assertEqual(SeriesRegistry().evict(), (1, 100))
+        self.assertEqual(
+            set(ImportSession.objects.values_list('session_id', flat=True)), {'busy', 'recent'}
+        )
+        self.assertFalse(os.path.exists(oldest.temp_dir))
+        self.assertTrue(os.path.exists(busy.temp_dir))
+
+    def test_content_shared_through_the_store_is_counted_once(self):
+        store_dir = os.path.join(self.upload_dir, 'instance_store')
+        with override_settings(DICOM_INSTANCE_STORE=True, DICOM_INSTANCE_STORE_DIR=store_dir,
+                               DICOM_IMPORT_MAX_SESSIONS=0, DICOM_IMPORT_MAX_BYTES=150):
+            store = InstanceStore()
+            sessions = []
+            for name in ('first', 'second'):
+                temp_dir = tempfile.mkdtemp(prefix=IMPORT_DIR_PREFIX, dir=self.upload_dir)
+                file_path = os.path.join(temp_dir, 'image.dcm')
+                with open(file_path, 'wb') as f:
+                    f.write(b'\0' * 100)
+                content_hash = hashlib.sha256(b'\0' * 100).hexdigest()
+                store.add_many([(file_path, content_hash, {})])
+                patients = [{'series': [{'id': 'series', 'files': [{'file_path': file_path}]}]}]
+                sessions.append(SeriesRegistry().register(name, self.user, temp_dir, patients))
+
+            self.assertEqual([session.total_bytes for session in sessions], [0, 0])
+            # One stored copy of 100 bytes is under the 150 byte limit
+            self.assertEqual(SeriesRegistry().evict(), (0, 0))
+
+    def test_session_queued_for_after_selection_is_kept(self):
+        session, _ = self.register('s1')
+        selected = ImportSession.objects.get(id=session.id)
+        self.queue_job(session)
+
+        self.assertIsNone(SeriesRegistry().remove_session(selected))
+        self.assertTrue(ImportSession.objects.filter(id=session.id).exists())
+        self.assertTrue(os.path.exists(session.temp_dir))
+
+    def test_entries_of_an_evicted_session_are_not_queued(self):
+        kept, _ = self.register('kept')
+        evicted, _ = self.register('evicted')
+        SeriesRegistry().remove_session(evicted)
+
+        jobs, rejected = TransferJobQueue().enqueue_many([
+            (TransferLog(user=self.user, action='send', status='pending', series_id=series_id),
+             self.destination, [], session, {})
+            for series_id, session in [('kept_series0', kept), ('evicted_series0', evicted)]
+        ])
+
+        self.assertEqual([job.session_id for job in jobs], [kept.id])
+        self.assertEqual(rejected, {})
+        self.assertEqual(list(TransferLog.objects.values_list('series_id', flat=True)), ['kept_series0'])
+
+
+class StorageJanitorTests(TestCase):
+    """Import sessions and directories are removed once no longer needed."""
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.upload_dir, True)
+        settings_override = override_settings(
+            DICOM_UPLOAD_DIR=self.upload_dir, DICOM_IMPORT_SENT_SESSION_TTL=3600,
+            DICOM_IMPORT_MIN_FREE_BYTES=0, DICOM_IMPORT_MAX_BYTES=0, DICOM_IMPORT_MAX_SESSIONS=0,
+            DICOM_INSTANCE_STORE_DIR=os.path.join(self.upload_dir, 'instance_store'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(username='importer')
+
+    def import_session(self, name, size, idle_hours=2):
+        temp_dir = tempfile.mkdtemp(prefix=IMPORT_DIR_PREFIX, dir=self.upload_dir)
+        file_path = os.path.join(temp_dir, 'image.dcm')
+        with open(file_path, 'wb') as f:
+            f.write(b'\0' * size)
+        patients = [{'series': [{'id': 'series', 'files': [{'file_path': file_path}]}]}]
+        session = SeriesRegistry().register(name, self.user, temp_dir, patients)
+        ImportSession.objects.filter(id=session.id).update(
+            last_used_at=timezone.now() - timedelta(hours=idle_hours)
+        )
+        return session
+
+    def test_sent_sessions_are_removed_after_the_grace_period(self):
+        sent = self.import_session('sent', 300)
+        unsent = self.import_session('unsent', 200)
+        TransferLog.objects.create(user=self.user, action='send', status='success', series_id='sent_series')
+
+        report = StorageJanitor().sweep()
+
+        self.assertEqual((report['sessions_removed'], report['bytes_reclaimed']), (1, 300))
+        self.assertFalse(os.path.exists(sent.temp_dir))
+        self.assertTrue(ImportSession.objects.filter(id=unsent.id).exists())
+
+    def test_least_recently_used_sessions_go_first_when_disk_is_low(self):
+        oldest = self.import_session('oldest', 100, idle_hours=3)
+        newer = self.import_session('newer', 100, idle_hours=1)
+        with override_settings(DICOM_IMPORT_MIN_FREE_BYTES=1000), \
+                mock.patch.object(SeriesRegistry, 'free_bytes', return_value=950):
+            report = StorageJanitor().sweep()
+
+        self.assertEqual(report['sessions_removed'], 1)
+        self.assertFalse(ImportSession.objects.filter(id=oldest.id).exists())
+        self.assertTrue(ImportSession.objects.filter(id=newer.id).exists())
+
+    def test_orphaned_directories_are_removed_once_stale(self):
+        stale = tempfile.mkdtemp(prefix=IMPORT_DIR_PREFIX, dir=self.upload_dir)
+        with open(os.path.join(stale, 'partial.dcm'), 'wb') as f:
+            f.write(b'\0' * 50)
+        long_ago = time.time() - 7 * 60 * 60
+        for path in (os.path.join(stale, 'partial.dcm'), stale):
+            os.utime(path, (long_ago, long_ago))
+        uploading = tempfile.mkdtemp(prefix=IMPORT_DIR_PREFIX, dir=self.upload_dir)
+
+        out = StringIO()
+        call_command('clean_import_storage', stdout=out)
+
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(uploading))
+        self.assertIn('reclaimed 50 bytes', out.getvalue())
+
+    def test_stale_conversion_directories_are_removed_unless_still_sending(self):
+        destination = Destination.objects.create(name='PACS', ae_title='PACS', host='127.0.0.1', port=104)
+        work_dirs = {}
+        for status in ('sending', 'failed'):
+            transfer_log = TransferLog.objects.create(user=self.user, action='send', status=status)
+            TransferJob.objects.create(
+                transfer_log=transfer_log, destination=destination, status=status,
+                lease_expires_at=timezone.now() + timedelta(minutes=5) if status == 'sending' else None,
+            )
+            work_dirs[status] = DICOMTransferService._make_work_dir(transfer_log.id)
+            with open(os.path.join(work_dirs[status], 'converted.dcm'), 'wb') as f:
+                f.write(b'\0' * 40)
+            long_ago = time.time() - 7 * 60 * 60
+            for path in (os.path.join(work_dirs[status], 'converted.dcm'), work_dirs[status]):
+                os.utime(path, (long_ago, long_ago))
+
+        self.assertEqual(StorageJanitor().remove_orphans(), (1, 40))
+        self.assertTrue(os.path.exists(work_dirs['sending']))
+        self.assertFalse(os.path.exists(work_dirs['failed']))
+
+
+class InstanceStoreTests(TestCase):
+    """Imported files with the same content share one stored copy."""
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.upload_dir, True)
+        self.store = InstanceStore(root=os.path.join(self.upload_dir, 'instance_store'), enabled=True)
+        self.user = User.objects.create_user(username='importer')
+
+    def write_session_file(self, name, content):
+        temp_dir = tempfile.mkdtemp(prefix=IMPORT_DIR_PREFIX, dir=self.upload_dir)
+        file_path = os.path.join(temp_dir, 'image.dcm')
+        with open(file_path, 'wb') as f:
+            f.write(content)
+        return temp_dir, file_path
+
+    def test_duplicate_content_is_hardlinked_and_reuses_metadata(self):
+        _first_dir, first = self.write_session_file('first', b'pixels' * 100)
+        _second_dir, second = self.write_session_file('second', b'pixels' * 100)
+        hashes = self.store.hash_files([first, second])
+        metadata = {'sop_instance_uid': '1.2.3', 'modality': 'CT', 'file_path': first}
+        mode = os.stat(first).st_mode
+
+        linked = self.store.add_many([(first, hashes[first], metadata), (second, hashes[second], metadata)])
+
+        self.assertEqual(linked, {second})
+        # Storing a file leaves the session's copy as it was, permissions included
+        self.assertEqual(os.stat(second).st_mode, mode)
+        self.assertEqual(os.stat(first).st_ino, os.stat(second).st_ino)
+        self.assertEqual(os.stat(first).st_nlink, 3)
+        stored = self.store.lookup([hashes[first]])[hashes[first]]
+        self.assertEqual(stored.metadata, {'sop_instance_uid': '1.2.3', 'modality': 'CT'})
+
+    def test_removing_the_last_session_releases_the_stored_copy(self):
+        sessions = []
+        for name in ('first', 'second'):
+            temp_dir, file_path = self.write_session_file(name, b'pixels' * 100)
+            content_hash = self.store.hash_files([file_path])[file_path]
+            self.store.add_many([(file_path, content_hash, {'sop_instance_uid': '1.2.3'})])
+            patients = [{'series': [{'id': 'series', 'files': [
+                {'file_path': file_path, 'content_hash': content_hash}
+            ]}]}]
+            sessions.append(SeriesRegistry().register(name, self.user, temp_dir, patients))
+        object_path = self.store.object_path(content_hash)
+
+        with override_settings(DICOM_INSTANCE_STORE_DIR=self.store.root):
+            self.assertEqual(SeriesRegistry().remove_session(sessions[0]), 0)
+            self.assertTrue(os.path.exists(object_path))
+            self.assertEqual(SeriesRegistry().remove_session(sessions[1]), 600)
+
+        self.assertFalse(os.path.exists(object_path))
+        self.assertFalse(StoredInstance.objects.exists())
+
+    def test_garbage_collection_removes_stored_copies_no_session_links(self):
+        hashes = []
+        for name in ('kept', 'dropped'):
+            temp_dir, file_path = self.write_session_file(name, name.encode() * 100)
+            content_hash = self.store.hash_files([file_path])[file_path]
+            self.store.add_many([(file_path, content_hash, {})])
+            hashes.append(content_hash)
+        # A session removed without releasing its files
+        shutil.rmtree(temp_dir)
+
+        with mock.patch('dicom_api.store.os.walk') as walk:
+            self.assertEqual(self.store.collect_garbage(), (1, 700))
+
+        walk.assert_not_called()
+        self.assertEqual(list(StoredInstance.objects.values_list('content_hash', flat=True)), hashes[:1])
+        self.assertFalse(os.path.exists(self.store.object_path(hashes[1])))
+
+
+class DestinationHealthApiTests(TestCase):
+    """Connection tests answer from the cached health instead of the network."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.destination = Destination.objects.create(
+            name='PACS', ae_title='PACS', host='pacs.invalid', port=104,
+        )
+        HealthMonitor().record(self.destination, {'success': True, 'message': 'Connection successful',
+                                                  'response_time': 12.5})
+
+    def test_test_connection_returns_cached_result_and_probes_in_background(self):
+        with mock.patch.object(HealthMonitor, 'probe_in_background') as probe, \
+                mock.patch.object(DICOMTransferService, 'test_destination') as echo:
+            response = self.client.post(f'/api/destinations/{self.destination.id}/test_connection/')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual((response.data['success'], response.data['response_time']), (True, 12.5))
+        probe.assert_called_once()
+        echo.assert_not_called()
+
+    def test_destination_list_includes_health(self):
+        response = self.client.get('/api/destinations/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['health']['status'], 'reachable')
+        self.assertEqual(response.data['results'][0]['health']['latency_ms'], 12.5)
+
+
+class BandwidthShapingTests(TestCase):
+    """Egress caps follow the schedule in force and are metered by token buckets."""
+
+    def setUp(self):
+        self.destination = Destination.objects.create(
+            name='Archive', ae_title='ARCHIVE', host='archive.invalid', port=104, bandwidth_limit_kbps=80,
+            bandwidth_schedule=[{'start': '19:00', 'end': '07:00', 'limit_kbps': 0}],
+        )
+
+    def test_schedule_windows_override_the_limit_and_may_run_past_midnight(self):
+        schedule = self.destination.bandwidth_schedule
+        self.assertEqual(scheduled_limit(80, schedule, dt_time(12, 0)), 80)
+        self.assertEqual(scheduled_limit(80, schedule, dt_time(23, 30)), 0)
+        self.assertEqual(scheduled_limit(80, schedule, dt_time(6, 59)), 0)
+        with self.assertRaises(ValueError):
+            parse_schedule([{'start': '25:00', 'end': '07:00', 'limit_kbps': 10}])
+
+    def test_egress_settings_are_checked_at_startup(self):
+        with override_settings(DICOM_EGRESS_LIMIT_KBPS=0, DICOM_EGRESS_SCHEDULE=[{'start': '7:00'}]):
+            with self.assertRaises(ImproperlyConfigured):
+                check_egress_settings()
+        with override_settings(DICOM_EGRESS_LIMIT_KBPS=1000, DICOM_EGRESS_SCHEDULE=[], DICOM_SEND_ENGINE='storescu'):
+            with self.assertRaises(ImproperlyConfigured):
+                check_egress_settings()
+        with override_settings(DICOM_EGRESS_LIMIT_KBPS=0, DICOM_SEND_ENGINE='storescu', DICOM_EGRESS_SCHEDULE=[
+            {'start': '19:00', 'end': '07:00', 'limit_kbps': 0},
+        ]):
+            check_egress_settings()
+
+    @override_settings(DICOM_SEND_ENGINE='storescu')
+    def test_destination_caps_are_refused_for_storescu(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='admin', is_staff=True))
+
+        response = client.patch(f'/api/destinations/{self.destination.id}/', {'bandwidth_limit_kbps': 100}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Destination.objects.get(id=self.destination.id).bandwidth_limit_kbps, 80)
+
+    @override_settings(DICOM_EGRESS_LIMIT_KBPS=0, DICOM_EGRESS_SCHEDULE=[])
+    def test_sends_over_the_burst_wait_for_the_destination_cap(self):
+        shaper = BandwidthShaper(burst_seconds=1)
+        with mock.patch('dicom_api.bandwidth.scheduled_limit', side_effect=lambda default, schedule: default), \
+                mock.patch('dicom_api.bandwidth.time.sleep') as sleep:
+            # 80 kbit/s is 10,000 bytes/s with one second of burst
+            self.assertEqual(shaper.throttle(self.destination, 10_000), 0)
+            waited = shaper.throttle(self.destination, 5_000)
+
+        self.assertAlmostEqual(waited, 0.5, delta=0.05)
+        sleep.assert_called_once_with(waited)
+
+    def test_queue_reports_live_throughput(self):
+        user = User.objects.create_user(username='sender')
+        transfer_log = TransferLog.objects.create(
+            user=user, action='send', status='sending', destination=self.destination,
+        )
+        TransferInstance.objects.create(
+            transfer_log=transfer_log, file_path='/tmp/a.dcm', status='success',
+            bytes_transferred=600_000, recorded_at=timezone.now(),
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+
+        with override_settings(DICOM_THROUGHPUT_WINDOW_SECONDS=60):
+            response = client.get('/api/dicom/queue/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['destinations'][0]['throughput_bytes_per_second'], 10_000)
+        self.assertEqual(response.data['egress']['throughput_bytes_per_second'], 10_000)
+
+
+class FlakyTransferService:
+    """Confirms the first file it is given, then fails with a retryable error once."""
+
+    def __init__(self):
+        self.calls = []
+
+    def transfer_series(self, log_id, file_paths, destination, can_retry=False, skip_sent='none',
+                        content_hashes=None):
+        self.calls.append(list(file_paths))
+        transfer_log = TransferLog.objects.get(id=log_id)
+        if len(self.calls) == 1:
+            TransferInstance.objects.create(
+                transfer_log=transfer_log, file_path=file_paths[0], status='success', recorded_at=timezone.now()
+            )
+            transfer_log.files_succeeded = 1
+            transfer_log.mark_retrying('Association aborted')
+            return False
+        transfer_log.files_succeeded += len(file_paths)
+        transfer_log.mark_completed('success')
+        return True
+
+
+class TransferSchedulingTests(TestCase):
+    """Claims respect per-destination and global concurrency caps."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='sender')
+        self.slow = Destination.objects.create(
+            name='Slow', ae_title='SLOW', host='127.0.0.1', port=104, created_by=self.user,
+            max_concurrent_associations=1,
+        )
+        self.fast = Destination.objects.create(
+            name='Fast', ae_title='FAST', host='127.0.0.1', port=105, created_by=self.user,
+            max_concurrent_associations=2,
+        )
+        self.queue = TransferJobQueue()
+
+    def enqueue(self, destination, count):
+        jobs, _rejected = self.queue.enqueue_many([
+            (TransferLog(user=self.user, action='send', status='pending', destination=destination),
+             destination, ['/data/1.dcm'], None, {})
+            for _ in range(count)
+        ])
+        return jobs
+
+    def claim_all(self):
+        claimed = []
+        while (job := self.queue.claim()) is not None:
+            claimed.append(job)
+        return claimed
+
+    def test_caps_are_editable_through_the_api(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='admin', is_staff=True))
+
+        response = client.patch(
+            f'/api/destinations/{self.slow.id}/', {'max_concurrent_associations': 4, 'max_queued_jobs': 10},
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['max_concurrent_associations'], response.data['max_queued_jobs']), (4, 10))
+        self.slow.refresh_from_db()
+        self.assertEqual((self.slow.max_concurrent_associations, self.slow.max_queued_jobs), (4, 10))
+
+    def test_destination_cap(self):
+        self.enqueue(self.slow, 3)
+
+        claimed = self.claim_all()
+
+        self.assertEqual(len(claimed), 1)
+        self.queue.complete(claimed[0], True)
+        self.assertEqual(self.claim_all()[0].destination_id, self.slow.id)
+
+    def test_destinations_proceed_independently(self):
+        # The slow destination's older jobs do not hold up the fast one
+        self.enqueue(self.slow, 3)
+        self.enqueue(self.fast, 3)
+
+        claimed = self.claim_all()
+
+        self.assertEqual(
+            sorted(job.destination_id for job in claimed), sorted([self.slow.id, self.fast.id, self.fast.id])
+        )
+        self.assertEqual(TransferJob.objects.filter(status='pending').count(), 3)
+
+    @override_settings(DICOM_TRANSFER_MAX_CONCURRENT=2)
+    def test_global_cap(self):
+        self.enqueue(self.slow, 2)
+        self.enqueue(self.fast, 2)
+
+        claimed = self.claim_all()
+
+        self.assertEqual(len(claimed), 2)
+        self.queue.complete(claimed[0], True)
+        self.assertEqual(len(self.claim_all()), 1)
+
+
+class TransferRetryTests(TestCase):
+    """Failed jobs are retried after a backoff, resending only unconfirmed files."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='sender')
+        self.destination = Destination.objects.create(
+            name='PACS', ae_title='PACS', host='127.0.0.1', port=104, created_by=self.user,
+            retry_max_attempts=2, retry_backoff_seconds=60,
+        )
+        self.queue = TransferJobQueue()
+        self.queue.lease_seconds = 3600
+        jobs, _rejected = self.queue.enqueue_many([(
+            TransferLog(user=self.user, action='send', status='pending', destination=self.destination),
+            self.destination, ['/data/1.dcm', '/data/2.dcm', '/data/3.dcm'], None, {},
+        )])
+        self.job = jobs[0]
+
+    def test_retry_resends_only_unconfirmed_files(self):
+        service = FlakyTransferService()
+        self.assertFalse(self.queue.run_job(self.queue.claim(), service))
+
+        job = TransferJob.objects.get(id=self.job.id)
+        self.assertEqual(job.status, 'pending')
+        self.assertGreaterEqual(job.available_at, timezone.now() + timedelta(seconds=25))
+        self.assertIsNone(self.queue.claim(), "job is claimable before its backoff elapsed")
+
+        TransferJob.objects.filter(id=job.id).update(available_at=timezone.now())
+        self.assertTrue(self.queue.run_job(self.queue.claim(), service))
+
+        self.assertEqual(service.calls[1], ['/data/2.dcm', '/data/3.dcm'])
+        transfer_log = TransferLog.objects.get(id=job.transfer_log_id)
+        self.assertEqual((transfer_log.status, transfer_log.files_succeeded), ('success', 3))
+        self.assertEqual(
+            [(a['attempt'], a['status'], a['files_sent']) for a in transfer_log.attempt_history],
+            [(1, 'retrying', 3), (2, 'success', 2)],
+        )
+        self.assertEqual(TransferJob.objects.get(id=job.id).status, 'done')
+
+    def test_last_attempt_fails_for_good(self):
+        Destination.objects.filter(id=self.destination.id).update(retry_max_attempts=1)
+        job = self.queue.claim()
+        service = FlakyTransferService()
+        self.assertFalse(self.queue.run_job(job, service))
+        self.assertEqual(TransferJob.objects.get(id=job.id).status, 'failed')
+
+    def test_crashed_transfer_fails_its_log_on_the_last_attempt(self):
+        Destination.objects.filter(id=self.destination.id).update(retry_max_attempts=1)
+        service = mock.Mock()
+        service.transfer_series.side_effect = RuntimeError('socket closed')
+
+        self.assertFalse(self.queue.run_job(self.queue.claim(), service))
+
+        self.assertEqual(TransferJob.objects.get(id=self.job.id).status, 'failed')
+        transfer_log = TransferLog.objects.get(id=self.job.transfer_log_id)
+        self.assertEqual(transfer_log.status, 'failed')
+        self.assertEqual(transfer_log.error_message, 'Transfer crashed: socket closed')
+        self.assertIsNotNone(transfer_log.completed_at)
+
+    def test_crashed_transfer_is_retried(self):
+        service = mock.Mock()
+        service.transfer_series.side_effect = RuntimeError('socket closed')
+
+        self.assertFalse(self.queue.run_job(self.queue.claim(), service))
+
+        self.assertEqual(TransferJob.objects.get(id=self.job.id).status, 'pending')
+        transfer_log = TransferLog.objects.get(id=self.job.transfer_log_id)
+        self.assertEqual((transfer_log.status, transfer_log.attempt_history[0]['status']), ('pending', 'retrying'))
+
+    def test_outcome_is_left_to_the_new_lease_owner(self):
+        job = self.queue.claim()
+        TransferJob.objects.filter(id=job.id).update(lease_owner='other-worker')
+
+        self.assertFalse(self.queue.complete(job, True))
+        self.assertFalse(self.queue.retry(job, timezone.now()))
+        self.assertFalse(self.queue.renew(job))
+        self.assertEqual(TransferJob.objects.get(id=job.id).status, 'sending')
+
+    def test_attempt_is_not_recorded_after_the_lease_is_lost(self):
+        job = self.queue.claim()
+        service = FlakyTransferService()
+        transfer_series = service.transfer_series
+
+        def taken_over(*args, **kwargs):
+            # Another worker reclaims the job before the heartbeat notices
+            TransferJob.objects.filter(id=job.id).update(lease_owner='other-worker')
+            return transfer_series(*args, **kwargs)
+
+        with mock.patch.object(service, 'transfer_series', side_effect=taken_over):
+            self.assertFalse(self.queue.run_job(job, service))
+
+        self.assertEqual(TransferLog.objects.get(id=job.transfer_log_id).attempt_history, [])
+        self.assertEqual(TransferJob.objects.get(id=job.id).lease_owner, 'other-worker')
+
+
+@unittest.skipUnless(dimse_available(), "pynetdicom is not installed")
+@override_settings(DICOM_SEND_ENGINE='dimse')
+class DIMSETransferTests(TestCase):
+    """C-STORE engine against an in-process Storage SCP."""
+
+    def setUp(self):
+        self.received = []
+        self.associations = 0
+        self.scp = None
+
+        self.user = User.objects.create_user(username='sender')
+        self.destination = Destination.objects.create(
+            name='Test SCP', ae_title='TEST_SCP', host='127.0.0.1', port=104,
+        )
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        settings_override = override_settings(DICOM_UPLOAD_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.pool = AssociationPool(idle_timeout=60)
+        self.addCleanup(self.pool.close_all)
+
+    def _start_scp(self, transfer_syntaxes=None):
+        """Run a Storage SCP accepting transfer_syntaxes (all by default)."""
+        from pydicom.dataset import Dataset
+        from pynetdicom import AE, AllStoragePresentationContexts, build_context, evt
+        from pynetdicom.sop_class import StudyRootQueryRetrieveInformationModelFind, Verification
+
+        def handle_find(event):
+            for sop_instance_uid, _syntax in self.received:
+                identifier = Dataset()
+                identifier.QueryRetrieveLevel = 'IMAGE'
+                identifier.SOPInstanceUID = sop_instance_uid
+                yield 0xFF00, identifier
+
+        def handle_store(event):
+            self.received.append(
+                (event.request.AffectedSOPInstanceUID, str(event.context.transfer_syntax))
+            )
+            return 0x0000
+
+        def handle_requested(event):
+            self.associations += 1
+
+        ae = AE(ae_title='TEST_SCP')
+        if transfer_syntaxes:
+            ae.supported_contexts = [
+                build_context(cx.abstract_syntax, transfer_syntaxes)
+                for cx in AllStoragePresentationContexts
+            ]
+        else:
+            ae.supported_contexts = AllStoragePresentationContexts
+        ae.add_supported_context(StudyRootQueryRetrieveInformationModelFind)
+        ae.add_supported_context(Verification)
+        self.scp = ae.start_server(
+            ('127.0.0.1', 0),
+            block=False,
+            evt_handlers=[
+                (evt.EVT_C_STORE, handle_store),
+                (evt.EVT_C_FIND, handle_find),
+                (evt.EVT_REQUESTED, handle_requested),
+            ],
+        )
+        self.addCleanup(self.scp.shutdown)
+        self.destination.port = self.scp.socket.getsockname()[1]
+        self.destination.save()
+
+    def _send_series(self, count, file_paths=None, skip_sent='none', content_hashes=None):
+        if file_paths is None:
+            file_paths = write_ct_series(tempfile.mkdtemp(dir=self.directory), count)
+        transfer_log = TransferLog.objects.create(
+            user=self.user, action='send', status='pending', destination=self.destination,
+            instance_count=len(file_paths),
+        )
+        service = DICOMTransferService()
+        with mock.patch('dicom_api.dimse.get_association_pool', return_value=self.pool):
+            success = service.transfer_series(
+                transfer_log.id, file_paths, self.destination, skip_sent=skip_sent, content_hashes=content_hashes,
+            )
+        transfer_log.refresh_from_db()
+        transfer_log.file_paths = file_paths
+        return success, transfer_log
+
+    def test_series_are_sent_over_one_association(self):
+        self._start_scp()
+        success, first = self._send_series(3)
+        self.assertTrue(success)
+        success, second = self._send_series(2)
+        self.assertTrue(success)
+
+        self.assertEqual(first.status, 'success')
+        self.assertEqual(first.files_succeeded, 3)
+        self.assertEqual(second.files_succeeded, 2)
+        self.assertEqual(second.details['engine'], 'dimse')
+        self.assertEqual(len(self.received), 5)
+        self.assertEqual(self.associations, 1)
+        self.assertEqual(first.instances.filter(status='success').count(), 3)
+
+    def test_files_are_converted_only_when_syntax_is_not_accepted(self):
+        from pydicom.uid import ExplicitVRLittleEndian, ImplicitVRLittleEndian
+
+        self._start_scp()
+        success, passed = self._send_series(2)
+        self.assertTrue(success)
+        self.assertEqual((passed.files_passed_through, passed.files_converted), (2, 0))
+
+        self._start_scp([ImplicitVRLittleEndian])
+        success, converted = self._send_series(2)
+        self.assertTrue(success)
+        self.assertEqual((converted.files_passed_through, converted.files_converted), (0, 2))
+        self.assertEqual(
+            [syntax for _, syntax in self.received],
+            [ExplicitVRLittleEndian] * 2 + [ImplicitVRLittleEndian] * 2,
+        )
+        # Converted copies live in the transfer's own work directory, removed afterwards
+        self.assertEqual(sorted(os.listdir(os.path.dirname(converted.file_paths[0]))), ['000000.dcm', '000001.dcm'])
+        self.assertFalse(any(name.startswith(CONVERTED_DIR_PREFIX) for name in os.listdir(self.directory)))
+
+    def test_concurrent_conversions_do_not_share_copies(self):
+        from pydicom.uid import ImplicitVRLittleEndian
+
+        file_path = write_ct_series(self.directory, 1)[0]
+        service = DICOMTransferService()
+        work_dirs = [service._make_work_dir(1) for _ in range(2)]
+        copies = [
+            service._convert_transfer_syntax(file_path, set(), ImplicitVRLittleEndian, output_dir=work_dir)
+            for work_dir in work_dirs
+        ]
+
+        self.assertNotEqual(copies[0], copies[1])
+        service._remove_work_dir(work_dirs[0])
+        self.assertFalse(os.path.exists(copies[0]))
+        self.assertTrue(os.path.exists(copies[1]))
+        self.assertTrue(os.path.exists(file_path))
+
+    def test_rejected_syntaxes_are_remembered(self):
+        from pydicom.uid import CTImageStorage, ExplicitVRLittleEndian, ImplicitVRLittleEndian
+
+        self._start_scp([ImplicitVRLittleEndian])
+        self._send_series(1)
+        capabilities = dict(
+            DestinationCapability.objects.filter(
+                destination=self.destination, sop_class_uid=CTImageStorage
+            ).values_list('transfer_syntax_uid', 'accepted')
+        )
+        self.assertEqual(capabilities, {ExplicitVRLittleEndian: False, ImplicitVRLittleEndian: True})
+
+        # The next series is planned from the cache and converted before associating
+        self.pool.close_all()
+        success, transfer_log = self._send_series(2)
+        self.assertTrue(success)
+        self.assertEqual(transfer_log.files_converted, 2)
+        self.assertEqual(self.associations, 2)
+
+    def test_files_without_a_sop_class_fail_alone(self):
+        from pydicom import dcmread
+
+        self._start_scp()
+        file_paths = write_ct_series(self.directory, 3)
+        dataset = dcmread(file_paths[1])
+        del dataset.file_meta.MediaStorageSOPClassUID
+        dataset.save_as(file_paths[1], enforce_file_format=False)
+
+        success, transfer_log = self._send_series(0, file_paths)
+
+        self.assertFalse(success)
+        self.assertEqual((transfer_log.files_succeeded, transfer_log.files_failed), (2, 1))
+        failed = transfer_log.instances.get(status='failed')
+        self.assertEqual(failed.file_path, file_paths[1])
+        self.assertIn('No Media Storage SOP Class UID', failed.error_message)
+        self.assertEqual(len(self.received), 2)
+
+    @override_settings(DICOM_EGRESS_LIMIT_KBPS=0, DICOM_EGRESS_SCHEDULE=[])
+    def test_files_larger_than_the_burst_are_metered_per_pdu(self):
+        from pynetdicom._globals import DEFAULT_MAX_LENGTH
+
+        self._start_scp()
+        file_path = write_ct_series(self.directory, 1, pixel_kb=300)[0]
+        # 8,000 kbit/s is 1,000,000 bytes/s, so the burst holds 100,000 bytes
+        self.destination.bandwidth_limit_kbps = 8000
+        self.destination.save()
+        shaper = BandwidthShaper(burst_seconds=0.1)
+        reserved = []
+        throttle = shaper.throttle
+
+        def record(destination, nbytes):
+            reserved.append(nbytes)
+            return throttle(destination, nbytes)
+
+        started = time.monotonic()
+        with mock.patch('dicom_api.dimse.get_bandwidth_shaper', return_value=shaper), \
+                mock.patch.object(shaper, 'throttle', side_effect=record):
+            success, _transfer_log = self._send_series(0, [file_path])
+
+        self.assertTrue(success)
+        self.assertGreater(os.path.getsize(file_path), shaper.burst_seconds * 1_000_000)
+        self.assertLessEqual(max(reserved), DEFAULT_MAX_LENGTH)
+        # Every PDU of the dataset is reserved; the File Meta header is not sent
+        self.assertGreater(sum(reserved), 300_000)
+        # Bytes over the burst leave at the capped rate
+        self.assertGreaterEqual(time.monotonic() - started, 0.15)
+
+    def test_instances_already_sent_are_skipped(self):
+        self._start_scp()
+        _success, first = self._send_series(3)
+        self.assertEqual(SentInstance.objects.filter(destination=self.destination).count(), 3)
+
+        success, again = self._send_series(0, first.file_paths, skip_sent='index')
+        self.assertTrue(success)
+        self.assertEqual(len(self.received), 3)
+        self.assertEqual((again.status, again.files_skipped, again.files_succeeded), ('success', 3, 0))
+        self.assertEqual(again.bytes_skipped, sum(os.path.getsize(fp) for fp in first.file_paths))
+        self.assertEqual(again.instances.filter(status='skipped').count(), 3)
+
+    def test_sends_reuse_the_hashes_taken_at_import(self):
+        from .store import hash_file
+
+        self._start_scp()
+        file_paths = write_ct_series(tempfile.mkdtemp(dir=self.directory), 2)
+        content_hashes = {file_path: hash_file(file_path) for file_path in file_paths}
+
+        with mock.patch('dicom_api.sent_index.hash_file') as rehash:
+            success, _first = self._send_series(0, file_paths, content_hashes=content_hashes)
+            self.assertTrue(success)
+            success, again = self._send_series(0, file_paths, skip_sent='index', content_hashes=content_hashes)
+
+        rehash.assert_not_called()
+        self.assertEqual(
+            set(SentInstance.objects.values_list('content_hash', flat=True)), set(content_hashes.values())
+        )
+        self.assertEqual(again.files_skipped, 2)
+
+    def test_verify_resends_instances_the_destination_lost(self):
+        self._start_scp()
+        _success, first = self._send_series(3)
+        lost_uid = self.received.pop(0)[0]
+
+        success, again = self._send_series(0, first.file_paths, skip_sent='verify')
+        self.assertTrue(success)
+        self.assertEqual((again.files_skipped, again.files_succeeded), (2, 1))
+        self.assertEqual(self.received[-1][0], lost_uid)
+        self.assertEqual(SentInstance.objects.filter(destination=self.destination).count(), 3)
+
+    def test_unreachable_destination_fails_transfer(self):
+        self.destination.port = 1
+        self.destination.save()
+        success, transfer_log = self._send_series(1)
+        self.assertFalse(success)
+        self.assertEqual(transfer_log.status, 'failed')
+        self.assertEqual(self.received, [])
+
+    def test_health_monitor_records_echo_latency(self):
+        self._start_scp()
+        offline = Destination.objects.create(name='Offline', ae_title='OFFLINE', host='127.0.0.1', port=1)
+
+        report = HealthMonitor(timeout=5).probe_all()
+
+        self.assertEqual(report, {'reachable': 1, 'unreachable': 1})
+        health = DestinationHealth.objects.get(destination=self.destination)
+        self.assertIsNotNone(health.latency_ms)
+        self.assertEqual(len(health.history), 1)
+        self.assertTrue(self.destination.is_reachable())
+        offline_health = DestinationHealth.objects.get(destination=offline)
+        self.assertEqual((offline_health.status, offline_health.consecutive_failures), ('unreachable', 1))
+
+    def test_bulk_connectivity_test_checks_destinations_at_the_same_time(self):
+        import socket
+        self._start_scp()
+        Destination.objects.create(name='Offline', ae_title='OFFLINE', host='127.0.0.1', port=1)
+        # Accepts the TCP connection but never answers the association request
+        silent = socket.socket()
+        silent.bind(('127.0.0.1', 0))
+        silent.listen()
+        self.addCleanup(silent.close)
+        Destination.objects.create(
+            name='Silent', ae_title='SILENT', host='127.0.0.1', port=silent.getsockname()[1],
+        )
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='admin', is_staff=True))
+
+        started = time.monotonic()
+        response = client.post('/api/destinations/test_connections/', {'timeout': 5, 'deadline': 1}, format='json')
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(elapsed, 3)
+        results = {result['name']: result for result in response.data['results']}
+        self.assertTrue(results['Test SCP']['success'])
+        self.assertIsNotNone(results['Test SCP']['response_time'])
+        self.assertIn('TCP connect failed', results['Offline']['error'])
+        self.assertIsNotNone(results['Silent']['tcp_ms'])
+        self.assertIn('deadline', results['Silent']['error'])
+        self.assertEqual(
+            set(DestinationHealth.objects.values_list('destination__name', 'status')),
+            {('Test SCP', 'reachable'), ('Offline', 'unreachable')},
+        )
@@ -0,0 +1,109 @@
+import shutil
+import hashlib
+import tempfile
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+
+from .services import DICOMParser, unique_file_path
+
+
+class DICOMUploadedFile(UploadedFile):
+    """
+    An uploaded DICOM file that already lives at its final import path.
+    The file is only opened on demand so large imports do not hold one
+    descriptor per instance.
+    """
+
+    def __init__(self, file_path, name, content_type, size, charset,
+                 content_type_extra=None, dicom_metadata: Optional[Dict] = None,
+                 content_hash: Optional[str] = None):
+        super().__init__(None, name, content_type, size, charset, content_type_extra)
+        self.file_path = file_path
+        self.dicom_metadata = dicom_metadata
+        self.content_hash = content_hash
+
+    def temporary_file_path(self):
+        """Return the full path of the file on disk."""
+        return self.file_path
+
+    def open(self, mode='rb'):
+        if self.file is None:
+            self.file = open(self.file_path, mode)
+        else:
+            self.file.seek(0)
+        return self
+
+    def chunks(self, chunk_size=None):
+        self.open()
+        return super().chunks(chunk_size)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class DICOMStreamingUploadHandler(FileUploadHandler):
+    """
+    Upload handler that streams each file straight to its import path.
+
+    The first DICOM_HEADER_CAPTURE_BYTES of every file are kept as they
+    pass so the header can be parsed when the file completes, and the
+    SHA-256 used by the instance store is computed on the way, without
+    reading the file back from disk. Memory use per file is bounded by
+    the capture size regardless of the upload size.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.temp_dir = None
+        self.capture_bytes = getattr(settings, 'DICOM_HEADER_CAPTURE_BYTES', 256 * 1024)
+        self.parser = DICOMParser()
+
+    def new_file(self, *args, **kwargs):
+        """Open the destination file inside the import session directory."""
+        super().new_file(*args, **kwargs)
+        if self.temp_dir is None:
+            self.temp_dir = tempfile.mkdtemp(prefix='dicom_import_', dir=settings.DICOM_UPLOAD_DIR)
+
+        self.file_path = unique_file_path(self.temp_dir, self.file_name)
+        self.file = open(self.file_path, 'wb')
+        self.header = bytearray()
+        self.digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.file.write(raw_data)
+        self.digest.update(raw_data)
+        remaining = self.capture_bytes - len(self.header)
+        if remaining > 0:
+            self.header += raw_data[:remaining]
+        # Handled here; later handlers never see the data
+        return None
+
+    def file_complete(self, file_size):
+        self.file.close()
+        dicom_metadata = self.parser.parse_header(
+            bytes(self.header), self.file_path, complete=file_size <= len(self.header)
+        )
+        self.header = bytearray()
+        return DICOMUploadedFile(
+            self.file_path,
+            self.file_name,
+            self.content_type,
+            file_size,
+            self.charset,
+            self.content_type_extra,
+            dicom_metadata=dicom_metadata,
+            content_hash=self.digest.hexdigest(),
+        )
+
+    def upload_interrupted(self):
+        if hasattr(self, 'file'):
+            self.file.close()
+        # The request is abandoned, so the files already received go too
+        if self.temp_dir is not None:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+            self.temp_dir = None
@@ -11,6 +11,9 @@ urlpatterns = [
     path('import/', views.import_dicom_files, name='dicom_import'),
     path('send/', views.send_dicom_series, name='dicom_send'),
     path('status/', views.get_transfer_status, name='dicom_status'),
+    path('status/stream/', views.stream_transfer_status, name='dicom_status_stream'),
+    path('queue/', views.get_transfer_queue, name='dicom_queue'),
+    path('stats/volume/', views.get_transfer_volume, name='dicom_transfer_volume'),
     
     # Audit logs (ViewSet routes)
     path('', include(router.urls)),
@@ -1,20 +1,27 @@
 import os
+import time
 import uuid
+import shutil
 import tempfile
-from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
-from django.http import JsonResponse
+from django.db import connection
+from django.http import JsonResponse, StreamingHttpResponse
 from rest_framework import status, viewsets, filters
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from .services import DICOMParser, DICOMTransferService
-from .models import TransferLog
-from .serializers import TransferLogSerializer, TransferLogListSerializer
-
-# Global dictionary to store series file mappings (in production, use Redis or database)
-SERIES_FILE_CACHE = {}
+from .services import DICOMParser
+from .jobs import TransferJobQueue, egress_stats, queue_stats
+from .archives import DICOMArchiveExtractor, archive_format
+from .upload_handlers import DICOMStreamingUploadHandler, DICOMUploadedFile
+from .models import TransferJob, TransferLog
+from .registry import SeriesRegistry
+from .store import InstanceStore
+from .events import format_sse, transfer_events, transfer_status_entry
+from .pagination import TransferInstancePagination, TransferLogPagination
+from .stats import parse_volume_range, transfer_volume
+from .serializers import TransferInstanceSerializer, TransferLogSerializer, TransferLogListSerializer
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -23,6 +30,12 @@ def import_dicom_files(request):
     Import DICOM files from uploaded form data.
     Parse metadata and group by patient/series.
     """
+    # Stream uploads straight into the import session directory
+    upload_handler = DICOMStreamingUploadHandler(request)
+    request.upload_handlers = [upload_handler]
+    temp_dir = None
+    registered = False
+
     try:
         # Check if files were uploaded
         if 'files' not in request.FILES:
@@ -36,60 +49,120 @@ def import_dicom_files(request):
                 'error': 'No files provided'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create temporary directory for this import session
-        temp_dir = tempfile.mkdtemp(prefix='dicom_import_')
+        # Temporary directory for this import session
+        temp_dir = upload_handler.temp_dir or tempfile.mkdtemp(prefix='dicom_import_', dir=settings.DICOM_UPLOAD_DIR)
         session_id = str(uuid.uuid4())
         
         # Initialize DICOM parser
         parser = DICOMParser()
         
-        # Process each uploaded file
-        processed_files = []
-        errors = []
+        # Save each uploaded file, expanding archives member by member
+        extractor = DICOMArchiveExtractor(parser)
+        saved_files = []  # (display name, file path, header metadata, error)
+        upload_hashes = {}  # file path -> SHA-256 computed while streaming
         
         for uploaded_file in files:
             try:
-                # Save file to temporary location
-                file_path = os.path.join(temp_dir, uploaded_file.name)
-                
-                # Ensure directory exists
-                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                if isinstance(uploaded_file, DICOMUploadedFile):
+                    # Already on disk, header parsed while it was streamed
+                    file_path = uploaded_file.temporary_file_path()
+                    metadata = uploaded_file.dicom_metadata
+                    upload_hashes[file_path] = uploaded_file.content_hash
+                else:
+                    # Save file to temporary location
+                    file_path = os.path.join(temp_dir, uploaded_file.name)
+                    
+                    # Ensure directory exists
+                    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                    
+                    with open(file_path, 'wb+') as destination:
+                        for chunk in uploaded_file.chunks():
+                            destination.write(chunk)
+                    metadata = None
                 
-                with open(file_path, 'wb+') as destination:
-                    for chunk in uploaded_file.chunks():
-                        destination.write(chunk)
+                if metadata is None and archive_format(file_path, uploaded_file.name):
+                    try:
+                        for member_name, member_path, member_metadata in extractor.extract(
+                            file_path, temp_dir, uploaded_file.name
+                        ):
+                            saved_files.append(
+                                (f"{uploaded_file.name}/{member_name}", member_path, member_metadata, None)
+                            )
+                    finally:
+                        # Only the extracted DICOM members are kept
+                        os.remove(file_path)
+                    continue
                 
-                # Parse DICOM metadata
-                metadata = parser.parse_file(file_path)
+                saved_files.append((uploaded_file.name, file_path, metadata, None))
+                    
+            except Exception as e:
+                saved_files.append(
+                    (uploaded_file.name, None, None, f"Error processing {uploaded_file.name}: {str(e)}")
+                )
+        
+        # Files stored by an earlier import become links to the stored copy and reuse its metadata
+        store = InstanceStore()
+        content_hashes = store.hash_files(
+            [fp for _, fp, _, error in saved_files if not error], known=upload_hashes
+        )
+        stored = store.lookup(content_hashes.values())
+        deduplicated = set()
+        for index, (name, file_path, metadata, error) in enumerate(saved_files):
+            known = stored.get(content_hashes.get(file_path))
+            if known is not None and store.link(known.content_hash, file_path):
+                saved_files[index] = (name, file_path, dict(known.metadata), error)
+                deduplicated.add(file_path)
+
+        processed_files = []
+        errors = []
+
+        # Parse files whose header was not captured, in parallel where configured
+        parsed = {}
+        try:
+            for file_path, metadata in parser.parse_files(
+                [fp for _, fp, metadata, error in saved_files if not error and metadata is None]
+            ):
+                parsed[file_path] = metadata
+        except Exception as e:
+            # Files after the failure stay unparsed and are reported below
+            errors.append(f"Error parsing DICOM files: {str(e)}")
+        
+        for name, file_path, metadata, error in saved_files:
+            if error:
+                errors.append(error)
+                continue
+            try:
+                if metadata is None:
+                    metadata = parsed.get(file_path)
                 if metadata:
                     metadata['file_path'] = file_path
+                    if file_path in content_hashes:
+                        metadata['content_hash'] = content_hashes[file_path]
                     processed_files.append(metadata)
                 else:
-                    errors.append(f"Failed to parse DICOM file: {uploaded_file.name}")
-                    
+                    errors.append(f"Failed to parse DICOM file: {name}")
             except Exception as e:
-                errors.append(f"Error processing {uploaded_file.name}: {str(e)}")
+                errors.append(f"Error processing {name}: {str(e)}")
         
         if not processed_files:
             return Response({
                 'error': 'No valid DICOM files found',
                 'errors': errors
             }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Keep one copy of each new file in the instance store
+        deduplicated |= store.add_many([
+            (metadata['file_path'], content_hashes.get(metadata['file_path']), metadata)
+            for metadata in processed_files
+            if metadata['file_path'] not in deduplicated
+        ])
         
         # Group files by patient and series
         patients_data = parser.group_by_patient_and_series(processed_files)
         
-        # Store file mappings for later transfer
-        for patient in patients_data:
-            for series in patient['series']:
-                series_key = f"{session_id}_{series['id']}"
-                SERIES_FILE_CACHE[series_key] = {
-                    'files': series.get('files', []),
-                    'user_id': request.user.id,
-                    'session_id': session_id
-                }
-                # Update series ID to include session for frontend
-                series['id'] = series_key
+        # Store file mappings for later transfer, visible to every worker
+        SeriesRegistry().register(session_id, request.user, temp_dir, patients_data)
+        registered = True
         
         # Log the import action
         TransferLog.objects.create(
@@ -110,6 +183,8 @@ def import_dicom_files(request):
                 'files_processed': len(processed_files),
                 'patients_found': len(patients_data),
                 'series_found': sum(len(p['series']) for p in patients_data),
+                'archive_members_skipped': extractor.skipped,
+                'files_deduplicated': len(deduplicated),
                 'errors': errors
             }
         }, status=status.HTTP_200_OK)
@@ -118,6 +193,11 @@ def import_dicom_files(request):
         return Response({
             'error': f'Import failed: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    finally:
+        # A rejected or failed import keeps nothing of what was uploaded
+        if not registered:
+            for directory in {temp_dir, upload_handler.temp_dir} - {None}:
+                shutil.rmtree(directory, ignore_errors=True)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -132,100 +212,118 @@ def send_dicom_series(request):
             return Response({
                 'error': 'No series specified for transfer'
             }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Optionally leave out instances the destination already has
+        skip_sent = request.data.get('skipSent') or 'none'
+        if skip_sent not in dict(TransferJob.SKIP_SENT_CHOICES):
+            return Response({
+                'error': f"skipSent must be one of {', '.join(dict(TransferJob.SKIP_SENT_CHOICES))}"
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Initialize transfer service
-        transfer_service = DICOMTransferService()
+        registry = SeriesRegistry()
+        job_queue = TransferJobQueue()
 
         # Generate a unique batch ID for this group of transfers
         import uuid
         from django.utils import timezone
         batch_id = f"batch_{timezone.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
 
-        # Create transfer logs and initiate transfers
-        transfer_tasks = []
+        requested = [
+            (entry.get('seriesId'), entry.get('destination'))
+            for entry in series_to_send
+            if entry.get('seriesId') and entry.get('destination')
+        ]
 
-        for series_transfer in series_to_send:
-            series_id = series_transfer.get('seriesId')
-            destination_id = series_transfer.get('destination')
-            
-            if not series_id or not destination_id:
-                continue
-            
-            # Get series files from cache
-            series_data = SERIES_FILE_CACHE.get(series_id)
-            if not series_data:
-                continue
-            
-            # Verify user owns this series
-            if series_data['user_id'] != request.user.id:
+        # Resolve every series and destination up front, one query each
+        from destinations.models import Destination
+        series_map = registry.get_many({series_id for series_id, _ in requested})
+        destinations = Destination.objects.filter(enabled=True).in_bulk(
+            {_as_int(destination_id) for _, destination_id in requested} - {None}
+        )
+
+        # Build transfer logs and queue transfer jobs
+        entries = []
+        entry_series_ids = []
+        for series_id, destination_id in requested:
+            series_data = series_map.get(series_id)
+            destination = destinations.get(_as_int(destination_id))
+
+            # Skip unknown series, series of other users and disabled destinations
+            if not series_data or series_data.user_id != request.user.id or not destination:
                 continue
-            
-            # Get destination
-            from destinations.models import Destination
-            try:
-                destination = Destination.objects.get(id=destination_id, enabled=True)
-            except Destination.DoesNotExist:  # type: ignore[attr-defined]
+
+            file_list = series_data.files
+            if not file_list:
                 continue
-            
-            # Create transfer log
-            file_list = series_data['files']
-            if file_list:
-                first_file_metadata = next(
-                    (f for f in file_list if isinstance(f, dict)), 
-                    {}
-                )
-                
-                transfer_log = TransferLog.objects.create(
-                    user=request.user,
-                    action='send',
-                    status='pending',
-                    destination=destination,
-                    batch_id=batch_id,
-                    patient_name=first_file_metadata.get('patient_name', ''),
-                    patient_id=first_file_metadata.get('patient_id', ''),
-                    study_instance_uid=first_file_metadata.get('study_instance_uid', ''),
-                    series_instance_uid=first_file_metadata.get('series_instance_uid', ''),
-                    series_description=first_file_metadata.get('series_description', ''),
-                    modality=first_file_metadata.get('modality', ''),
-                    instance_count=len(file_list),
-                    details={
-                        'series_id': series_id,
-                        'files': [f.get('file_path') if isinstance(f, dict) else str(f) for f in file_list]
-                    }
-                )
-                
-                transfer_tasks.append({
-                    'log_id': transfer_log.id,
-                    'series_id': series_id,
-                    'destination': destination,
-                    'files': [f.get('file_path') if isinstance(f, dict) else str(f) for f in file_list]
-                })
-        
-        if not transfer_tasks:
+            first_file_metadata = next(
+                (f for f in file_list if isinstance(f, dict)),
+                {}
+            )
+            transfer_log = TransferLog(
+                user=request.user,
+                action='send',
+                status='pending',
+                destination=destination,
+                batch_id=batch_id,
+                series_id=series_id,
+                patient_name=first_file_metadata.get('patient_name', ''),
+                patient_id=first_file_metadata.get('patient_id', ''),
+                study_instance_uid=first_file_metadata.get('study_instance_uid', ''),
+                series_instance_uid=first_file_metadata.get('series_instance_uid', ''),
+                series_description=first_file_metadata.get('series_description', ''),
+                modality=first_file_metadata.get('modality', ''),
+                instance_count=len(file_list),
+                # The file list lives on the transfer job
+                details={'series_id': series_id}
+            )
+            file_paths = [f.get('file_path') if isinstance(f, dict) else str(f) for f in file_list]
+            # Hashes taken at import spare the send from reading every file again
+            content_hashes = {
+                f['file_path']: f['content_hash']
+                for f in file_list if isinstance(f, dict) and f.get('file_path') and f.get('content_hash')
+            }
+            entries.append((transfer_log, destination, file_paths, series_data.session, content_hashes))
+            entry_series_ids.append(series_id)
+
+        jobs, queue_errors = job_queue.enqueue_many(entries, skip_sent=skip_sent)
+        job_ids = [job.id for job in jobs]
+        rejected = [
+            {'seriesId': entry_series_ids[index], 'error': str(error)}
+            for index, error in queue_errors.items()
+        ]
+
+        if not job_ids and rejected:
+            return Response({
+                'error': 'Destination queues are full, try again later',
+                'rejected': rejected
+            }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+
+        if not job_ids:
             return Response({
                 'error': 'No valid series found for transfer'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Start transfers in background threads
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            for task in transfer_tasks:
-                executor.submit(
-                    transfer_service.transfer_series,
-                    task['log_id'],
-                    task['files'],
-                    task['destination']
-                )
-        
+        # Transfer workers pick the jobs up; respond without waiting for them
         return Response({
-            'message': f'Transfer initiated for {len(transfer_tasks)} series',
-            'transfer_count': len(transfer_tasks)
-        }, status=status.HTTP_200_OK)
+            'message': f'Transfer queued for {len(job_ids)} series',
+            'transfer_count': len(job_ids),
+            'batch_id': batch_id,
+            'job_ids': job_ids,
+            'rejected': rejected
+        }, status=status.HTTP_202_ACCEPTED)
         
     except Exception as e:
         return Response({
             'error': f'Transfer initiation failed: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+def _as_int(value):
+    """Coerce a request ID to int, or None if it is not one."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_transfer_status(request):
@@ -238,16 +336,14 @@ def get_transfer_status(request):
         series_ids = [sid.strip() for sid in series_ids if sid.strip()]
         
         # Query transfer logs
-        queryset = TransferLog.objects.filter(
+        queryset = TransferLog.objects.select_related('destination').filter(
             user=request.user,
             action='send'
         ).order_by('-timestamp')
         
         # Filter by series IDs if provided
         if series_ids:
-            queryset = queryset.filter(
-                details__series_id__in=series_ids
-            )
+            queryset = queryset.filter(series_id__in=series_ids)
         else:
             # Default to recent transfers (last 24 hours)
             from django.utils import timezone
@@ -258,25 +354,12 @@ def get_transfer_status(request):
         # Limit results
         queryset = queryset[:50]
         
-        # Serialize results
-        transfer_logs = TransferLogSerializer(queryset, many=True).data
-        
         # Format response for frontend
-        series_status = []
-        for log in transfer_logs:
-            series_id = log.get('details', {}).get('series_id')
-            if series_id:
-                series_status.append({
-                    'id': series_id,
-                    'status': log['status'],
-                    'message': log.get('error_message', ''),
-                    'timestamp': log['timestamp'],
-                    'completed_at': log.get('completed_at'),
-                    'destination': log.get('destination_name', ''),
-                    'patient_name': log.get('patient_name', ''),
-                    'series_description': log.get('series_description', '')
-                })
-        
+        series_status = [
+            entry for entry in (transfer_status_entry(log) for log in queryset)
+            if entry['id']
+        ]
+
         return Response({
             'series': series_status
         }, status=status.HTTP_200_OK)
@@ -286,13 +369,148 @@ def get_transfer_status(request):
             'error': f'Status retrieval failed: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def stream_transfer_status(request):
+    """
+    Stream status changes of the user's transfers as Server-Sent Events.
+
+    Watches the series in series_ids (comma separated) or the transfers of
+    batch_id. The stream starts with a 'snapshot' event, sends a 'status'
+    event per change and ends with 'done' once every watched transfer has
+    finished, or with 'timeout' after DICOM_STATUS_STREAM_MAX_SECONDS, in
+    which case the client reconnects.
+    """
+    series_ids = request.GET.get('series_ids', '').split(',')
+    series_ids = [sid.strip() for sid in series_ids if sid.strip()]
+    batch_id = request.GET.get('batch_id', '').strip()
+
+    if not series_ids and not batch_id:
+        return Response({
+            'error': 'series_ids or batch_id is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    # Subscribe before the snapshot so no change falls in between
+    subscription = transfer_events.subscribe(request.user.id, series_ids, batch_id or None)
+    try:
+        queryset = TransferLog.objects.select_related('destination').filter(
+            user=request.user,
+            action='send'
+        )
+        if series_ids:
+            queryset = queryset.filter(series_id__in=series_ids)
+        else:
+            queryset = queryset.filter(batch_id=batch_id)
+        snapshot = [transfer_status_entry(log) for log in queryset.order_by('-timestamp')[:200]]
+
+    except Exception as e:
+        transfer_events.unsubscribe(subscription)
+        return Response({
+            'error': f'Status retrieval failed: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    response = StreamingHttpResponse(
+        _transfer_status_events(subscription, snapshot),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def _transfer_status_events(subscription, snapshot):
+    """Yield the snapshot, then each change until the watched transfers finish."""
+    keepalive = getattr(settings, 'DICOM_STATUS_STREAM_KEEPALIVE', 15)
+    deadline = time.monotonic() + getattr(settings, 'DICOM_STATUS_STREAM_MAX_SECONDS', 300)
+    final_statuses = ('success', 'failed')
+    try:
+        # Waiting streams must not pin a database connection
+        if not connection.in_atomic_block:
+            connection.close()
+
+        active = {entry['log_id'] for entry in snapshot if entry['status'] not in final_statuses}
+        yield format_sse('snapshot', snapshot)
+
+        while active:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                yield format_sse('timeout', {})
+                return
+            entry = subscription.get(timeout=min(keepalive, remaining))
+            if entry is None:
+                yield ': keepalive\n\n'
+                continue
+            if entry['status'] in final_statuses:
+                active.discard(entry['log_id'])
+            else:
+                active.add(entry['log_id'])
+            yield format_sse('status', entry)
+
+        yield format_sse('done', {})
+    finally:
+        transfer_events.unsubscribe(subscription)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_transfer_queue(request):
+    """
+    Get queue depth, running transfers and wait times per destination.
+    """
+    try:
+        return Response({
+            'destinations': queue_stats(),
+            'egress': egress_stats()
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({
+            'error': f'Queue retrieval failed: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_transfer_volume(request):
+    """
+    Get successful send totals per time bucket for the volume chart.
+
+    Query parameters: bucket (hour/day/week/month, default day), start and
+    end (ISO date or datetime, default the last 30 days) and group_by
+    (destination/user/modality). Admins see every user's transfers, others
+    their own.
+    """
+    try:
+        bucket = request.GET.get('bucket', 'day')
+        group_by = request.GET.get('group_by') or None
+        try:
+            start, end = parse_volume_range(request.GET.get('start'), request.GET.get('end'))
+            is_admin = request.user.is_staff or request.user.is_superuser
+            results = transfer_volume(bucket, start, end, group_by, user=None if is_admin else request.user)
+        except ValueError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'bucket': bucket,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'group_by': group_by,
+            'results': results
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({
+            'error': f'Volume retrieval failed: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 class TransferLogViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for viewing transfer logs (audit logs).
     Admins can see all logs, regular users see only their own.
+    Pass cursor= for keyset pagination (see TransferLogPagination).
     """
     serializer_class = TransferLogListSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = TransferLogPagination
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['patient_name', 'series_description', 'error_message']
     ordering_fields = ['timestamp', 'status', 'action']
@@ -300,7 +518,7 @@ class TransferLogViewSet(viewsets.ReadOnlyModelViewSet):
     
     def get_queryset(self):
         """Return filtered queryset based on user permissions."""
-        queryset = TransferLog.objects.all()
+        queryset = TransferLog.objects.select_related('user', 'destination')
         
         # Non-admin users can only see their own logs
         if not (self.request.user.is_staff or self.request.user.is_superuser):
@@ -334,3 +552,21 @@ class TransferLogViewSet(viewsets.ReadOnlyModelViewSet):
         if self.action == 'retrieve':
             return TransferLogSerializer
         return TransferLogListSerializer
+
+    @action(detail=True, methods=['get'])
+    def instances(self, request, pk=None):
+        """
+        List the per-instance outcomes recorded for a transfer.
+        """
+        transfer_log = self.get_object()
+        queryset = transfer_log.instances.all()
+
+        status_filter = request.query_params.get('status')
+        if status_filter:
+            queryset = queryset.filter(status=status_filter)
+
+        paginator = TransferInstancePagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(TransferInstanceSerializer(page, many=True).data)
+        return Response(TransferInstanceSerializer(queryset, many=True).data)
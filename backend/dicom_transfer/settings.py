@@ -11,6 +11,11 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import sys
+import json
+import atexit
+import shutil
+import tempfile
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
@@ -21,6 +26,13 @@ load_dotenv()
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Test runs keep their uploads and logs out of the source tree
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+TEST_DATA_DIR = tempfile.mkdtemp(prefix='dicom_transfer_test_') if TESTING else None
+if TEST_DATA_DIR:
+    atexit.register(shutil.rmtree, TEST_DATA_DIR, True)
+LOG_DIR = os.path.join(TEST_DATA_DIR or BASE_DIR, 'logs')
+
 # Security settings
 SECRET_KEY = os.getenv('SECRET_KEY', 'django-insecure-change-me-in-production')
 DEBUG = os.getenv('DEBUG', 'True').lower() in ('true', '1', 't')
@@ -129,8 +141,9 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 # File upload settings - use environment variables with fallbacks
-DATA_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv('DATA_UPLOAD_MAX_MEMORY_SIZE', str(8 * 1024 * 1024 * 1024)))  # 8 GB default
-FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv('FILE_UPLOAD_MAX_MEMORY_SIZE', str(8 * 1024 * 1024 * 1024)))  # 8 GB default
+# DICOM imports stream to disk through DICOMStreamingUploadHandler, so these only bound in-memory request data
+DATA_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv('DATA_UPLOAD_MAX_MEMORY_SIZE', str(10 * 1024 * 1024)))  # 10 MB default
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv('FILE_UPLOAD_MAX_MEMORY_SIZE', str(int(2.5 * 1024 * 1024))))  # 2.5 MB default
 DATA_UPLOAD_MAX_NUMBER_FIELDS = int(os.getenv('DATA_UPLOAD_MAX_NUMBER_FIELDS', '10000'))
 DATA_UPLOAD_MAX_NUMBER_FILES = int(os.getenv('DATA_UPLOAD_MAX_NUMBER_FILES', '10000'))
 
@@ -202,9 +215,45 @@ CORS_ALLOWED_HEADERS = [
 ]
 
 # DICOM Transfer specific settings
-DICOM_UPLOAD_DIR = os.path.join(MEDIA_ROOT, 'dicom_uploads')
+DICOM_UPLOAD_DIR = os.getenv('DICOM_UPLOAD_DIR', os.path.join(TEST_DATA_DIR or MEDIA_ROOT, 'dicom_uploads'))  # Import sessions; must be shared with transfer workers
 STORESCU_PATH = os.getenv('STORESCU_PATH', 'storescu')  # Path to DCMTK storescu binary
+DICOM_SEND_ENGINE = os.getenv('DICOM_SEND_ENGINE', 'dimse')  # 'dimse' (pynetdicom, pooled associations) or 'storescu'
+DICOM_CALLING_AE_TITLE = os.getenv('DICOM_CALLING_AE_TITLE', 'TELEPOST')
+DICOM_ASSOCIATION_IDLE_TIMEOUT = int(os.getenv('DICOM_ASSOCIATION_IDLE_TIMEOUT', '60'))  # Seconds before an unused association is released
+DICOM_NETWORK_TIMEOUT = int(os.getenv('DICOM_NETWORK_TIMEOUT', '60'))  # ACSE/DIMSE/network timeout of the C-STORE engine
+DICOM_ECHO_TIMEOUT = int(os.getenv('DICOM_ECHO_TIMEOUT', '10'))  # Seconds a C-ECHO connectivity test waits for the destination
+DICOM_HEALTH_CHECK_INTERVAL = int(os.getenv('DICOM_HEALTH_CHECK_INTERVAL', '60'))  # Seconds between C-ECHO sweeps of enabled destinations in run_transfer_workers, 0 disables
+DICOM_HEALTH_CHECK_CONCURRENCY = int(os.getenv('DICOM_HEALTH_CHECK_CONCURRENCY', '8'))  # Destinations echoed at the same time per sweep
+DICOM_HEALTH_HISTORY_SIZE = int(os.getenv('DICOM_HEALTH_HISTORY_SIZE', '60'))  # Checks kept per destination for the latency history
+DICOM_BULK_TEST_DEADLINE = int(os.getenv('DICOM_BULK_TEST_DEADLINE', '30'))  # Longest a bulk connectivity test may take overall
+DICOM_BULK_TEST_CONCURRENCY = int(os.getenv('DICOM_BULK_TEST_CONCURRENCY', '64'))  # Destinations echoed at the same time by a bulk connectivity test
+DICOM_PROGRESS_FLUSH_INSTANCES = int(os.getenv('DICOM_PROGRESS_FLUSH_INSTANCES', '50'))  # Instance outcomes written per progress update
+DICOM_PROGRESS_FLUSH_INTERVAL_MS = int(os.getenv('DICOM_PROGRESS_FLUSH_INTERVAL_MS', '1000'))  # Longest delay before buffered progress is written
+DICOM_STATUS_STREAM_KEEPALIVE = int(os.getenv('DICOM_STATUS_STREAM_KEEPALIVE', '15'))  # Seconds between keepalive comments on status streams
+DICOM_STATUS_STREAM_MAX_SECONDS = int(os.getenv('DICOM_STATUS_STREAM_MAX_SECONDS', '300'))  # Status streams end after this long and the client reconnects
+DICOM_SENT_INSTANCE_INDEX = os.getenv('DICOM_SENT_INSTANCE_INDEX', 'True').lower() in ('true', '1', 't')  # Hash sent files so later sends can skip instances a destination already has
+DICOM_CAPABILITY_TTL = int(os.getenv('DICOM_CAPABILITY_TTL', str(7 * 24 * 60 * 60)))  # Seconds a negotiated presentation context is trusted
 MAX_UPLOAD_SIZE = 1024 * 1024 * 1024  # 1GB max upload size
+DICOM_PARSE_WORKERS = int(os.getenv('DICOM_PARSE_WORKERS', '2'))  # Parsing processes per web process (keep web workers x this <= CPUs), 1 disables the pool
+DICOM_PARSE_CHUNK_SIZE = int(os.getenv('DICOM_PARSE_CHUNK_SIZE', '16'))  # Files handed to a parsing process at a time
+DICOM_IMPORT_SESSION_TTL = int(os.getenv('DICOM_IMPORT_SESSION_TTL', str(24 * 60 * 60)))  # Seconds an unused import session is kept
+DICOM_IMPORT_MAX_BYTES = int(os.getenv('DICOM_IMPORT_MAX_BYTES', str(50 * 1024 * 1024 * 1024)))  # Evict least recently used sessions above this, 0 disables
+DICOM_INSTANCE_STORE = os.getenv('DICOM_INSTANCE_STORE', 'True').lower() in ('true', '1', 't')  # Keep one hardlinked copy and the parsed metadata of each distinct imported file
+DICOM_INSTANCE_STORE_DIR = os.getenv('DICOM_INSTANCE_STORE_DIR', os.path.join(DICOM_UPLOAD_DIR, 'instance_store'))  # Must be on the same filesystem as DICOM_UPLOAD_DIR
+DICOM_IMPORT_SENT_SESSION_TTL = int(os.getenv('DICOM_IMPORT_SENT_SESSION_TTL', str(60 * 60)))  # Seconds a session whose series were all sent is kept after its last use, 0 keeps it until it expires
+DICOM_IMPORT_MIN_FREE_BYTES = int(os.getenv('DICOM_IMPORT_MIN_FREE_BYTES', str(1024 * 1024 * 1024)))  # Evict least recently used sessions while the upload disk has less free, 0 disables
+DICOM_IMPORT_ORPHAN_SECONDS = int(os.getenv('DICOM_IMPORT_ORPHAN_SECONDS', str(6 * 60 * 60)))  # Import directories without a session and conversion directories of idle transfers are removed once unchanged for this long
+DICOM_STORAGE_JANITOR_INTERVAL = int(os.getenv('DICOM_STORAGE_JANITOR_INTERVAL', '300'))  # Seconds between import storage sweeps in run_transfer_workers, 0 disables
+DICOM_IMPORT_MAX_SESSIONS = int(os.getenv('DICOM_IMPORT_MAX_SESSIONS', '1000'))  # Evict least recently used sessions above this, 0 disables
+DICOM_HEADER_CAPTURE_BYTES = int(os.getenv('DICOM_HEADER_CAPTURE_BYTES', str(256 * 1024)))  # Leading bytes kept per upload for header parsing
+DICOM_TRANSFER_WORKERS = int(os.getenv('DICOM_TRANSFER_WORKERS', '8'))  # Transfer threads per run_transfer_workers process
+DICOM_EGRESS_LIMIT_KBPS = int(os.getenv('DICOM_EGRESS_LIMIT_KBPS', '0'))  # Cap on all DICOM egress of a worker process in kbit/s, 0 = unlimited; needs DICOM_SEND_ENGINE='dimse'
+DICOM_EGRESS_SCHEDULE = json.loads(os.getenv('DICOM_EGRESS_SCHEDULE', '[]'))  # Time-of-day overrides of the egress cap: [{"start": "07:00", "end": "19:00", "limit_kbps": 50000}]; validated at startup
+DICOM_BANDWIDTH_BURST_SECONDS = float(os.getenv('DICOM_BANDWIDTH_BURST_SECONDS', '1.0'))  # Seconds of a bandwidth cap that may be sent in one burst
+DICOM_THROUGHPUT_WINDOW_SECONDS = int(os.getenv('DICOM_THROUGHPUT_WINDOW_SECONDS', '60'))  # Live throughput is averaged over this many seconds
+DICOM_TRANSFER_MAX_CONCURRENT = int(os.getenv('DICOM_TRANSFER_MAX_CONCURRENT', '0'))  # Transfers running across all destinations, 0 = unlimited
+DICOM_TRANSFER_POLL_INTERVAL = float(os.getenv('DICOM_TRANSFER_POLL_INTERVAL', '1.0'))  # Seconds between queue polls when idle
+DICOM_TRANSFER_LEASE_SECONDS = int(os.getenv('DICOM_TRANSFER_LEASE_SECONDS', '60'))  # Jobs of a silent worker are reclaimed after this
 
 # Logging configuration
 LOGGING = {
@@ -224,7 +273,7 @@ LOGGING = {
         'file': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
-            'filename': os.path.join(BASE_DIR, 'logs', 'dicom_transfer.log'),
+            'filename': os.path.join(LOG_DIR, 'dicom_transfer.log'),
             'formatter': 'verbose',
         },
         'console': {
@@ -243,5 +292,5 @@ LOGGING = {
 }
 
 # Create logs directory if it doesn't exist
-os.makedirs(os.path.join(BASE_DIR, 'logs'), exist_ok=True)
+os.makedirs(LOG_DIR, exist_ok=True)
 os.makedirs(DICOM_UPLOAD_DIR, exist_ok=True)
@@ -138,6 +138,23 @@ export const api = {
     return true;
   },
 
+  // Checks all enabled destinations (or ids) at once; resolves within the server's deadline
+  testDestinations: async (ids) => {
+    const res = await fetchWithAuth("/destinations/test_connections/", {
+      method: "POST",
+      body: JSON.stringify(ids ? { ids } : {}),
+    });
+    if (!res.ok) throw await res.json();
+    return res.json();
+  },
+
+  // Starts a background C-ECHO and returns the last known result
+  testDestination: async (id) => {
+    const res = await fetchWithAuth(`/destinations/${id}/test_connection/`, { method: "POST" });
+    if (!res.ok) throw await res.json();
+    return res.json();
+  },
+
   getAuditLogs: async (params = {}) => {
     const query = new URLSearchParams(params).toString();
     const res = await fetchWithAuth(`/audit/logs/${query ? '?' + query : ''}`);
@@ -283,4 +300,50 @@ export const api = {
     if (!res.ok) throw await res.json();
     return res.json();
   },
+
+  // Successful send totals per time bucket ({ bucket, start, end, group_by })
+  getTransferVolume: async (params = {}) => {
+    const query = new URLSearchParams(params).toString();
+    const res = await fetchWithAuth(`/dicom/stats/volume/${query ? '?' + query : ''}`);
+    if (!res.ok) throw await res.json();
+    return res.json();
+  },
+
+  // Server-Sent Events read through fetch so the JWT header can be sent.
+  // Calls onEvent(name, data) per event and resolves with the last event name
+  // once the server closes the stream ('done', or 'timeout' to reconnect).
+  streamTransferStatus: async (params, onEvent, signal) => {
+    const query = new URLSearchParams(params).toString();
+    const res = await fetchWithAuth(`/dicom/status/stream/?${query}`, {
+      headers: { Accept: "text/event-stream" },
+      signal,
+    });
+    if (!res.ok || !res.body) throw new Error(`Status stream failed with status ${res.status}`);
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let lastEvent = null;
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary;
+      while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        let event = "message";
+        const data = [];
+        block.split("\n").forEach((line) => {
+          if (line.startsWith("event:")) event = line.slice(6).trim();
+          else if (line.startsWith("data:")) data.push(line.slice(5).trim());
+        });
+        if (!data.length) continue; // keepalive comment
+        lastEvent = event;
+        onEvent(event, JSON.parse(data.join("\n")));
+      }
+    }
+    return lastEvent;
+  },
 }; 
\ No newline at end of file
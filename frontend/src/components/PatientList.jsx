@@ -3,6 +3,7 @@ import SeriesItem from './SeriesItem'
 
 function PatientList({ patients, destinations, onSeriesUpdate, onSendSelected }) {
   const [expandedPatients, setExpandedPatients] = useState(new Set())
+  const [skipSent, setSkipSent] = useState('none')
 
   const togglePatient = (patientId) => {
     const newExpanded = new Set(expandedPatients)
@@ -88,8 +89,22 @@ function PatientList({ patients, destinations, onSeriesUpdate, onSendSelected })
               </select>
             </div>
 
+            {/* Skip instances the destination already has */}
+            <div className="flex items-center space-x-2">
+              <label className="text-sm text-gray-400 select-none">Already sent:</label>
+              <select
+                value={skipSent}
+                onChange={(e) => setSkipSent(e.target.value)}
+                className="text-sm bg-gray-600 border border-gray-500 text-white rounded px-3 py-1 focus:outline-none focus:ring-2 focus:ring-blue-500"
+              >
+                <option value="none">Send again</option>
+                <option value="index">Skip</option>
+                <option value="verify">Skip if found by C-FIND</option>
+              </select>
+            </div>
+
             <button
-              onClick={onSendSelected}
+              onClick={() => onSendSelected(skipSent)}
               disabled={selectedCount === 0}
               className="px-4 py-2 bg-green-600 hover:bg-green-700 disabled:bg-gray-600 disabled:cursor-not-allowed text-white text-sm rounded-md transition-colors focus:outline-none focus:ring-2 focus:ring-green-500 focus:ring-offset-2 focus:ring-offset-gray-800"
             >
@@ -116,7 +116,11 @@ function SeriesItem({ series, destinations, onUpdate }) {
       {series.status === 'sending' && (
         <div className="mt-3">
           <div className="w-full bg-gray-600 rounded-full h-2 overflow-hidden">
-            <div className="bg-blue-600 h-2 animate-[indeterminate_1.2s_linear_infinite]" style={{ width: '40%' }}></div>
+            {series.progress != null ? (
+              <div className="bg-blue-600 h-2 transition-all" style={{ width: `${series.progress}%` }}></div>
+            ) : (
+              <div className="bg-blue-600 h-2 animate-[indeterminate_1.2s_linear_infinite]" style={{ width: '40%' }}></div>
+            )}
           </div>
         </div>
       )}
@@ -11,19 +11,13 @@ function humanSize(bytes) {
   return `${(bytes / Math.pow(k, i)).toFixed(1)} ${sizes[i]}`
 }
 
-export default function TransferVolumeChart({ logs = [] }) {
-  // Aggregate per day
-  const data = useMemo(() => {
-    const map = {}
-    logs.forEach(l => {
-      if (!l.bytes_transferred || l.bytes_transferred === null) return
-      const day = new Date(l.timestamp).toISOString().slice(0, 10) // YYYY-MM-DD
-      map[day] = (map[day] || 0) + l.bytes_transferred
-    })
-    return Object.entries(map)
-      .sort(([a], [b]) => a.localeCompare(b))
-      .map(([date, bytes]) => ({ date, bytes }))
-  }, [logs])
+export default function TransferVolumeChart({ buckets = [] }) {
+  // Daily totals come aggregated from /dicom/stats/volume/
+  const data = useMemo(() => (
+    buckets
+      .filter(b => b.bytes > 0)
+      .map(b => ({ date: b.bucket.slice(0, 10), bytes: b.bytes, transfers: b.transfers }))
+  ), [buckets])
 
   if (!data.length) return null
 
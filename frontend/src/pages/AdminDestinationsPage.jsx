@@ -4,10 +4,12 @@ import { api } from '../api'
 
 function AdminDestinationsPage() {
   const [destinations, setDestinations] = useState([])
-  const blank = { name: '', ae_title: '', host: '', port: 104 }
+  const blank = { name: '', ae_title: '', host: '', port: 104, max_concurrent_associations: 3, max_queued_jobs: 0, bandwidth_limit_kbps: 0 }
   const [form, setForm] = useState(blank)
   const [editingId, setEditingId] = useState(null)
   const [loading, setLoading] = useState(false)
+  const [testingAll, setTestingAll] = useState(false)
+  const [testResults, setTestResults] = useState({})
 
   const fetchAll = async () => {
     try {
@@ -20,16 +22,55 @@ function AdminDestinationsPage() {
 
   useEffect(() => { fetchAll() }, [])
 
+  const handleTest = async (id) => {
+    try {
+      await api.testDestination(id)
+      // The echo runs in the background; pick up its result shortly
+      setTimeout(fetchAll, 3000)
+    } catch (err) {
+      console.error('test dest', err)
+    }
+  }
+
+  const handleTestAll = async () => {
+    setTestingAll(true)
+    try {
+      const data = await api.testDestinations()
+      setTestResults(Object.fromEntries(data.results.map(r => [r.id, r])))
+      fetchAll()
+    } catch (err) {
+      console.error('test all dest', err)
+    } finally {
+      setTestingAll(false)
+    }
+  }
+
+  const healthLabel = (health) => {
+    if (!health || health.status === 'unknown') return <span className="text-gray-400">Not checked</span>
+    if (health.status === 'reachable') {
+      return <span className="text-green-400">Reachable{health.latency_ms != null ? ` (${Math.round(health.latency_ms)} ms)` : ''}</span>
+    }
+    return <span className="text-red-400" title={health.message}>Unreachable</span>
+  }
+
   const handleChange = (e) => setForm({ ...form, [e.target.name]: e.target.value })
 
+  const payload = () => ({
+    ...form,
+    port: Number(form.port),
+    max_concurrent_associations: Number(form.max_concurrent_associations) || 1,
+    max_queued_jobs: Number(form.max_queued_jobs) || 0,
+    bandwidth_limit_kbps: Number(form.bandwidth_limit_kbps) || 0,
+  })
+
   const handleSubmit = async (e) => {
     e.preventDefault()
     setLoading(true)
     try {
       if (editingId) {
-        await api.updateDestination(editingId, { ...form, port: Number(form.port) })
+        await api.updateDestination(editingId, payload())
       } else {
-        await api.createDestination({ ...form, port: Number(form.port) })
+        await api.createDestination(payload())
       }
       setForm(blank)
       setEditingId(null)
@@ -64,10 +105,27 @@ function AdminDestinationsPage() {
           <input className="flex-1 bg-gray-700 rounded px-3 py-2" placeholder="Host" name="host" value={form.host} onChange={handleChange} />
           <input type="number" className="w-32 bg-gray-700 rounded px-3 py-2" placeholder="Port" name="port" value={form.port} onChange={handleChange} />
         </div>
+        <div className="flex items-center space-x-4">
+          <label className="text-sm text-gray-300" htmlFor="max_concurrent_associations">Concurrent transfers</label>
+          <input type="number" min="1" className="w-24 bg-gray-700 rounded px-3 py-2" id="max_concurrent_associations" name="max_concurrent_associations" value={form.max_concurrent_associations} onChange={handleChange} />
+          <label className="text-sm text-gray-300" htmlFor="max_queued_jobs">Queue limit (0 = none)</label>
+          <input type="number" min="0" className="w-24 bg-gray-700 rounded px-3 py-2" id="max_queued_jobs" name="max_queued_jobs" value={form.max_queued_jobs} onChange={handleChange} />
+        </div>
+        <div className="flex items-center space-x-4">
+          <label className="text-sm text-gray-300" htmlFor="bandwidth_limit_kbps">Bandwidth cap (kbit/s, 0 = none)</label>
+          <input type="number" min="0" className="w-40 bg-gray-700 rounded px-3 py-2" id="bandwidth_limit_kbps" name="bandwidth_limit_kbps" value={form.bandwidth_limit_kbps} onChange={handleChange} />
+        </div>
         <button disabled={loading} className="px-4 py-2 bg-blue-600 rounded hover:bg-blue-700 disabled:bg-gray-600">{loading ? 'Saving...' : 'Add'}</button>
       </form>
 
       {/* list */}
+      <button
+        onClick={handleTestAll}
+        disabled={testingAll}
+        className="px-4 py-2 bg-gray-700 hover:bg-gray-600 disabled:bg-gray-800 text-white text-sm rounded-md transition-colors"
+      >
+        {testingAll ? 'Testing...' : 'Test all'}
+      </button>
       <table className="w-full text-sm bg-gray-800 border border-gray-700 rounded-lg">
         <thead className="bg-gray-700">
           <tr>
@@ -75,6 +133,7 @@ function AdminDestinationsPage() {
             <th className="py-2 px-3 text-left">AE Title</th>
             <th className="py-2 px-3 text-left">Host</th>
             <th className="py-2 px-3 text-left">Port</th>
+            <th className="py-2 px-3 text-left">Status</th>
             <th className="py-2 px-3"></th>
           </tr>
         </thead>
@@ -85,14 +144,21 @@ function AdminDestinationsPage() {
               <td className="py-2 px-3">{d.ae_title}</td>
               <td className="py-2 px-3">{d.host}</td>
               <td className="py-2 px-3">{d.port}</td>
+              <td className="py-2 px-3">
+                {healthLabel(d.health)}
+                {testResults[d.id]?.error && (
+                  <div className="text-xs text-red-300">{testResults[d.id].error}</div>
+                )}
+              </td>
               <td className="py-2 px-3 space-x-2">
+                <button onClick={() => handleTest(d.id)} className="text-green-400 hover:underline text-xs">Test</button>
                 <button onClick={() => { setEditingId(d.id); setForm({ ...d }) }} className="text-blue-400 hover:underline text-xs">Edit</button>
                 <button onClick={async () => { if(confirm('Delete destination?')) { await api.deleteDestination(d.id); fetchAll(); }}} className="text-red-400 hover:underline text-xs">Delete</button>
               </td>
             </tr>
           ))}
           {destinations.length === 0 && (
-            <tr><td className="p-4 text-center text-gray-400" colSpan={5}>No destinations</td></tr>
+            <tr><td className="p-4 text-center text-gray-400" colSpan={6}>No destinations</td></tr>
           )}
         </tbody>
       </table>
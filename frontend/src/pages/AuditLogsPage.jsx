@@ -4,23 +4,30 @@ import { api } from '../api'
 
 function AuditLogsPage() {
   const [logs, setLogs] = useState([])
-  const [page, setPage] = useState(1)
+  const [links, setLinks] = useState({ next: null, previous: null })
+  const [total, setTotal] = useState(null)
   const [loading, setLoading] = useState(false)
   const pageSize = 20
 
-  const fetchLogs = async (p=1) => {
+  // Keyset pages: the API returns next/previous links carrying an opaque cursor
+  const cursorOf = (link) => link ? new URL(link, window.location.origin).searchParams.get('cursor') : null
+
+  const fetchLogs = async (cursor='') => {
     setLoading(true)
     try {
-      const data = await api.getAuditLogs({ page: p })
+      const params = { cursor, page_size: pageSize }
+      if (!cursor) params.count = 'estimate'
+      const data = await api.getAuditLogs(params)
       setLogs(data.results || data)
-      setPage(p)
+      setLinks({ next: cursorOf(data.next), previous: cursorOf(data.previous) })
+      if (data.count != null) setTotal(data.count)
     } catch(e) {
       console.error('fetch logs', e)
     } finally {
       setLoading(false)
     }
   }
-  useEffect(() => { fetchLogs(1) }, [])
+  useEffect(() => { fetchLogs('') }, [])
 
   return (
     <div className="min-h-screen bg-gray-900 text-white">
@@ -78,6 +85,11 @@ function AuditLogsPage() {
                   <span className={l.files_succeeded > 0 ? 'text-green-400 font-semibold' : 'text-gray-500'}>
                     {l.files_succeeded || 0}
                   </span>
+                  {l.files_skipped > 0 && (
+                    <span className="ml-1 text-xs text-gray-400" title="Already at the destination">
+                      (+{l.files_skipped} skipped)
+                    </span>
+                  )}
                 </td>
                 <td className="py-2 px-3 text-center">
                   <span className={l.files_failed > 0 ? 'text-red-400 font-semibold' : 'text-gray-500'}>
@@ -93,6 +105,25 @@ function AuditLogsPage() {
           </tbody>
         </table>
       )}
+      <div className="flex items-center justify-between text-sm text-gray-400">
+        <span>{total != null ? `About ${total.toLocaleString()} logs` : ''}</span>
+        <div className="space-x-2">
+          <button
+            className="px-3 py-1 bg-gray-700 hover:bg-gray-600 rounded-md disabled:opacity-40"
+            disabled={loading || !links.previous}
+            onClick={() => fetchLogs(links.previous)}
+          >
+            Newer
+          </button>
+          <button
+            className="px-3 py-1 bg-gray-700 hover:bg-gray-600 rounded-md disabled:opacity-40"
+            disabled={loading || !links.next}
+            onClick={() => fetchLogs(links.next)}
+          >
+            Older
+          </button>
+        </div>
+      </div>
       </main>
     </div>
   )
@@ -9,7 +9,7 @@ function DashboardPage({ user, onLogout }) {
   const [patients, setPatients] = useState([])
   const [destinations, setDestinations] = useState([])
   const [isLoading, setIsLoading] = useState(true)
-  const [logs, setLogs] = useState([])
+  const [volume, setVolume] = useState([])
 
   // Fetch destinations from backend
   useEffect(() => {
@@ -32,30 +32,28 @@ function DashboardPage({ user, onLogout }) {
     }
   }, [])
 
-  // fetch audit logs for volume chart
+  // fetch daily send totals for volume chart (aggregated by the server)
   useEffect(() => {
     let mounted = true
-    async function fetchLogs() {
+    async function fetchVolume() {
       try {
-        const data = await api.getAuditLogs({ action: 'send', status: 'success', page_size: 100 })
-        const list = data.results || data
-        if (mounted) setLogs(list)
+        const data = await api.getTransferVolume({ bucket: 'day' })
+        if (mounted) setVolume(data.results || [])
       } catch (e) {
-        console.error('fetch logs', e)
+        console.error('fetch volume', e)
       }
     }
-    fetchLogs()
-    const iv = setInterval(fetchLogs, 60000) // refresh every minute
+    fetchVolume()
+    const iv = setInterval(fetchVolume, 60000) // refresh every minute
     return () => { mounted = false; clearInterval(iv) }
   }, [])
 
-  // Cleanup polling on unmount
+  // Close status streams on unmount
   useEffect(() => {
+    const streams = streamsRef.current
     return () => {
-      if (pollRef.current) {
-        clearInterval(pollRef.current)
-        pollRef.current = null
-      }
+      streams.forEach(controller => controller.abort())
+      streams.clear()
     }
   }, [])
 
@@ -63,8 +61,8 @@ function DashboardPage({ user, onLogout }) {
     setPatients(importedPatients)
   }
 
-  // polling ref
-  const pollRef = useRef(null)
+  // open status streams (AbortControllers), one per sent batch
+  const streamsRef = useRef(new Set())
 
   const handleSeriesUpdate = (patientId, seriesId, updates) => {
     setPatients(prevPatients => 
@@ -81,7 +79,47 @@ function DashboardPage({ user, onLogout }) {
     )
   }
 
-  const handleSendSelected = async () => {
+  const applySeriesStatus = ({ id, status, message, files_succeeded, files_failed, files_skipped, instance_count }) => {
+    const done = (files_succeeded || 0) + (files_failed || 0) + (files_skipped || 0)
+    setPatients(prevPatients =>
+      prevPatients.map(patient => ({
+        ...patient,
+        series: patient.series.map(series =>
+          series.id === id
+            ? {
+                ...series,
+                // queued jobs show as sending; the UI has no separate queued state
+                status: status === 'pending' ? 'sending' : status,
+                errorMessage: message,
+                progress: instance_count ? Math.min(100, (done / instance_count) * 100) : null
+              }
+            : series
+        )
+      }))
+    )
+  }
+
+  // Follow a batch over the status stream; the server ends it with 'done',
+  // or with 'timeout' after a few minutes, in which case we reconnect.
+  const watchBatch = async (batchId) => {
+    const controller = new AbortController()
+    streamsRef.current.add(controller)
+    try {
+      let lastEvent = 'timeout'
+      while (lastEvent === 'timeout' && !controller.signal.aborted) {
+        lastEvent = await api.streamTransferStatus({ batch_id: batchId }, (event, data) => {
+          if (event === 'snapshot') data.forEach(applySeriesStatus)
+          else if (event === 'status') applySeriesStatus(data)
+        }, controller.signal)
+      }
+    } catch (e) {
+      if (!controller.signal.aborted) console.error('Status stream failed', e)
+    } finally {
+      streamsRef.current.delete(controller)
+    }
+  }
+
+  const handleSendSelected = async (skipSent = 'none') => {
     // Build payload for backend
     const selectedSeries = []
     patients.forEach(p => p.series.forEach(s => {
@@ -105,36 +143,10 @@ function DashboardPage({ user, onLogout }) {
         }))
       })
 
-      await api.sendSeries({ seriesToSend: selectedSeries })
+      const result = await api.sendSeries({ seriesToSend: selectedSeries, skipSent })
 
-      // start polling
-      if (!pollRef.current) {
-        pollRef.current = setInterval(async () => {
-          // gather series still sending
-          const pending = []
-          patients.forEach(pt => pt.series.forEach(se => {
-            if (['sending','pending','ready'].includes(se.status)) {
-              pending.push(se.id)
-            }
-          }))
-          if (!pending.length) {
-            clearInterval(pollRef.current)
-            pollRef.current = null
-            return
-          }
-          try {
-            const data = await api.getTransferStatus({ series_ids: pending.join(',') })
-            data.series.forEach(st => {
-              const { id, status, message } = st
-              patients.forEach(pt => pt.series.forEach(se => {
-                if (se.id === id) handleSeriesUpdate(pt.id, id, { status: status, errorMessage: message })
-              }))
-            })
-          } catch (e) {
-            console.error('Status poll failed', e)
-          }
-        }, 10000)
-      }
+      // follow progress as the server pushes it
+      if (result.batch_id) watchBatch(result.batch_id)
     } catch (e) {
       console.error('Send failed', e)
       alert('Failed to start transfer')
@@ -195,7 +207,7 @@ function DashboardPage({ user, onLogout }) {
       <main className="p-6">
         <div className="max-w-7xl mx-auto space-y-6">
           {/* Stats Section */}
-          {logs.length > 0 && <TransferVolumeChart logs={logs} />}
+          {volume.length > 0 && <TransferVolumeChart buckets={volume} />}
 
           {/* Import Section */}
           <DICOMImport onFilesImported={handleFilesImported} />
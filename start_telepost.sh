@@ -113,8 +113,8 @@ CSRF_COOKIE_SECURE=False
 CSRF_TRUSTED_ORIGINS=http://10.200.20.37
 
 # File upload settings
-DATA_UPLOAD_MAX_MEMORY_SIZE=8589934592
-FILE_UPLOAD_MAX_MEMORY_SIZE=8589934592
+DATA_UPLOAD_MAX_MEMORY_SIZE=10485760
+FILE_UPLOAD_MAX_MEMORY_SIZE=2621440
 DATA_UPLOAD_MAX_NUMBER_FIELDS=10000
 DATA_UPLOAD_MAX_NUMBER_FILES=10000
 EOF
@@ -143,7 +143,30 @@ User=www-data
 Group=www-data
 WorkingDirectory=/home/administrator/desktop/mimic/telepost/backend
 Environment=PATH=/home/administrator/desktop/mimic/telepost/backend/venv/bin
-ExecStart=/home/administrator/desktop/mimic/telepost/backend/venv/bin/gunicorn --workers 3 --bind 127.0.0.1:8000 dicom_transfer.wsgi:application
+ExecStart=/home/administrator/desktop/mimic/telepost/backend/venv/bin/gunicorn --workers 3 --worker-class gthread --threads 32 --bind 127.0.0.1:8000 dicom_transfer.wsgi:application
+Restart=always
+RestartSec=3
+
+[Install]
+WantedBy=multi-user.target
+EOF
+
+# Create systemd service for transfer workers
+print_status "Creating systemd service for transfer workers..."
+cat > /etc/systemd/system/telepost-transfer-worker.service << EOF
+[Unit]
+Description=Telepost DICOM Transfer Workers
+After=network.target postgresql.service telepost-backend.service
+
+[Service]
+Type=exec
+User=www-data
+Group=www-data
+WorkingDirectory=/home/administrator/desktop/mimic/telepost/backend
+Environment=PATH=/home/administrator/desktop/mimic/telepost/backend/venv/bin
+ExecStart=/home/administrator/desktop/mimic/telepost/backend/venv/bin/python manage.py run_transfer_workers
+KillSignal=SIGTERM
+TimeoutStopSec=600
 Restart=always
 RestartSec=3
 
@@ -235,6 +258,8 @@ print_status "Starting services..."
 systemctl daemon-reload
 systemctl enable telepost-backend
 systemctl start telepost-backend
+systemctl enable telepost-transfer-worker
+systemctl start telepost-transfer-worker
 systemctl restart nginx
 
 # Create logs directory
@@ -244,6 +269,7 @@ chown www-data:www-data /home/administrator/desktop/mimic/telepost/logs
 # Final status check
 print_status "Checking service status..."
 systemctl status telepost-backend --no-pager
+systemctl status telepost-transfer-worker --no-pager
 systemctl status nginx --no-pager
 
 echo ""